@@ -0,0 +1,197 @@
+# benchmarks/bench_async_ordering.py
+"""
+后台 I/O 执行器压力测试：模拟 UI 线程快速交替提交写操作与读操作 (仓储带随机延迟)，检查
+1. 写操作严格按提交顺序执行；
+2. 每个读操作都能看到提交它之前的全部写入 (读到自己的写)；
+3. 同 key 的读操作只回调最新一次，且回调都在"UI 线程"执行；
+4. UI 线程提交操作的耗时与仓储延迟无关。
+第二部分用真实的 JSON 仓储跑同样的交替操作，核对最终落盘结果。
+第三部分在无窗口的 Tcl 事件循环上检查 TkDispatcher：多个线程投递的回调全部在主线程执行，
+队列为空后不再有定时轮询 (自管道模式无 after 定时器，after 轮询模式间隔放慢到 IDLE_MS)。
+用法：python benchmarks/bench_async_ordering.py [操作数]
+"""
+import os
+import sys
+import time
+import queue
+import random
+import tempfile
+import tkinter
+import _tkinter
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core import TaskService, HistoryService, JsonRepository, JsonLinesRepository  # noqa: E402
+from src.workers import TkDispatcher, ServiceExecutor, AsyncServices  # noqa: E402
+
+
+class FakeUI:
+    """用队列模拟 TkDispatcher：回调只在 run() 所在线程执行"""
+
+    def __init__(self):
+        self.queue = queue.SimpleQueue()
+        self.thread = threading.current_thread()
+
+    def post(self, fn, *args):
+        self.queue.put((fn, args))
+
+    def pump(self, until, timeout=30):
+        deadline = time.monotonic() + timeout
+        while not until():
+            try:
+                fn, args = self.queue.get(timeout=0.05)
+            except queue.Empty:
+                if time.monotonic() > deadline: raise TimeoutError("callbacks not delivered")
+                continue
+            fn(*args)
+
+
+class SlowLog:
+    """带随机延迟的"仓储"：写入追加序号，读取返回副本"""
+
+    def __init__(self, rng):
+        self.rng, self.items, self.lock = rng, [], threading.Lock()
+
+    def write(self, i):
+        time.sleep(self.rng.random() * 0.002)
+        with self.lock: self.items.append(i)
+
+    def read(self):
+        time.sleep(self.rng.random() * 0.002)
+        with self.lock: return list(self.items)
+
+
+def stress_ordering(n_ops, rng):
+    ui = FakeUI()
+    executor = ServiceExecutor(ui.post, read_workers=4)
+    log = SlowLog(rng)
+    writes, reads_done, keyed = 0, [0], {"delivered": [], "last": None}
+    errors, submit_cost = [], []
+
+    def check_read(expected_min, result):
+        if threading.current_thread() is not ui.thread: errors.append("callback off UI thread")
+        if result != list(range(len(result))): errors.append(f"writes out of order: {result[:10]}...")
+        if len(result) < expected_min: errors.append(f"read missed writes: {len(result)} < {expected_min}")
+        reads_done[0] += 1
+
+    n_reads = 0
+    for _ in range(n_ops):
+        t0 = time.perf_counter()
+        if rng.random() < 0.5:
+            executor.write(log.write, writes)
+            writes += 1
+        elif rng.random() < 0.8:
+            executor.read(log.read, callback=lambda r, w=writes: check_read(w, r))
+            n_reads += 1
+        else:
+            future = executor.read(log.read, callback=lambda r: keyed["delivered"].append(r), key="page")
+            keyed["last"] = (future, writes)
+        submit_cost.append(time.perf_counter() - t0)
+
+    last_future, last_writes = keyed["last"]
+    ui.pump(lambda: reads_done[0] == n_reads and last_future.done() and ui.queue.empty())
+    executor.shutdown()
+
+    if log.items != list(range(writes)): errors.append("final log mismatch")
+    if len(keyed["delivered"]) != 1 or len(keyed["delivered"][0]) < last_writes:
+        errors.append(f"keyed reads delivered {len(keyed['delivered'])} times")
+    return errors, writes, n_reads, max(submit_cost)
+
+
+def stress_services(n_ops, rng):
+    ui = FakeUI()
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            services = AsyncServices(ServiceExecutor(ui.post, read_workers=4),
+                                     (TaskService(JsonRepository("tasks.json")),
+                                      HistoryService(JsonLinesRepository("history.jsonl"))))
+            added, recorded, pending, errors = 0, 0, [0], []
+
+            def check(expected, actual, what):
+                if actual < expected: errors.append(f"{what}: saw {actual}, expected >= {expected}")
+                pending[0] -= 1
+
+            for _ in range(n_ops):
+                r = rng.random()
+                if r < 0.3:
+                    services.add_task(f"task {added}"); added += 1
+                elif r < 0.5:
+                    services.record_focus(rng.randint(1, 60), "压测"); recorded += 1
+                elif r < 0.75:
+                    pending[0] += 1
+                    services.executor.read(services._tasks().get_tasks,
+                                           callback=lambda t, e=added: check(e, len(t), "tasks"))
+                else:
+                    pending[0] += 1
+                    services.executor.read(services._history().repo.load_all,
+                                           callback=lambda h, e=recorded: check(e, len(h), "history"))
+            ui.pump(lambda: pending[0] == 0)
+            services.executor.shutdown()
+
+            if len(JsonRepository("tasks.json").load_all()) != added: errors.append("tasks on disk mismatch")
+            if len(JsonLinesRepository("history.jsonl").load_all()) != recorded: errors.append("history on disk mismatch")
+            return errors, added, recorded
+        finally:
+            os.chdir(cwd)
+
+
+class PollingDispatcher(TkDispatcher):
+    """没有 createfilehandler 的平台 (Windows) 上的退化路径"""
+
+    def _open_pipe(self): return None
+
+
+def dispatcher_wakeups(cls, n_threads=4, per_thread=500):
+    root = tkinter.Tcl()
+    dispatcher = cls(root)
+    main, seen, errors = threading.current_thread(), [0], []
+
+    def callback():
+        if threading.current_thread() is not main: errors.append("callback off main thread")
+        seen[0] += 1
+
+    def producer():
+        for _ in range(per_thread): dispatcher.post(callback)
+
+    threads = [threading.Thread(target=producer) for _ in range(n_threads)]
+    for t in threads: t.start()
+    deadline = time.monotonic() + 10
+    while seen[0] < n_threads * per_thread and time.monotonic() < deadline:
+        root.dooneevent(_tkinter.DONT_WAIT) or time.sleep(0.001)
+    for t in threads: t.join()
+    # 空闲 1 秒：统计主线程被唤醒 (执行定时器 / 文件事件) 的次数
+    idle_events, end = 0, time.monotonic() + 1
+    while time.monotonic() < end:
+        if root.dooneevent(_tkinter.DONT_WAIT): idle_events += 1
+        else: time.sleep(0.001)
+    timers = root.tk.call("after", "info")
+    if seen[0] != n_threads * per_thread: errors.append(f"delivered {seen[0]} / {n_threads * per_thread}")
+    return errors, dispatcher.mode, seen[0], idle_events, len(timers)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = random.Random(42)
+
+    errors, writes, reads, worst = stress_ordering(n, rng)
+    print(f"ordering : {writes} writes / {reads} reads, max submit {worst * 1000:.3f} ms, errors {len(errors)}")
+    for e in errors[:5]: print("  ", e)
+
+    errors2, added, recorded = stress_services(n // 5, rng)
+    print(f"services : {added} tasks / {recorded} focus records, errors {len(errors2)}")
+    for e in errors2[:5]: print("  ", e)
+
+    results = [dispatcher_wakeups(cls) for cls in (TkDispatcher, PollingDispatcher)]
+    for errors3, mode, delivered, idle, timers in results:
+        print(f"dispatch : {mode:<4} {delivered} callbacks from 4 threads, {idle} wakeups in 1 s idle, "
+              f"{timers} pending timers, errors {len(errors3)}")
+        for e in errors3[:5]: print("  ", e)
+
+    assert not errors and not errors2
+    (pipe_errors, pipe_mode, _, pipe_idle, pipe_timers), (poll_errors, _, _, poll_idle, _) = results
+    assert not pipe_errors and not poll_errors
+    assert pipe_mode == "pipe" and pipe_idle == 0 and pipe_timers == 0
+    assert poll_idle <= 1000 // TkDispatcher.IDLE_MS + 4  # 放慢过程中的几次 + 之后每 IDLE_MS 一次
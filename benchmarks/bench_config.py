@@ -0,0 +1,67 @@
+# benchmarks/bench_config.py
+"""
+配置读取与批量修改：
+1. 渲染热路径上的单次读取开销：旧式 dict + get()、ConfigManager.get()、快照属性访问；
+2. 一个事务内修改 20 项配置：统计快照重建、订阅通知与 config.json 写盘次数 (应各 1 次)。
+用法：python benchmarks/bench_config.py
+"""
+import os
+import sys
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import AppConfig, ConfigManager  # noqa: E402
+
+N = 1_000_000
+
+
+def per_call_ns(fn):
+    t0 = time.perf_counter_ns()
+    fn()
+    return (time.perf_counter_ns() - t0) / N
+
+
+def main():
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            ConfigManager.CONFIG_FILE = os.path.join(tmp, "config.json")
+            cm = ConfigManager()
+            legacy = {k: getattr(AppConfig, k) for k in dir(AppConfig) if k.isupper()}
+
+            def read_legacy():
+                for _ in range(N): legacy.get("COLOR_PRIMARY")
+
+            def read_get():
+                for _ in range(N): cm.get("COLOR_PRIMARY")
+
+            def read_snapshot():
+                cfg = cm.snapshot
+                for _ in range(N): cfg.COLOR_PRIMARY
+
+            print(f"read      : dict.get {per_call_ns(read_legacy):.0f} ns, config_manager.get {per_call_ns(read_get):.0f} ns, "
+                  f"snapshot attribute {per_call_ns(read_snapshot):.0f} ns")
+
+            saves, notes = [], []
+            original_save = cm.save_to_file
+            cm.save_to_file = lambda: (saves.append(1), original_save())
+            cm.subscribe(lambda cfg, changed: notes.append(len(changed)))
+            version = cm.snapshot.version
+            t0 = time.perf_counter()
+            with cm.batch():
+                for i in range(20): cm.set(f"BENCH_KEY_{i}", i)
+            cm.flush()
+            elapsed = time.perf_counter() - t0
+            print(f"batch     : 20 sets in {elapsed * 1000:.2f} ms -> {cm.snapshot.version - version} snapshot rebuild, "
+                  f"{len(notes)} notification ({notes[0]} keys), {len(saves)} save")
+            assert cm.snapshot.version - version == 1 and notes == [20] and len(saves) == 1
+            assert os.path.exists(ConfigManager.CONFIG_FILE)
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
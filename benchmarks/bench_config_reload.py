@@ -0,0 +1,109 @@
+# benchmarks/bench_config_reload.py
+"""
+配置热重载测试：在临时目录中改写 config.json (含编辑器常用的"写临时文件再替换")，测量
+1. 监视器从文件变化到回调的延迟 (inotify 与轮询两种模式)；
+2. 重载后的增量重设：数百个假控件分别绑定不同配置键，只改一个颜色时只有绑定了它的控件被 configure，
+   且回写防抖不会因为重载而把文件写回去。
+用法：python benchmarks/bench_config_reload.py [控件数]
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import ConfigManager  # noqa: E402
+from src.config_watch import ConfigWatcher  # noqa: E402
+from src.theme import ThemeBinder  # noqa: E402
+
+
+class FakeWidget:
+    def __init__(self, master=None, **options):
+        self.options, self.calls, self.alive = dict(options), 0, True
+
+    def configure(self, **options):
+        self.options.update(options)
+        self.calls += 1
+
+    def winfo_exists(self): return self.alive
+
+
+def write_config(path, values, replace):
+    text = json.dumps(values, ensure_ascii=False, indent=4)
+    if replace:
+        with open(path + ".swp", "w", encoding="utf-8") as f: f.write(text)
+        os.replace(path + ".swp", path)
+    else:
+        with open(path, "w", encoding="utf-8") as f: f.write(text)
+
+
+def measure_latency(path, mode, rounds=5):
+    fired = threading.Event()
+    watcher = ConfigWatcher(path, fired.set, poll_interval=0.2)
+    if mode == "poll": watcher._open_inotify = lambda: None
+    watcher.start()
+    latencies = []
+    try:
+        for i in range(rounds):
+            fired.clear()
+            time.sleep(0.05)
+            t0 = time.perf_counter()
+            write_config(path, {"TITLE": f"round {i}"}, replace=i % 2 == 1)
+            assert fired.wait(5), f"{mode}: no change detected"
+            latencies.append(time.perf_counter() - t0)
+    finally:
+        watcher.stop()
+    print(f"watch {watcher.mode:>7}: avg {sum(latencies) / len(latencies) * 1000:.1f} ms, "
+          f"max {max(latencies) * 1000:.1f} ms (debounce {ConfigWatcher.DEBOUNCE * 1000:.0f} ms)")
+
+
+def measure_restyle(path, n_widgets):
+    ConfigManager.CONFIG_FILE = path
+    write_config(path, {"TITLE": "bench"}, replace=False)
+    cm = ConfigManager()
+    cm.reload()
+    cm.flush()
+    theme = ThemeBinder(cm)
+    keys = ["COLOR_PRIMARY", "COLOR_TEXT_MAIN", "COLOR_CARD_BG", "COLOR_BORDER", "TASK_FONT"]
+    widgets = [theme.make(FakeWidget, None, {"fg_color": keys[i % len(keys)], "font": "TASK_FONT"} if i % 10 == 0
+                          else {"fg_color": keys[i % len(keys)]}) for i in range(n_widgets)]
+    for w in widgets[::7]: w.alive = False  # 已销毁的控件应被跳过并清理
+
+    saves = []
+    original_save = cm.save_to_file
+    cm.save_to_file = lambda: (saves.append(1), original_save())
+    write_config(path, {"TITLE": "bench", "COLOR_PRIMARY": "#123456"}, replace=True)
+    t0 = time.perf_counter()
+    changed = cm.reload()
+    elapsed = time.perf_counter() - t0
+    cm.flush()
+
+    touched = [w for w in widgets if w.calls]
+    expected = [w for w in widgets if w.alive and w.options["fg_color"] == "#123456"]
+    print(f"restyle     : {n_widgets} bound widgets, changed {sorted(changed)} -> {len(touched)} configure calls "
+          f"in {elapsed * 1000:.2f} ms, saves after reload: {len(saves)}")
+    assert changed == {"COLOR_PRIMARY"} and touched == expected and not saves
+    assert cm.reload() == set()  # 再读一次没有变化
+
+    # 编辑器写到一半的非法 JSON：保持当前配置
+    with open(path, "w", encoding="utf-8") as f: f.write('{"COLOR_PRIMARY": ')
+    assert cm.reload() == set() and cm.snapshot.COLOR_PRIMARY == "#123456"
+    # 从文件中删掉的键回到默认值
+    write_config(path, {"TITLE": "bench"}, replace=True)
+    assert cm.reload() == {"COLOR_PRIMARY"} and cm.snapshot.COLOR_PRIMARY != "#123456"
+
+
+def main(n_widgets):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "config.json")
+        write_config(path, {}, replace=False)
+        measure_latency(path, "inotify")
+        measure_latency(path, "poll")
+        measure_restyle(path, n_widgets)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
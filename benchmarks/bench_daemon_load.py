@@ -0,0 +1,92 @@
+# benchmarks/bench_daemon_load.py
+"""
+守护进程负载测试：子进程启动 src.daemon，在一个进行中的番茄上让多个客户端持续轮询 status，
+统计吞吐、延迟与守护进程 CPU 占用 (由 info 命令报告的进程 CPU 时间)，并测空闲时的 CPU 占用。
+先按固定总速率轮询 (默认 500 次/秒，贴近多个界面 / 脚本同时刷新的场景)，再不限速测极限吞吐。
+用法：python benchmarks/bench_daemon_load.py [客户端数] [秒数] [总速率]
+"""
+import os
+import sys
+import time
+import tempfile
+import threading
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.daemon import DaemonClient  # noqa: E402
+
+
+def wait_for_socket(path, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path):
+        if time.monotonic() > deadline: raise TimeoutError("daemon did not start")
+        time.sleep(0.05)
+
+
+def poll(path, seconds, latencies, interval=0.0):
+    client = DaemonClient(path)
+    end = time.perf_counter() + seconds
+    next_at = time.perf_counter()
+    local = []
+    try:
+        while True:
+            t0 = time.perf_counter()
+            if t0 > end: break
+            reply = client.call("status")
+            local.append(time.perf_counter() - t0)
+            assert reply["ok"] and reply["state"] == "running", reply
+            if interval:
+                next_at += interval
+                time.sleep(max(0.0, next_at - time.perf_counter()))
+    finally:
+        client.close()
+    latencies.extend(local)
+
+
+def run_load(path, ctl, n_clients, seconds, rate):
+    latencies = []
+    interval = n_clients / rate if rate else 0.0
+    threads = [threading.Thread(target=poll, args=(path, seconds, latencies, interval)) for _ in range(n_clients)]
+    cpu0, t0 = ctl.call("info")["cpu"], time.perf_counter()
+    for t in threads: t.start()
+    for t in threads: t.join()
+    elapsed, cpu = time.perf_counter() - t0, ctl.call("info")["cpu"] - cpu0
+
+    latencies.sort()
+    n = len(latencies)
+    label = f"{rate}/s" if rate else "unlimited"
+    print(f"{label:>10}: {n_clients} clients, {n} polls in {elapsed:.2f} s = {n / elapsed:,.0f} polls/s, "
+          f"p50 {latencies[n // 2] * 1000:.3f} ms, p99 {latencies[int(n * 0.99)] * 1000:.3f} ms, "
+          f"daemon cpu {cpu / elapsed * 100:.1f}% ({cpu / n * 1e6:.1f} µs/poll)")
+
+
+def main(n_clients, seconds, rate):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.sock")
+        env = dict(os.environ, PYTHONPATH=ROOT)
+        proc = subprocess.Popen([sys.executable, "-m", "src.daemon", "serve", path], cwd=tmp, env=env,
+                                stdout=subprocess.DEVNULL)
+        try:
+            wait_for_socket(path)
+            ctl = DaemonClient(path)
+            assert ctl.call("start", 25, "压测")["ok"]
+
+            cpu0 = ctl.call("info")["cpu"]
+            time.sleep(3)
+            idle_cpu = ctl.call("info")["cpu"] - cpu0
+            print(f"      idle: daemon cpu {idle_cpu * 1000:.1f} ms over 3 s ({idle_cpu / 3 * 100:.3f}%)")
+
+            run_load(path, ctl, n_clients, seconds, rate)
+            run_load(path, ctl, n_clients, seconds, 0)
+            ctl.call("stop")
+            ctl.close()
+        finally:
+            proc.terminate()
+            proc.wait()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 8, float(sys.argv[2]) if len(sys.argv) > 2 else 5,
+         int(sys.argv[3]) if len(sys.argv) > 3 else 500)
@@ -0,0 +1,155 @@
+# benchmarks/bench_dst_buckets.py
+"""
+夏令时与时区切换下的分桶校验 (America/New_York)：
+1. 日历边界：2026-03-08 (春季跳变) 为 23 小时、2026-11-01 (秋季回拨) 为 25 小时，零点前后一秒分属两天，
+   小时桶数为 23 / 25，所在 ISO 周的桶长也相应少 / 多一小时；
+2. 每 30 分钟一条记录，JSON 扫描 / JSON 索引 / SQLite / 二进制四条路径按日汇总的结果与逐条 datetime 换算一致；
+3. 修改 config.json 的 TIMEZONE 并 reload 后，同一服务按新时区重新分桶 (索引重建并以新时区落盘)，
+   旧时区打开同一索引文件时也会识别时区不符而重建。
+用法：python benchmarks/bench_dst_buckets.py
+"""
+import os
+import sys
+import json
+import tempfile
+from collections import Counter
+from datetime import datetime, date, timezone
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import config_manager  # noqa: E402
+from src.core import JsonLinesRepository, HistoryIndex, HistoryService  # noqa: E402
+from src.time_buckets import BucketCalendar  # noqa: E402
+from src.binary_history import BinaryHistoryRepository  # noqa: E402
+from src.sqlite_store import SqliteDatabase, SqliteHistoryRepository  # noqa: E402
+
+NY = "America/New_York"
+HOUR = 3600
+DST_DAYS = {date(2026, 3, 8): 23, date(2026, 11, 1): 25}
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc).timestamp()
+
+
+def calendar_bounds():
+    cal = BucketCalendar(NY)
+    assert cal.day_start(date(2026, 3, 8)) == utc(2026, 3, 8, 5)   # EST 零点
+    assert cal.day_start(date(2026, 3, 9)) == utc(2026, 3, 9, 4)   # EDT 零点
+    assert cal.day_start(date(2026, 11, 1)) == utc(2026, 11, 1, 4)
+    assert cal.day_start(date(2026, 11, 2)) == utc(2026, 11, 2, 5)
+    for d, hours in DST_DAYS.items():
+        start = cal.day_start(d)
+        bounds, labels = cal.bucket_bounds(start - 1, start + 2 * 86400, "day")
+        lengths = [(b - a) / HOUR for a, b in zip(bounds, bounds[1:])]
+        assert labels[1] == d.isoformat() and lengths[:3] == [24, hours, 24], (d, lengths)
+        end = bounds[2]
+        assert cal.label(start - 1) != d.isoformat() and cal.label(start) == d.isoformat()
+        assert cal.label(end - 1) == d.isoformat() and cal.label(end) != d.isoformat()
+        assert cal.day_of(end - 1) == d and cal.date_of(end - 1) == d
+
+        h_bounds, h_labels = cal.bucket_bounds(start, end, "hour")
+        assert len(h_labels) == hours and h_bounds[-1] == end, (d, len(h_labels))
+        w_bounds, w_labels = cal.bucket_bounds(start, start + 1, "week")  # 两个跳变日都是周日，所在周以它结尾
+        assert (w_bounds[1] - w_bounds[0]) / HOUR == 7 * 24 - 24 + hours, (d, w_labels)
+    print("calendar   : 2026-03-08 is 23 h and 2026-11-01 is 25 h in America/New_York; day / hour / week "
+          "bounds and midnight labels match")
+
+
+def make_records():
+    """两个跳变日前后各两天，每 30 分钟一条 1 分钟的记录"""
+    records = []
+    for d in DST_DAYS:
+        first = utc(d.year, d.month, d.day) - 2 * 86400
+        for i in range(4 * 48):
+            ts = first + i * 1800.0
+            records.append({"timestamp": ts, "duration": 1, "tag": "💻 工作"})
+    return records
+
+
+def expected_days(records, tz_name):
+    tz = ZoneInfo(tz_name)
+    return Counter(datetime.fromtimestamp(r["timestamp"], tz).date().isoformat() for r in records)
+
+
+def query_days(service, records):
+    buckets = service.query(records[0]["timestamp"], records[-1]["timestamp"] + 1, "day")
+    return {b["label"]: b["minutes"] for b in buckets if b["minutes"]}
+
+
+def backends_agree(records):
+    cal = BucketCalendar(NY)
+    json_repo = JsonLinesRepository("dst.jsonl")
+    json_repo.save_all(records)
+    services = {
+        "json scan": HistoryService(json_repo, calendar=cal),
+        "json index": HistoryService(json_repo, HistoryIndex("dst.index.json", cal)),
+        "sqlite": HistoryService(SqliteHistoryRepository(SqliteDatabase("dst.db")), calendar=cal),
+        "binary": HistoryService(BinaryHistoryRepository("dst.bin", calendar=cal), calendar=cal),
+    }
+    for name in ("sqlite", "binary"): services[name].repo.save_all(records)
+    want = expected_days(records, NY)
+    assert want["2026-03-08"] == 46 and want["2026-11-01"] == 50, want
+    for name, service in services.items():
+        assert query_days(service, records) == want, name
+    index_service = services["json index"]
+    index_service._ensure_index()
+    assert {d: index_service.index.day[d] for d in want} == want
+    dates = {r["date"] for r in services["binary"].repo.load_all()}
+    assert dates == set(want), dates
+    print("backends   : json scan / json index / sqlite / binary give 46 min on 2026-03-08 and 50 min on "
+          "2026-11-01 (one record per 30 min)")
+
+
+def timezone_change(records):
+    repo = JsonLinesRepository("tz.jsonl")
+    repo.save_all(records)
+    with open("config.json", "w", encoding="utf-8") as f:
+        json.dump({"TIMEZONE": NY}, f)
+    config_manager.reload()
+    service = HistoryService(repo, HistoryIndex("tz.index.json", BucketCalendar(config_manager.get("TIMEZONE"))))
+    # 与界面相同：TIMEZONE 变化时切换服务的日历
+    unsubscribe = config_manager.subscribe(lambda cfg, changed: service.set_calendar(BucketCalendar(cfg.TIMEZONE)),
+                                           {"TIMEZONE"})
+    try:
+        service._ensure_index()
+        assert service.index.day == expected_days(records, NY)
+
+        with open("config.json", "w", encoding="utf-8") as f:
+            json.dump({"TIMEZONE": "Asia/Tokyo"}, f)
+        assert config_manager.reload() == {"TIMEZONE"}
+        want = expected_days(records, "Asia/Tokyo")
+        assert query_days(service, records) == want
+        service._ensure_index()
+        assert service.index.day == want
+        with open("tz.index.json", encoding="utf-8") as f:
+            assert json.load(f)["tz"] == "Asia/Tokyo"
+
+        # 另一个进程仍按旧时区打开同一索引文件：时区不符，重建而不是沿用东京的分桶
+        stale = HistoryService(repo, HistoryIndex("tz.index.json", BucketCalendar(NY)))
+        stale._ensure_index()
+        assert stale.index.day == expected_days(records, NY)
+    finally:
+        unsubscribe()
+        os.remove("config.json")
+        config_manager.reload()
+    print("timezone   : TIMEZONE America/New_York -> Asia/Tokyo via config reload re-buckets queries and the "
+          "persisted index; a stale-zone index is rebuilt on open")
+
+
+def main():
+    calendar_bounds()
+    records = make_records()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            backends_agree(records)
+            timezone_change(records)
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main()
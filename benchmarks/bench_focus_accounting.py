@@ -0,0 +1,178 @@
+# benchmarks/bench_focus_accounting.py
+"""
+实际专注时长与打断统计：
+1. 假时钟驱动计时引擎：暂停、重置、提前停止、系统休眠与按时完成，核对区间日志得出的专注秒数与打断次数；
+2. 同一批历史 (旧格式记录与带 focused / interruptions 的新记录混合) 在 JSON 扫描、JSON 索引、SQLite、
+   二进制四种路径下的 get_stats 结果一致，会话数 / 打断率与逐条手算相同；
+3. 二进制后端逐条保留会话明细 (planned / focused / interruptions / completed)，与 JSON 读回的记录相同，
+   提前结束的会话在最近记录里仍是 completed=False；版本 1 文件 (无明细列) 打开时迁移为版本 2，原有字段不变；
+4. 扫描路径的逐条开销：全是旧记录 vs 全是新记录的 get_stats 耗时对比。
+用法：python benchmarks/bench_focus_accounting.py [记录数]
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+import struct
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core import MonotonicTimerEngine, JsonLinesRepository, HistoryIndex, HistoryService  # noqa: E402
+from src.binary_history import BinaryHistoryRepository, HEADER, MAGIC, RECORD_V1  # noqa: E402
+from src.sqlite_store import SqliteDatabase, SqliteHistoryRepository  # noqa: E402
+
+TAGS = ["💻 工作", "📚 学习", "🏃 运动"]
+
+
+class FakeClock:
+    def __init__(self): self.mono, self.wall = 1000.0, 1_700_000_000.0
+
+    def advance(self, seconds, suspended=False):
+        """suspended：系统休眠，单调时钟不走"""
+        self.wall += seconds
+        if not suspended: self.mono += seconds
+
+
+def engine_cases():
+    clock = FakeClock()
+    new = lambda minutes: MonotonicTimerEngine(minutes, clock=lambda: clock.mono, wall_clock=lambda: clock.wall)
+
+    e = new(25)
+    e.start(); clock.advance(300)                  # 专注 5 分钟
+    e.pause_toggle(); clock.advance(180)           # 暂停 3 分钟 (不计)
+    e.pause_toggle(); clock.advance(240)           # 再专注 4 分钟
+    e.reset(); clock.advance(60)                   # 重置后停在暂停状态 1 分钟 (不计)
+    e.pause_toggle(); clock.advance(120)           # 专注 2 分钟
+    e.stop()                                       # 提前停止
+    s = e.summary()
+    print(f"interrupted : {s['focused'] / 60:.0f} min focused of 25 planned, {s['interruptions']} interruptions, "
+          f"{len(e.intervals)} intervals logged")
+    assert s == {"focused": 660.0, "interruptions": 3, "completed": False}, s
+
+    e = new(25)
+    e.start(); clock.advance(600)
+    clock.advance(600, suspended=True)             # 休眠 10 分钟：与倒计时一致，计入专注
+    assert not e.tick()[0]
+    clock.advance(e.remaining_seconds() + 3)       # 回调晚到 3 秒
+    assert e.tick()[0]
+    s = e.summary()
+    print(f"completed   : {s['focused'] / 60:.0f} min focused (suspend included, late callback excluded), "
+          f"{s['interruptions']} interruptions")
+    assert s == {"focused": 1500.0, "interruptions": 0, "completed": True}, s
+
+
+def make_records(n, rich):
+    """过去 40 天内均匀分布的记录；rich 时带会话明细 (约三成提前结束)"""
+    rng, now = random.Random(3), time.time()
+    records = []
+    for i in range(n):
+        ts = now - 40 * 86400 + 40 * 86400 * i / n
+        rec = {"timestamp": ts, "duration": 25, "tag": rng.choice(TAGS)}
+        if rich and i % 2 == 0:
+            completed = rng.random() > 0.3
+            focused = 1500.0 if completed else round(rng.uniform(60, 1400), 1)
+            rec.update(duration=round(focused / 60), planned=25, focused=focused,
+                       interruptions=rng.randint(0, 2) + (0 if completed else 1), completed=completed)
+        records.append(rec)
+    return records
+
+
+def expected_counts(records, service):
+    p = service._periods(time.time())
+    counts = {}
+    for g, start in (("day", p["today"]), ("week", p["week"]), ("month", p["month"])):
+        window = [r for r in records if start <= r["timestamp"] < p["tomorrow"]]
+        counts[g] = (len(window), sum(r.get("interruptions", 0) for r in window))
+    return counts
+
+
+def backends_agree(n):
+    records = make_records(n, rich=True)
+    json_repo = JsonLinesRepository("history.jsonl")
+    json_repo.save_all(records)
+    services = {
+        "json scan": HistoryService(json_repo),
+        "json index": HistoryService(json_repo, HistoryIndex("history.index.json")),
+        "sqlite": HistoryService(SqliteHistoryRepository(SqliteDatabase("history.db"))),
+        "binary": HistoryService(BinaryHistoryRepository("history.bin")),
+    }
+    for name in ("sqlite", "binary"): services[name].repo.save_all(records)
+
+    results = {name: s.get_stats() for name, s in services.items()}
+    want = expected_counts(records, services["json scan"])
+    for name, stats in results.items():
+        got = {g: (stats["sessions"][g], stats["interruptions"][g]) for g in want}
+        assert got == want, (name, got, want)
+        assert {k: stats[k] for k in ("day", "week", "month")} == \
+               {k: results["json scan"][k] for k in ("day", "week", "month")}, name
+    week = results["json scan"]
+    print(f"backends    : json scan / json index / sqlite / binary agree on {n:,} records — this week "
+          f"{week['sessions']['week']} sessions, {week['interruptions']['week']} interruptions, "
+          f"rate {week['interruption_rate']['week']:.2f}/session")
+
+
+def without_date(records):
+    return sorted(({k: v for k, v in r.items() if k != "date"} for r in records), key=lambda r: r["timestamp"])
+
+
+def binary_detail(n):
+    records = make_records(n, rich=True)
+    repo = BinaryHistoryRepository("detail.bin")
+    repo.save_all(records[:n // 2])
+    for rec in records[n // 2:n // 2 + 100]: repo.append(rec)
+    repo.append_many(records[n // 2 + 100:])
+    assert without_date(repo.load_all()) == without_date(records)
+    stopped = [r for r in repo.recent(50) if r.get("completed") is False]
+    assert stopped and all(r["duration"] < r["planned"] for r in stopped)
+
+    # 版本 1 文件：16 字节记录，只有时间戳 / 时长 / 标签 / 打断次数
+    header = bytearray(HEADER.pack(MAGIC, 1, RECORD_V1.size, 4096, len(TAGS)))
+    for tag in TAGS: header += bytes([len(tag.encode())]) + tag.encode()
+    header += b"\0" * (4096 - len(header))
+    legacy = sorted(records, key=lambda r: r["timestamp"])
+    with open("legacy.bin", "wb") as f:
+        f.write(header + b"".join(RECORD_V1.pack(r["timestamp"], r["duration"], TAGS.index(r["tag"]),
+                                                 r.get("interruptions", 0)) for r in legacy))
+    migrated = BinaryHistoryRepository("legacy.bin")
+    with open("legacy.bin", "rb") as f:
+        assert struct.unpack("<H", f.read(6)[4:])[0] == 2
+    want = [{k: v for k, v in r.items() if k in ("timestamp", "duration", "tag", "interruptions")
+             and (k != "interruptions" or v)} for r in legacy]
+    assert without_date(migrated.load_all()) == want
+    print(f"binary      : {n:,} records keep planned / focused / interruptions / completed "
+          f"({len(stopped)} stopped-early in the last 50); v1 file migrated to v2 with fields intact")
+
+
+def scan_cost(n):
+    timings = {}
+    for rich in (False, True):
+        repo = JsonLinesRepository(f"cost-{rich}.jsonl")
+        repo.save_all(make_records(n, rich))
+        service = HistoryService(repo)
+        service.get_stats()
+        best = float("inf")
+        for _ in range(5):
+            t0 = time.perf_counter()
+            service.get_stats()
+            best = min(best, time.perf_counter() - t0)
+        timings[rich] = best
+    print(f"scan cost   : {n:,} records, legacy {timings[False] * 1000:.2f} ms vs with session detail "
+          f"{timings[True] * 1000:.2f} ms ({timings[True] / timings[False]:.2f}x)")
+
+
+def main(n):
+    engine_cases()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            backends_agree(min(n, 20_000))
+            binary_detail(min(n, 20_000))
+            scan_cost(n)
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,73 @@
+# benchmarks/bench_history_stats.py
+"""
+HistoryService.get_stats 基准：全量扫描 vs 聚合索引。
+record 为连续 RECORDS 次 record_focus 的平均耗时 (索引每 SAVE_EVERY 条落盘一次，已计入)；
+之后新开的服务读取落盘索引并从历史文件尾部补齐，结果须与全量扫描一致。
+用法：python benchmarks/bench_history_stats.py [记录数 ...]   (默认 10000 100000 1000000)
+"""
+import os
+import sys
+import time
+import random
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core import JsonLinesRepository, HistoryIndex, HistoryService  # noqa: E402
+
+TAGS = ["💻 工作", "📚 学习", "🏃 运动", "📖 阅读", "☕ 摸鱼"]
+RECORDS = 200
+
+
+def make_records(n):
+    """生成 n 条均匀分布在过去约 3 年内的模拟记录 (按时间升序)"""
+    now = time.time()
+    span = 3 * 365 * 86400
+    records = []
+    for i in range(n):
+        ts = now - span + span * i / n
+        records.append({"date": datetime.fromtimestamp(ts).strftime("%Y-%m-%d"), "timestamp": ts,
+                        "duration": random.choice((15, 25, 45, 60)), "tag": random.choice(TAGS)})
+    return records
+
+
+def timed(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(n):
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        repo = JsonLinesRepository("history.jsonl")
+        repo.save_all(make_records(n))
+
+        scan = HistoryService(repo)
+        indexed = HistoryService(repo, HistoryIndex("history.index.json"))
+
+        t_scan = timed(scan.get_stats, repeat=3)
+        t0 = time.perf_counter()
+        indexed.get_stats()  # 首次调用：构建并持久化索引
+        t_build = time.perf_counter() - t0
+        t_hot = timed(indexed.get_stats)
+        t0 = time.perf_counter()
+        for _ in range(RECORDS): indexed.record_focus(25, TAGS[0])
+        t_record = (time.perf_counter() - t0) / RECORDS
+        assert scan.get_stats() == indexed.get_stats()
+        reopened = HistoryService(JsonLinesRepository("history.jsonl"), HistoryIndex("history.index.json"))
+        assert reopened.get_stats() == scan.get_stats()
+        indexed.flush()
+        os.chdir(os.path.dirname(tmp))
+
+    print(f"{n:>9,d} | scan {t_scan * 1000:10.2f} ms | index build {t_build * 1000:10.2f} ms | "
+          f"indexed {t_hot * 1000:8.3f} ms | record {t_record * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    for size in sizes: run(size)
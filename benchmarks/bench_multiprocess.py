@@ -0,0 +1,125 @@
+# benchmarks/bench_multiprocess.py
+"""
+多实例并发写入测试：N 个进程同时对同一组文件反复 add_task 与 record_focus
+(模拟同时打开的多个应用实例 / 同步工具)，结束后核对任务数与历史记录数，
+确认没有丢失写入、落盘的聚合索引与按历史文件重新构建的结果一致，
+并统计单次操作耗时、等锁时间与单次 update 的重试次数 (不超过 MAX_RETRIES)；
+随后 N 个进程同时向同一个二进制历史文件追加 (含新标签与时间倒序触发的整体重写)，
+核对记录数、各标签条数、时间有序与记录对齐。
+用法：python benchmarks/bench_multiprocess.py [进程数] [每进程操作数] [--write-behind]
+"""
+import os
+import sys
+import time
+import tempfile
+from collections import Counter
+import multiprocessing as mp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core import (TaskService, HistoryService, HistoryIndex, JsonRepository, JsonLinesRepository,  # noqa: E402
+                      WriteBehindRepository)
+from src.binary_history import BinaryHistoryRepository, RECORD  # noqa: E402
+
+
+def worker(workdir, worker_id, n_ops, write_behind, results):
+    os.chdir(workdir)
+    task_repo = JsonRepository("tasks.json")
+    tasks = TaskService(WriteBehindRepository(task_repo, delay=0.01) if write_behind else task_repo)
+    history_repo = JsonLinesRepository("focus_history.jsonl")
+    history = HistoryService(history_repo, HistoryIndex("focus_history.index.json"))
+
+    latencies, max_retries = [], 0
+    for i in range(n_ops):
+        t0 = time.perf_counter()
+        tasks.add_task(f"w{worker_id}-{i}")
+        history.record_focus(1, f"w{worker_id}")
+        latencies.append(time.perf_counter() - t0)
+        max_retries = max(max_retries, task_repo.last_retries)
+    if write_behind: tasks.repo.flush()
+    history.flush()  # 子进程退出不执行 atexit，显式把索引增量落盘
+    results.put((worker_id, latencies, max(task_repo.lock.max_wait, history_repo.lock.max_wait),
+                 (task_repo.conflicts + history_repo.conflicts, task_repo.locked_updates, max_retries)))
+
+
+def binary_worker(workdir, worker_id, n_ops):
+    os.chdir(workdir)
+    repo = BinaryHistoryRepository("focus_history.bin")
+    for i in range(n_ops):
+        # 每进程三个新标签；每 25 条一条时间倒序的记录，走整体重写
+        ts = time.time() - (3600 if i % 25 == 24 else 0)
+        repo.append({"timestamp": ts, "duration": 1, "tag": f"b{worker_id}-{i % 3}"})
+
+
+def binary_append(n_procs, n_ops):
+    with tempfile.TemporaryDirectory() as tmp:
+        procs = [mp.Process(target=binary_worker, args=(tmp, i, n_ops)) for i in range(n_procs)]
+        t0 = time.perf_counter()
+        for p in procs: p.start()
+        for p in procs: p.join()
+        elapsed = time.perf_counter() - t0
+        repo = BinaryHistoryRepository(os.path.join(tmp, "focus_history.bin"))
+        records = repo.load_all()
+        aligned = (os.path.getsize(repo.file_path) - repo.data_offset) % RECORD.size == 0
+    want = Counter({f"b{w}-{k}": len(range(k, n_ops, 3)) for w in range(n_procs) for k in range(3)})
+    got = Counter(r["tag"] for r in records)
+    ordered = all(a["timestamp"] <= b["timestamp"] for a, b in zip(records, records[1:]))
+    print(f"  binary  : {len(records)} / {n_procs * n_ops} appends from {n_procs} processes in {elapsed:.2f} s, "
+          f"tags {'match' if got == want else 'differ'}, ordered {ordered}, aligned {aligned}")
+    assert len(records) == n_procs * n_ops and got == want and ordered and aligned
+    assert all(p.exitcode == 0 for p in procs)
+
+
+def compare_index(history, source):
+    """落盘索引与全量重建逐表比较，返回不一致的表名"""
+    persisted, fresh = HistoryIndex("focus_history.index.json"), HistoryIndex("unused.index.json")
+    if not persisted.load(): return ["missing"]
+    fresh.rebuild(history, source)
+    return [name for name in ("source", "day", "week", "month", "tag", "week_tag", "sessions")
+            if getattr(persisted, name) != getattr(fresh, name)]
+
+
+def main(n_procs, n_ops, write_behind):
+    with tempfile.TemporaryDirectory() as tmp:
+        results = mp.Queue()
+        procs = [mp.Process(target=worker, args=(tmp, i, n_ops, write_behind, results)) for i in range(n_procs)]
+        t0 = time.perf_counter()
+        for p in procs: p.start()
+        collected = [results.get() for _ in procs]
+        for p in procs: p.join()
+        elapsed = time.perf_counter() - t0
+
+        os.chdir(tmp)
+        tasks = JsonRepository("tasks.json").load_all()
+        history_repo = JsonLinesRepository("focus_history.jsonl")
+        history = history_repo.load_all()
+        index_diff = compare_index(history, HistoryService(history_repo)._source_signature())
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+    expected = n_procs * n_ops
+    titles = {t["title"] for t in tasks}
+    lost_tasks = expected - len(titles)
+    lost_history = expected - len(history)
+    latencies = sorted(l for _, lat, _, _ in collected for l in lat)
+    max_wait = max(w for _, _, w, _ in collected)
+    conflicts = sum(c[0] for _, _, _, c in collected)
+    locked = sum(c[1] for _, _, _, c in collected)
+    max_retries = max(c[2] for _, _, _, c in collected)
+
+    mode = "write-behind" if write_behind else "direct"
+    print(f"{n_procs} processes x {n_ops} ops ({mode}) in {elapsed:.2f} s")
+    print(f"  tasks   : {len(tasks)} / {expected} (lost {lost_tasks}), version conflicts retried: {conflicts}, "
+          f"max retries per update {max_retries}, finished under write lock: {locked}")
+    print(f"  history : {len(history)} / {expected} (lost {lost_history}), persisted index vs rebuild: "
+          f"{', '.join(index_diff) or 'identical'}")
+    print(f"  op time : p50 {latencies[len(latencies) // 2] * 1000:.2f} ms, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:.2f} ms, max lock wait {max_wait * 1000:.2f} ms")
+    assert lost_tasks == 0 and lost_history == 0 and len(tasks) == expected
+    assert not index_diff, index_diff
+    assert max_retries <= JsonRepository.MAX_RETRIES
+    binary_append(n_procs, n_ops)
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    main(int(args[0]) if args else 8, int(args[1]) if len(args) > 1 else 100, "--write-behind" in sys.argv)
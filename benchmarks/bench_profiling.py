@@ -0,0 +1,86 @@
+# benchmarks/bench_profiling.py
+"""
+埋点开销测试：
+1. 空函数经 @traced 包装后的单次调用开销 (关闭 / 开启)；
+2. 真实工作负载 (任务增删改 + 记录专注 + 统计快照，临时目录中的 JSON 仓储) 关闭与开启埋点的耗时对比；
+3. 开启时导出 Chrome Trace 并校验结构，打印汇总表。
+用法：python benchmarks/bench_profiling.py [操作轮数]
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.profiling import profiler, traced  # noqa: E402
+from src.core import TaskService, HistoryService, HistoryIndex, JsonRepository, JsonLinesRepository  # noqa: E402
+
+
+def noop(): pass
+
+
+traced_noop = traced("bench.noop")(noop)
+
+
+def per_call_ns(fn, n=200_000):
+    t0 = time.perf_counter_ns()
+    for _ in range(n): fn()
+    return (time.perf_counter_ns() - t0) / n
+
+
+def workload(rounds):
+    tasks = TaskService(JsonRepository("tasks.json"))
+    history = HistoryService(JsonLinesRepository("focus_history.jsonl"), HistoryIndex("focus_history.index.json"))
+    t0 = time.perf_counter()
+    for i in range(rounds):
+        tasks.add_task(f"task {i}")
+        task_id = tasks.get_tasks()[0]["id"]
+        tasks.toggle_task(task_id)
+        history.record_focus(25, "bench")
+        history.get_snapshot()
+        if i % 3 == 0: tasks.delete_task(task_id)
+    return time.perf_counter() - t0
+
+
+def run_in_tmp(rounds):
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            return workload(rounds)
+        finally:
+            os.chdir(cwd)
+
+
+def main(rounds):
+    profiler.configure(False)
+    base, off = per_call_ns(noop), per_call_ns(traced_noop)
+    profiler.configure(True)
+    on = per_call_ns(traced_noop)
+    profiler.reset()
+    print(f"per call  : plain {base:.0f} ns, traced off {off:.0f} ns (+{off - base:.0f}), "
+          f"traced on {on:.0f} ns (+{on - base:.0f})")
+
+    profiler.configure(False)
+    run_in_tmp(rounds)  # 预热 (导入、文件系统缓存)
+    t_off = min(run_in_tmp(rounds) for _ in range(3))
+    profiler.configure(True)
+    t_on = min(run_in_tmp(rounds) for _ in range(3))
+    print(f"workload  : {rounds} rounds, off {t_off * 1000:.1f} ms, on {t_on * 1000:.1f} ms "
+          f"({(t_on / t_off - 1) * 100:+.1f}%)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = profiler.export(os.path.join(tmp, "trace.json"))
+        with open(path, encoding="utf-8") as f:
+            doc = json.load(f)
+    spans = [e for e in doc["traceEvents"] if e["ph"] == "X"]
+    assert spans and all(e["dur"] >= 0 and "ts" in e for e in spans)
+    assert doc["otherData"]["histograms"]["service.history.snapshot"]["count"] == rounds * 3
+    print(f"trace     : {len(doc['traceEvents'])} events ({len(spans)} spans)\n")
+    print(profiler.report())
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
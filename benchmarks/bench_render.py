@@ -0,0 +1,91 @@
+# benchmarks/bench_render.py
+"""
+计时渲染开销：模拟一个完整番茄 (每秒一次 tick，中途暂停一次)，统计下发给 Tk 的控件调用次数。
+旧做法每次 tick 重设全部控件；渲染调度器只下发变化的值 (时间文本每秒变、进度按像素量化、其余只在状态切换时变)。
+用法：python benchmarks/bench_render.py [分钟数]
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.render import RenderScheduler  # noqa: E402
+
+PROGRESS_STEPS = 300
+MSGS = {"start": "开始", "focus": "专注", "end": "收尾"}
+
+
+class FakeRoot:
+    """after_idle 的回调在本轮"事件处理"结束时统一执行"""
+
+    def __init__(self): self.idle = []
+
+    def after_idle(self, fn): self.idle.append(fn)
+
+    def after(self, ms, fn): self.idle.append(fn)
+
+    def run_idle(self):
+        pending, self.idle = self.idle, []
+        for fn in pending: fn()
+
+
+class CountingMini:
+    def __init__(self): self.calls = 0
+
+    def set_time(self, _): self.calls += 1
+
+    def set_progress(self, _): self.calls += 1
+
+    def set_message(self, _): self.calls += 1
+
+    def update_state(self, _): self.calls += 5  # 边框 / 时间颜色 / 进度条颜色 / 按钮文字与颜色
+
+
+def message(progress, paused):
+    if paused: return "⏸ 暂停"
+    return MSGS["start"] if progress < 0.1 else (MSGS["end"] if progress > 0.9 else MSGS["focus"])
+
+
+def session_ticks(minutes):
+    """逐秒产生 (时间文本, 进度, 是否暂停)，在 1/3 处暂停 60 秒"""
+    total, left = minutes * 60, minutes * 60
+    pause_at, pause_left = total // 3, 60
+    while left >= 0:
+        paused = left == total - pause_at and pause_left > 0
+        if paused: pause_left -= 1
+        else: left -= 1
+        m, s = divmod(max(left, 0), 60)
+        yield f"{m:02d}:{s:02d}", 1 - max(left, 0) / total, paused
+
+
+def run_naive(minutes):
+    mini = CountingMini()
+    for text, progress, paused in session_ticks(minutes):
+        mini.set_time(text)
+        mini.set_progress(progress); mini.set_message(message(progress, paused)); mini.calls += 1  # 进度条颜色
+        mini.update_state(paused)
+    return mini.calls
+
+
+def run_scheduled(minutes):
+    mini, root = CountingMini(), FakeRoot()
+    r = RenderScheduler(root)
+    ticks = 0
+    for text, progress, paused in session_ticks(minutes):
+        r.set("time", text, mini.set_time)
+        r.set("mini.paused", paused, mini.update_state)
+        r.set("mini.progress", round(progress * PROGRESS_STEPS) / PROGRESS_STEPS, mini.set_progress)
+        r.set("mini.message", message(progress, paused), mini.set_message)
+        root.run_idle()
+        ticks += 1
+    return mini.calls, ticks, r
+
+
+if __name__ == "__main__":
+    minutes = int(sys.argv[1]) if len(sys.argv) > 1 else 25
+    naive = run_naive(minutes)
+    calls, ticks, r = run_scheduled(minutes)
+    print(f"{minutes} min session, {ticks} ticks")
+    print(f"  naive     : {naive:6d} widget calls ({naive / ticks:.2f} / tick)")
+    print(f"  scheduled : {calls:6d} widget calls ({calls / ticks:.2f} / tick)")
+    print(f"  {r.report()}")
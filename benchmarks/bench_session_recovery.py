@@ -0,0 +1,150 @@
+# benchmarks/bench_session_recovery.py
+"""
+会话检查点与崩溃恢复：
+1. 真实进程：启动守护进程开始一个会话，暂停 / 继续后 SIGKILL，重启后核对会话被接着计时 (剩余时间连续)；
+2. 假时钟：长时间中断 (超过 RESUME_GRACE) 后启动，核对按实际专注时长 (计到最后一次心跳) 补记历史、
+   暂停期间不计入、检查点被删除；
+3. 开销：每次状态变化的写入耗时 (含 fsync)、交给写线程时调用线程 (界面) 的耗时与落盘后的内容，
+   以及在 N 条历史记录存在时 recover() 的耗时 (应与 N 无关)。
+用法：python benchmarks/bench_session_recovery.py [历史记录数]
+"""
+import os
+import sys
+import time
+import signal
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.core import SessionCheckpoint, JsonLinesRepository  # noqa: E402
+from src.daemon import DaemonClient  # noqa: E402
+from src.workers import ServiceExecutor  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self): self.now = 1_700_000_000.0
+
+    def __call__(self): return self.now
+
+
+class FakeHistory:
+    def __init__(self): self.records = []
+
+    def record_focus(self, minutes, tag, timestamp=None, session=None):
+        self.records.append((round(session["focused"] / 60), tag, timestamp, session["interruptions"]))
+
+
+def spawn_daemon(tmp, path):
+    proc = subprocess.Popen([sys.executable, "-m", "src.daemon", "serve", path], cwd=tmp,
+                            env=dict(os.environ, PYTHONPATH=ROOT), stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            return proc, DaemonClient(path)
+        except OSError:
+            if time.monotonic() > deadline: raise
+            time.sleep(0.05)
+
+
+def kill(proc, client):
+    client.close()
+    proc.send_signal(signal.SIGKILL)
+    proc.wait()
+
+
+def real_process_crash(tmp):
+    path = os.path.join(tmp, "d.sock")
+    proc, c = spawn_daemon(tmp, path)
+    c.call("start", 10, "恢复测试")
+    time.sleep(0.5)
+    before = c.call("pause")["remaining"]
+    assert os.path.exists(os.path.join(tmp, "daemon.checkpoint.jsonl"))
+    kill(proc, c)
+
+    proc, c = spawn_daemon(tmp, path)
+    s = c.call("status")
+    assert s["state"] == "paused" and abs(s["remaining"] - before) < 0.01, (s, before)
+    after_resume = c.call("pause")["remaining"]
+    time.sleep(0.5)
+    kill(proc, c)
+    time.sleep(0.3)
+
+    proc, c = spawn_daemon(tmp, path)
+    s = c.call("status")
+    elapsed = after_resume - s["remaining"]
+    print(f"daemon kill : paused session resumed paused (remaining {s['remaining']:.1f} s); "
+          f"running session resumed running, downtime counted as focus ({elapsed:.2f} s elapsed)")
+    assert s["state"] == "running" and 0.7 < elapsed < 5, s
+    c.call("stop")
+    kill(proc, c)
+    # 守护进程只用自己的检查点，不碰界面的
+    assert not os.path.exists(os.path.join(tmp, "daemon.checkpoint.jsonl"))
+    assert not os.path.exists(os.path.join(tmp, "session.checkpoint.jsonl"))
+
+
+def long_outage(tmp):
+    clock, history = FakeClock(), FakeHistory()
+    cp = SessionCheckpoint(os.path.join(tmp, "fake.jsonl"), clock=clock)
+    cp.start(25, "📚 学习")
+    clock.now += 300; cp.pause()          # 专注 5 分钟
+    clock.now += 600; cp.resume(20 * 60)  # 暂停 10 分钟 (不计)
+    for _ in range(7):                    # 再专注 7 分钟，每分钟一次心跳，然后进程消失
+        clock.now += 60; cp.heartbeat()
+        os.utime(cp.file_path, (clock.now, clock.now))  # 假时钟下由测试代为设置修改时间
+    last_alive = clock.now
+    clock.now += 3 * 3600                 # 三小时后才重新启动
+
+    result = cp.recover(history)
+    # 一次暂停 + 进程中断时未完成 = 2 次打断
+    assert result["action"] == "recorded" and history.records == [(12, "📚 学习", last_alive, 2)], (result, history.records)
+    assert not os.path.exists(cp.file_path) and cp.recover(history) is None
+    print(f"long outage : recorded {result['focused_minutes']} of 25 planned minutes (pause excluded), "
+          f"stamped at the last heartbeat, checkpoint removed")
+
+
+def costs(tmp, n_history):
+    cp = SessionCheckpoint(os.path.join(tmp, "cost.jsonl"))
+    t0 = time.perf_counter()
+    cp.start(25, "x")
+    for _ in range(10): cp.pause(); cp.resume(1000)
+    write_ms = (time.perf_counter() - t0) / 21 * 1000
+
+    executor = ServiceExecutor()
+    queued = SessionCheckpoint(os.path.join(tmp, "queued.jsonl"), submit=executor.write)
+    t0 = time.perf_counter()
+    queued.start(25, "x")
+    for _ in range(10): queued.pause(); queued.resume(1000)
+    caller_ms = (time.perf_counter() - t0) / 21 * 1000
+    executor.flush()
+    state = queued.load()
+    assert state is not None and state["interruptions"] == 10 and state["running_since"] is not None, state
+    executor.shutdown()
+
+    os.chdir(tmp)
+    journal = JsonLinesRepository("focus_history.jsonl")
+    journal.save_all([{"date": "2024-01-01", "timestamp": 1_700_000_000 + i, "duration": 25, "tag": "t"}
+                      for i in range(n_history)])
+    t0 = time.perf_counter()
+    result = cp.recover(FakeHistory())
+    recover_ms = (time.perf_counter() - t0) * 1000
+    with open(cp.file_path, encoding="utf-8") as f: lines = len(f.readlines())
+    print(f"cost        : {write_ms:.2f} ms per state change (fsync), {caller_ms:.3f} ms on the caller thread "
+          f"with a writer thread (same 21 events on disk), recover {recover_ms:.3f} ms "
+          f"with {n_history:,} history records ({lines} checkpoint lines) -> {result['action']}")
+
+
+def main(n_history):
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            real_process_crash(tmp)
+            long_outage(tmp)
+            costs(tmp, n_history)
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,77 @@
+# benchmarks/bench_startup.py
+"""
+冷启动基准：
+1. import 耗时：python -X importtime -c "import src.ui"，汇总各模块累计耗时
+2. 首帧耗时：新进程中创建 PomodoroApp 并完成第一次绘制 (root.update) 所需时间，需要图形环境
+   (CI 中可用 xvfb-run 运行)
+用法：python benchmarks/bench_startup.py [--runs N] [--max-ms 毫秒]   超过阈值时退出码为 1，便于 CI 卡口
+"""
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_FRAME_SNIPPET = """
+import time
+t0 = time.perf_counter()
+from src.ui import PomodoroApp
+t_import = time.perf_counter()
+app = PomodoroApp()
+app.root.update()
+t_frame = time.perf_counter()
+print(f"{(t_import - t0) * 1000:.1f} {(t_frame - t0) * 1000:.1f}")
+app.root.destroy()
+"""
+
+
+def import_profile(top=8):
+    """返回 (总耗时 ms, 最慢的若干个模块 [(累计 ms, 模块名)])"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import src.ui"], cwd=ROOT,
+                          capture_output=True, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        m = re.match(r"import time:\s+\d+\s+\|\s+(\d+)\s+\|(\s*)(\S+)", line)
+        if m: rows.append((int(m.group(1)) / 1000, len(m.group(2)), m.group(3)))
+    if proc.returncode != 0 or not rows: return None, proc.stderr.strip().splitlines()[-1:]
+    total = sum(ms for ms, depth, _ in rows if depth == 1)
+    slowest = sorted(((ms, name) for ms, _, name in rows), reverse=True)[:top]
+    return total, slowest
+
+
+def first_frame(runs):
+    """返回每次运行的 (import ms, 首帧 ms)；无图形环境时返回 None"""
+    results = []
+    for _ in range(runs):
+        proc = subprocess.run([sys.executable, "-c", FIRST_FRAME_SNIPPET], cwd=ROOT, capture_output=True, text=True)
+        if proc.returncode != 0: return None
+        t_import, t_frame = map(float, proc.stdout.split())
+        results.append((t_import, t_frame))
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=None, help="首帧耗时中位数上限")
+    args = parser.parse_args()
+
+    total, slowest = import_profile()
+    if total is None:
+        print(f"import src.ui 失败：{slowest}")
+    else:
+        print(f"import src.ui 累计 {total:.1f} ms，最慢模块：")
+        for ms, name in slowest: print(f"  {ms:8.1f} ms  {name}")
+
+    frames = first_frame(args.runs)
+    if frames is None:
+        print("首帧：无法创建窗口 (缺少图形环境或依赖)，已跳过")
+        sys.exit(0)
+    median = sorted(f for _, f in frames)[len(frames) // 2]
+    print(f"首帧耗时 (中位数 / {args.runs} 次)：{median:.1f} ms  "
+          f"[import {sorted(i for i, _ in frames)[len(frames) // 2]:.1f} ms]")
+    if args.max_ms is not None and median > args.max_ms:
+        print(f"超过阈值 {args.max_ms:.0f} ms")
+        sys.exit(1)
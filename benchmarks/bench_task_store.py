@@ -0,0 +1,134 @@
+# benchmarks/bench_task_store.py
+"""
+TaskService 基准：
+1. 线性查找 + 每次全量排序 (旧实现) vs TaskStore 索引；
+2. 单次修改 (toggle / add / delete) 的开销随任务数的变化，按层拆开：
+   store     只更新 TaskStore 索引 (O(log n) 定位 + 列表插删)；
+   snapshot  经 TaskService 修改，含交给仓储的新列表 (to_list，O(n) 复制)；
+   json      WriteBehindRepository + JsonRepository 时调用方承担的部分 (与 snapshot 相同，落盘在后台)，
+             以及后台一次落盘 (整体序列化 + fsync) 的耗时，合并窗口内的多次修改只落盘一次；
+   sqlite    SqliteTaskRepository 按行增量写入。
+用法：python benchmarks/bench_task_store.py [任务数 ...]   (默认 1000 10000 100000)
+"""
+import os
+import sys
+import time
+import uuid
+import random
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core import IRepository, TaskService, TaskStore, JsonRepository, WriteBehindRepository  # noqa: E402
+from src.sqlite_store import SqliteDatabase, SqliteTaskRepository  # noqa: E402
+
+
+class MemoryRepository(IRepository):
+    """纯内存仓储，排除磁盘 I/O，只比较服务层本身的开销"""
+
+    def __init__(self, data): self.data = data
+
+    def load_all(self): return self.data
+
+    def save_all(self, data): self.data = data
+
+
+def make_tasks(n):
+    now = time.time()
+    return [{"id": str(uuid.uuid4()), "title": f"task {i}",
+             "due_date": f"2026-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}" if i % 3 else "",
+             "completed": random.random() < 0.5, "created_at": now - i, "updated_at": now - i} for i in range(n)]
+
+
+def legacy_get_tasks(tasks):
+    def sort_key(x):
+        return (1 if x.get('completed') else 0, 0 if x.get('due_date') else 1, x.get('due_date', ""),
+                -x.get('created_at', 0))
+
+    return sorted(tasks, key=sort_key)
+
+
+def legacy_toggle(tasks, task_id):
+    for t in tasks:
+        if t["id"] == task_id:
+            t["completed"] = not t["completed"]
+            break
+
+
+def per_op(fn, ops):
+    t0 = time.perf_counter()
+    for _ in range(ops): fn()
+    return (time.perf_counter() - t0) / ops * 1e6
+
+
+def run(n, ops=200):
+    tasks = make_tasks(n)
+    ids = [t["id"] for t in tasks]
+    legacy_data = [dict(t) for t in tasks]
+
+    t_legacy_read = per_op(lambda: legacy_get_tasks(legacy_data), max(3, ops // 20))
+    t_legacy_toggle = per_op(lambda: legacy_toggle(legacy_data, random.choice(ids)), ops)
+
+    service = TaskService(MemoryRepository(tasks))
+    service.get_tasks()  # 首次构建索引
+    t_read = per_op(service.get_tasks, ops)
+    t_toggle = per_op(lambda: service.toggle_task(random.choice(ids)), ops)
+    t_toggle_read = per_op(lambda: (service.toggle_task(random.choice(ids)), service.get_tasks()), ops)
+
+    print(f"{n:>7,d} | legacy get_tasks {t_legacy_read:10.1f} µs  toggle lookup {t_legacy_toggle:8.1f} µs | "
+          f"store get_tasks {t_read:6.2f} µs  toggle {t_toggle:8.1f} µs  toggle+get {t_toggle_read:8.1f} µs")
+
+
+def mutation_costs(service, ids, ops):
+    """toggle / add / delete 各 ops 次的平均耗时 (µs)；删除的是本轮新增的任务，任务数保持不变"""
+    toggle = per_op(lambda: service.toggle_task(random.choice(ids)), ops)
+    t0 = time.perf_counter()
+    for i in range(ops): service.add_task(f"new {i}")
+    add = (time.perf_counter() - t0) / ops * 1e6
+    fresh = [t["id"] for t in service.get_tasks() if t["title"].startswith("new ")]
+    t0 = time.perf_counter()
+    for tid in fresh: service.delete_task(tid)
+    delete = (time.perf_counter() - t0) / len(fresh) * 1e6
+    return toggle, add, delete
+
+
+def mutation_scaling(n, tmp, ops=200):
+    tasks = make_tasks(n)
+    ids = [t["id"] for t in tasks]
+
+    store = TaskStore(tasks)
+    def store_toggle():
+        t = store.get(random.choice(ids))
+        store.put(dict(t, completed=not t["completed"]))
+    costs = {"store": (per_op(store_toggle, ops), None, None)}
+
+    costs["snapshot"] = mutation_costs(TaskService(MemoryRepository(list(tasks))), ids, ops)
+
+    inner = JsonRepository(os.path.join(tmp, f"tasks-{n}.json"))
+    inner.save_all(list(tasks))
+    json_repo = WriteBehindRepository(inner, delay=3600)  # 只测调用方开销，落盘单独计时
+    costs["json"] = mutation_costs(TaskService(json_repo), ids, ops)
+    t0 = time.perf_counter()
+    json_repo.flush()
+    flush_ms = (time.perf_counter() - t0) * 1000
+
+    db = SqliteDatabase(os.path.join(tmp, f"tasks-{n}.db"))
+    sqlite_repo = SqliteTaskRepository(db)
+    sqlite_repo.save_all(tasks)
+    costs["sqlite"] = mutation_costs(TaskService(sqlite_repo), ids, ops)
+
+    cells = "  ".join(f"{name} {t:7.1f}/{a:7.1f}/{d:7.1f}" if a is not None else f"{name} {t:7.1f}"
+                      for name, (t, a, d) in costs.items())
+    print(f"{n:>7,d} | toggle/add/delete µs: {cells} | json flush {flush_ms:7.1f} ms")
+    return costs
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [1_000, 10_000, 100_000]
+    for size in sizes: run(size)
+    print()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        scaling = [mutation_scaling(size, tmp_dir) for size in sizes]
+    for layer in scaling[0]:
+        growth = scaling[-1][layer][0] / scaling[0][layer][0]
+        print(f"{layer:>8}: toggle cost x{growth:.1f} from {sizes[0]:,} to {sizes[-1]:,} tasks")
@@ -0,0 +1,79 @@
+# benchmarks/bench_timer_drift.py
+"""
+计时漂移模拟：用可注入的假时钟驱动 after() 调度链，模拟回调延迟、偶发卡顿与系统休眠，
+跑满 8 小时 (8 个 60 分钟番茄)，比较计数模式与截止时间模式的完成时刻误差。
+用法：python benchmarks/bench_timer_drift.py [随机种子]
+"""
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core import TimerEngine, MonotonicTimerEngine  # noqa: E402
+
+SESSIONS, SESSION_MINUTES = 8, 60
+MAX_DRIFT = 0.010  # 秒
+
+
+class FakeClock:
+    """假时钟：monotonic 与 wall 两路读数，休眠时只推进墙上时钟"""
+
+    def __init__(self):
+        self.mono, self.wall = 1000.0, 1_700_000_000.0
+
+    def monotonic(self): return self.mono
+
+    def time(self): return self.wall
+
+    def advance(self, seconds):
+        self.mono += seconds; self.wall += seconds
+
+    def suspend(self, seconds):
+        self.wall += seconds
+
+
+def run_session(engine, clock, rng, suspend_at=None):
+    """模拟 Tk after() 链，返回 (完成时刻相对理论截止时刻的误差, 最后一次回调的调度延迟)"""
+    begin = clock.monotonic()
+    expected = begin + engine.total_seconds
+    engine.start()
+    lag = 0.0
+    while True:
+        finished, _ = engine.tick()
+        if finished: break
+        lag = rng.uniform(0.0005, 0.004)  # 常规回调延迟 0.5~4ms
+        if rng.random() < 0.002: lag += rng.uniform(0.05, 0.4)  # 偶发主循环卡顿
+        clock.advance(engine.next_tick_delay_ms() / 1000 + lag)
+        if suspend_at is not None and clock.monotonic() - begin >= suspend_at:
+            clock.suspend(300)  # 合盖 5 分钟：单调时钟停走，墙上时钟照常
+            expected -= 300
+            suspend_at = None
+    return clock.monotonic() - expected, lag
+
+
+def simulate(engine_cls, seed, with_suspend=False):
+    clock, rng = FakeClock(), random.Random(seed)
+    worst = 0.0
+    for i in range(SESSIONS):
+        if engine_cls is TimerEngine:
+            engine = TimerEngine(SESSION_MINUTES)
+        else:
+            engine = engine_cls(SESSION_MINUTES, clock=clock.monotonic, wall_clock=clock.time)
+        suspend_at = 1800 if with_suspend and i == SESSIONS // 2 else None
+        error, last_lag = run_session(engine, clock, rng, suspend_at)
+        # 扣除最后一次回调自身的调度延迟与边界余量，剩下的才是引擎累积的漂移
+        slack = last_lag + getattr(engine, "BOUNDARY_SLACK_MS", 0) / 1000
+        worst = max(worst, abs(error) - slack if error > 0 else abs(error))
+    return worst
+
+
+if __name__ == "__main__":
+    seed = int(sys.argv[1]) if len(sys.argv) > 1 else 42
+    legacy = simulate(TimerEngine, seed)
+    precise = simulate(MonotonicTimerEngine, seed)
+    precise_suspend = simulate(MonotonicTimerEngine, seed, with_suspend=True)
+    print(f"计数模式      最大漂移 {legacy * 1000:10.1f} ms / {SESSION_MINUTES} 分钟")
+    print(f"截止时间模式  最大漂移 {precise * 1000:10.3f} ms / {SESSION_MINUTES} 分钟")
+    print(f"截止时间+休眠 最大漂移 {precise_suspend * 1000:10.3f} ms / {SESSION_MINUTES} 分钟")
+    assert precise < MAX_DRIFT and precise_suspend < MAX_DRIFT, "deadline engine drifted"
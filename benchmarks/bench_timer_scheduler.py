@@ -0,0 +1,104 @@
+# benchmarks/bench_timer_scheduler.py
+"""
+多计时器调度模拟：用假时钟与假 after() 事件循环驱动 TimerScheduler，
+同时运行数千个不同时长的计时器 (部分中途暂停 / 停止)，统计唤醒次数与调度耗时，
+并核对每个计时器都在截止时刻完成、按自己的标签记录到历史。
+对照：每个计时器每秒一个 after 回调的做法需要的回调次数。
+用法：python benchmarks/bench_timer_scheduler.py [计时器数]
+"""
+import os
+import sys
+import time
+import heapq
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core import TimerScheduler  # noqa: E402
+
+MAX_LATENESS = 0.002  # 秒
+
+
+class FakeLoop:
+    """假时钟 + after() 事件循环：run() 直接跳到下一个预约时刻"""
+
+    def __init__(self):
+        self.now, self.wall = 1000.0, 1_700_000_000.0
+        self.queue, self.seq, self.cancelled = [], 0, set()
+        self.wakeups = 0
+
+    def monotonic(self): return self.now
+
+    def time(self): return self.wall
+
+    def after(self, ms, fn):
+        self.seq += 1
+        heapq.heappush(self.queue, (self.now + ms / 1000, self.seq, fn))
+        return self.seq
+
+    def after_cancel(self, handle): self.cancelled.add(handle)
+
+    def run_until(self, t):
+        while self.queue and self.queue[0][0] <= t:
+            when, seq, fn = heapq.heappop(self.queue)
+            if seq in self.cancelled: continue
+            self.wall += when - self.now
+            self.now = when
+            self.wakeups += 1
+            fn()
+        self.wall += max(0.0, t - self.now)
+        self.now = max(self.now, t)
+
+
+class FakeHistory:
+    def __init__(self): self.records = []
+
+    def record_focus(self, minutes, tag, session=None): self.records.append((minutes, tag))
+
+
+def main(n):
+    rng = random.Random(7)
+    loop, history = FakeLoop(), FakeHistory()
+    finished_at = {}
+    sched = TimerScheduler(after=loop.after, after_cancel=loop.after_cancel, history=history,
+                           on_finish=lambda tid, t: finished_at.__setitem__(tid, loop.now),
+                           clock=loop.monotonic, wall_clock=loop.time)
+
+    expected = {}
+    t0 = time.perf_counter()
+    for i in range(n):
+        minutes = rng.randint(1, 60)
+        tid = sched.add(minutes, f"tag-{i % 17}")
+        expected[tid] = [loop.now + minutes * 60, minutes, f"tag-{i % 17}"]
+    add_cost = time.perf_counter() - t0
+
+    # 10 分钟后暂停 10% 的计时器 5 分钟，停止 5%
+    loop.run_until(loop.now + 600)
+    alive = list(sched.timers)
+    paused = rng.sample(alive, len(alive) // 10)
+    stopped = rng.sample([t for t in alive if t not in paused], len(alive) // 20)
+    for tid in paused: sched.pause_toggle(tid)
+    for tid in stopped: sched.remove(tid); expected.pop(tid)
+    loop.run_until(loop.now + 300)
+    for tid in paused:
+        sched.pause_toggle(tid)
+        expected[tid][0] += 300
+
+    t0 = time.perf_counter()
+    loop.run_until(loop.now + 61 * 60)
+    run_cost = time.perf_counter() - t0
+
+    late = [finished_at[tid] - exp[0] for tid, exp in expected.items() if tid in finished_at]
+    missing = [tid for tid in expected if tid not in finished_at]
+    tags_ok = sorted(history.records) == sorted((m, tag) for _, m, tag in expected.values())
+    naive = sum(m for _, m, _ in expected.values()) * 60
+
+    print(f"{n:,} timers: add {add_cost / n * 1e6:.1f} µs each, run {run_cost * 1000:.1f} ms total")
+    print(f"  wake-ups  : {loop.wakeups:,} (per-timer 1 s callbacks would need {naive:,})")
+    print(f"  finished  : {len(finished_at):,}, missing {len(missing)}, "
+          f"max lateness {max(late) * 1000:.3f} ms, records match tags: {tags_ok}")
+    assert not missing and tags_ok and max(late) <= MAX_LATENESS and min(late) >= 0
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
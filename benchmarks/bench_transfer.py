@@ -0,0 +1,160 @@
+# benchmarks/bench_transfer.py
+"""
+批量导入 / 导出管道：
+1. 规模：在子进程中把 N 条 JSONL 历史 (含约 1% 重复 timestamp 与少量坏行) 导入 JSONL / SQLite / 二进制后端，
+   记录吞吐与子进程峰值 RSS (/proc 的 VmHWM)：JSONL 把去重键放进 KeySet，峰值随记录数增长 (每条 40 字节以内)；
+   SQLite / 二进制逐块向存储端查重、不保存键，峰值只多出有上限的重排窗口与乱序批 (每条不到 10 字节)；
+   三个后端的重复数一致；
+2. 往返：从各后端导出为 csv / jsonl / json，再导入空后端，记录数与逐条内容一致；重复导入同一文件全部判为重复；
+3. 原生 JSON 数组的流式解析与 json.load 结果一致 (含跨块边界的元素)。
+用法：python benchmarks/bench_transfer.py [较小规模] [较大规模]   (默认 100000 1000000)
+"""
+import io
+import os
+import sys
+import json
+import random
+import resource
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.core import iter_json_array, JsonLinesRepository, JsonRepository, TaskService, HistoryService  # noqa: E402
+from src.binary_history import BinaryHistoryRepository  # noqa: E402
+from src.sqlite_store import SqliteDatabase, SqliteHistoryRepository, SqliteTaskRepository  # noqa: E402
+from src.transfer import import_records, export_records  # noqa: E402
+
+TAGS = ["💻 工作", "📚 学习", "🏃 运动", "📖 阅读"]
+
+
+def open_backend(name, prefix):
+    if name == "sqlite":
+        db = SqliteDatabase(f"{prefix}.db")
+        return TaskService(SqliteTaskRepository(db)), HistoryService(SqliteHistoryRepository(db))
+    tasks = TaskService(JsonRepository(f"{prefix}.tasks.json"))
+    if name == "binary": return tasks, HistoryService(BinaryHistoryRepository(f"{prefix}.bin"))
+    return tasks, HistoryService(JsonLinesRepository(f"{prefix}.jsonl"))
+
+
+def make_history_file(path, n):
+    """按块写出 n 行：时间戳大体递增但每块内部打乱，约 1% 与之前的重复，每 10 万行一条坏行"""
+    rng = random.Random(11)
+    with open(path, "w", encoding="utf-8") as f:
+        for start in range(0, n, 10_000):
+            lines = []
+            for i in range(start, min(n, start + 10_000)):
+                ts = 1_600_000_000 + (rng.randrange(i) if i and rng.random() < 0.01 else i) * 600.0
+                lines.append(json.dumps({"timestamp": ts, "duration": rng.choice((15, 25, 45)),
+                                         "tag": rng.choice(TAGS), "interruptions": rng.randint(0, 3)},
+                                        ensure_ascii=False))
+                if i % 100_000 == 99_999: lines.append('{"timestamp": 17')
+            rng.shuffle(lines)
+            f.write("\n".join(lines) + "\n")
+
+
+def peak_rss_mb():
+    """本进程峰值 RSS：ru_maxrss 跨 exec 保留 fork 时父进程的峰值，Linux 上改读 /proc 的 VmHWM"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"): return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def child_import(backend, path):
+    """子进程入口：导入并输出统计与峰值 RSS"""
+    stats = import_records("history", path, services=open_backend(backend, f"scale-{backend}"))
+    peak_mb = peak_rss_mb()
+    print(json.dumps({"report": stats.report(), "written": stats.written, "duplicates": stats.duplicates,
+                      "invalid": stats.invalid, "peak_mb": peak_mb}))
+
+
+def scale(tmp, sizes):
+    duplicates = {}
+    for backend in ("jsonl", "sqlite", "binary"):
+        peaks = []
+        for n in sizes:
+            path = os.path.join(tmp, f"source-{n}.jsonl")
+            if not os.path.exists(path): make_history_file(path, n)
+            for leftover in os.listdir(tmp):
+                if leftover.startswith(f"scale-{backend}"): os.remove(os.path.join(tmp, leftover))
+            out = subprocess.run([sys.executable, __file__, "--child", backend, path], cwd=tmp, check=True,
+                                 capture_output=True, text=True, env=dict(os.environ, PYTHONPATH=ROOT)).stdout
+            result = json.loads(out.strip().splitlines()[-1])
+            assert result["written"] + result["duplicates"] == n and result["invalid"] == n // 100_000, result
+            peaks.append(result["peak_mb"])
+            assert duplicates.setdefault(n, result["duplicates"]) == result["duplicates"], (backend, result)
+            print(f"{backend:>7} {n:>9,}: {result['report']}; peak RSS {result['peak_mb']:.0f} MB")
+        growth = (peaks[-1] - peaks[0]) * 1e6 / (sizes[-1] - sizes[0])
+        print(f"{backend:>7}          : peak RSS grows {growth:.1f} bytes per extra record")
+        assert growth < (40 if backend == "jsonl" else 10), (backend, growth)
+
+
+def round_trip(tmp):
+    os.chdir(tmp)
+    path = os.path.join(tmp, "source-rt.jsonl")
+    make_history_file(path, 20_000)
+    tasks_src = os.path.join(tmp, "tasks-src.json")
+    with open(tasks_src, "w", encoding="utf-8") as f:
+        json.dump([{"id": f"t{i}", "title": f"任务 {i}", "due_date": "", "completed": i % 3 == 0,
+                    "created_at": 1_700_000_000.5 + i, "updated_at": 1_700_000_000.5 + i} for i in range(500)]
+                  + [{"id": "t7", "title": "重复"}], f, ensure_ascii=False)
+
+    for backend in ("jsonl", "sqlite", "binary"):
+        src = open_backend(backend, f"rt-{backend}")
+        imported = import_records("history", path, services=src)
+        task_stats = import_records("tasks", tasks_src, services=src)
+        assert task_stats.written == 500 and task_stats.duplicates == 1, task_stats.report()
+        reference = sorted(src[1].repo.iter_all(), key=lambda r: r["timestamp"])
+        for fmt in ("csv", "jsonl", "json"):
+            out = os.path.join(tmp, f"rt-{backend}-history.{fmt}")
+            exported = export_records("history", out, services=src)
+            dst = open_backend(backend, f"rt-{backend}-{fmt}")
+            again = import_records("history", out, services=dst)
+            got = sorted(dst[1].repo.iter_all(), key=lambda r: r["timestamp"])
+            assert exported.written == again.written == imported.written and got == reference, (backend, fmt)
+            assert import_records("history", out, services=dst).duplicates == again.written
+            t_out = os.path.join(tmp, f"rt-{backend}-tasks.{fmt}")
+            export_records("tasks", t_out, services=src)
+            import_records("tasks", t_out, services=dst)
+            assert sorted(dst[0].repo.iter_all(), key=lambda t: t["id"]) == \
+                   sorted(src[0].repo.iter_all(), key=lambda t: t["id"]), (backend, fmt, "tasks")
+        print(f"round trip : {backend:>6} -> csv / jsonl / json -> {backend}: {imported.written:,} history records "
+              f"and 500 tasks identical, re-import all duplicates")
+
+
+def json_array_parser():
+    items = [{"n": i, "text": "中文" * (i % 50), "nested": {"list": list(range(i % 7))}} for i in range(3000)]
+    items += [12345678901234567890, "字符串", None, 1.5e-7, [1, [2, [3]]]]
+    text = json.dumps(items, ensure_ascii=False, indent=4)
+    for chunk_size in (1, 7, 64, 4096):
+        assert list(iter_json_array(io.StringIO(text), chunk_size=chunk_size)) == items, chunk_size
+    for bad in ("{}", "[1, 2", "[1, }"):
+        try:
+            list(iter_json_array(io.StringIO(bad), chunk_size=2))
+        except ValueError:
+            continue
+        raise AssertionError(bad)
+    print("json parser: streaming parse matches json.load for chunk sizes 1 / 7 / 64 / 4096; malformed input raises")
+
+
+def main(sizes):
+    json_array_parser()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            round_trip(tmp)
+            scale(tmp, sizes)
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        child_import(sys.argv[2], sys.argv[3])
+    else:
+        main([int(a) for a in sys.argv[1:]] or [100_000, 1_000_000])
@@ -0,0 +1,369 @@
+# src/binary_history.py
+"""
+定长二进制专注历史格式 (.bin)，读取走 mmap。
+
+文件布局 (小端)：
+    头部  [magic "ZPH1" | version u16 | record_size u16 | data_offset u32 | tag_count u16]
+          + 标签字典：tag_count 个 (长度 u8 + UTF-8 字节)，标签编号即其在字典中的下标
+          头部预留到 data_offset (默认 4096 字节)，新增标签直接写入预留区，不移动记录
+    记录  每条 24 字节：timestamp f64 | duration i32 (分钟) | tag_id u16 (0xFFFF 表示无标签) | interruptions u16
+          | focused f32 (实际专注秒数，负数表示无) | planned u16 (计划分钟，0 表示无)
+          | completed u8 (0 无 / 1 提前结束 / 2 完成) | 填充 1 字节
+版本 1 的文件 (16 字节记录，没有 focused / planned / completed) 打开时自动整体重写为版本 2。
+
+记录按时间戳升序存放，时间段查询用二分定位，聚合直接在 mmap 上 iter_unpack，不创建逐条字典。
+多个进程可共用同一文件：写入持 <文件名>.lock 写锁 (与 JSON 后端相同的 FileLock)，查询持读锁。
+在 config.json 中设置 "STORAGE_BACKEND": "binary" 启用 (任务仍使用 JSON)；
+与 JSON 互转：python -m src.binary_history to-bin|to-json 源文件 目标文件
+"""
+import os
+import sys
+import math
+import mmap
+import struct
+import threading
+
+from .core import IHistoryQueryRepository, JsonRepository, JsonLinesRepository, FileLock, atomic_write
+from .time_buckets import BucketCalendar
+from .profiling import traced
+
+MAGIC = b"ZPH1"
+VERSION = 2
+HEADER = struct.Struct("<4sHHIH")
+RECORD = struct.Struct("<diHHfHBx")
+RECORD_V1 = struct.Struct("<diHH")
+DEFAULT_DATA_OFFSET = 4096
+NO_TAG = 0xFFFF
+NO_FOCUSED = -1.0
+UNTAGGED = "未分类"
+
+
+def _row(record):
+    """记录字典 → 记录元组 (标签仍为名字，写入时再换成编号)"""
+    focused, completed = record.get("focused"), record.get("completed")
+    return (float(record["timestamp"]), int(round(record.get("duration", 0))), record.get("tag"),
+            min(int(record.get("interruptions", 0)), 0xFFFF), NO_FOCUSED if focused is None else float(focused),
+            min(int(record.get("planned", 0)), 0xFFFF), 0 if completed is None else 2 if completed else 1)
+
+
+def _pack(row, tag_id):
+    return RECORD.pack(row[0], row[1], tag_id, *row[3:])
+
+
+def _encode_header(tags, data_offset=DEFAULT_DATA_OFFSET):
+    body = bytearray(HEADER.pack(MAGIC, VERSION, RECORD.size, 0, len(tags)))
+    for tag in tags:
+        raw = tag.encode("utf-8")[:255]
+        body += bytes([len(raw)]) + raw
+    while data_offset < len(body): data_offset *= 2  # 标签太多时扩大预留区
+    HEADER.pack_into(body, 0, MAGIC, VERSION, RECORD.size, data_offset, len(tags))
+    return bytes(body) + b"\0" * (data_offset - len(body))
+
+
+class BinaryHistoryRepository(IHistoryQueryRepository):
+    def __init__(self, filename, migrate_from=None, calendar: BucketCalendar = None):
+        self.file_path = os.path.join(os.getcwd(), filename)
+        self.calendar = calendar or BucketCalendar()  # 只存时间戳，"date" 字段按此日历还原
+        self._lock = threading.RLock()  # 进程内各线程互斥
+        self.lock = FileLock(self.file_path)  # 与其他进程互斥：写入 (追加 / 新标签 / 重写) 持写锁，查询持读锁
+        self._mm, self._sig = None, None
+        self.tags, self.tag_ids = [], {}
+        self.data_offset, self.tag_table_end = DEFAULT_DATA_OFFSET, HEADER.size
+        with self._lock, self.lock.exclusive():
+            if not os.path.exists(self.file_path):
+                records = migrate_from.load_all() if migrate_from is not None else []
+                self.save_all(records)
+            if self._read_header() == 1: self._migrate_v1()
+
+    # ---------- 底层 ----------
+    def _read_header(self):
+        """读取头部与标签字典，返回文件版本"""
+        with open(self.file_path, 'rb') as f:
+            head = f.read(HEADER.size)
+            magic, version, record_size, data_offset, tag_count = HEADER.unpack(head)
+            if magic != MAGIC or (version, record_size) not in ((VERSION, RECORD.size), (1, RECORD_V1.size)):
+                raise ValueError(f"Unsupported history file: {self.file_path}")
+            table = f.read(data_offset - HEADER.size)
+        tags, pos = [], 0
+        for _ in range(tag_count):
+            n = table[pos]
+            tags.append(table[pos + 1:pos + 1 + n].decode("utf-8"))
+            pos += 1 + n
+        self.tags, self.tag_ids = tags, {t: i for i, t in enumerate(tags)}
+        self.data_offset, self.tag_table_end = data_offset, HEADER.size + pos
+        return version
+
+    def _migrate_v1(self):
+        """在写锁内调用：版本 1 → 当前版本，整体重写 (原子替换)，旧记录没有的明细字段留空"""
+        with open(self.file_path, 'rb') as f:
+            f.seek(self.data_offset)
+            raw = f.read()
+        records = []
+        for ts, dur, tag_id, n in RECORD_V1.iter_unpack(raw[:len(raw) - len(raw) % RECORD_V1.size]):
+            rec = {"timestamp": ts, "duration": dur, "interruptions": n}
+            if tag_id != NO_TAG: rec["tag"] = self.tags[tag_id]
+            records.append(rec)
+        self.save_all(records)
+
+    def _view(self):
+        """
+        在读锁或写锁内调用，返回 (mmap, 记录数)。
+        文件被追加、替换或由其他进程写入新标签 (inode / 大小 / 修改时间变化) 后重读头部并重新映射。
+        """
+        st = os.stat(self.file_path)
+        sig = (st.st_ino, st.st_size, st.st_mtime_ns)
+        if sig != self._sig:
+            self._unmap()
+            self._read_header()
+            with open(self.file_path, 'rb') as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._sig = sig
+        return self._mm, (st.st_size - self.data_offset) // RECORD.size
+
+    def _unmap(self):
+        """写文件前释放映射 (Windows 下已映射的文件不能截断或替换)"""
+        if self._mm is not None: self._mm.close()
+        self._mm, self._sig = None, None
+
+    def _ts_at(self, mm, i):
+        """第 i 条记录的时间戳；mm 为 mmap 或已打开的文件 (导入时的查找不经 mmap，读过的页不计入常驻内存)"""
+        if isinstance(mm, mmap.mmap): return struct.unpack_from("<d", mm, self.data_offset + i * RECORD.size)[0]
+        mm.seek(self.data_offset + i * RECORD.size)
+        return struct.unpack("<d", mm.read(8))[0]
+
+    def _lower_bound(self, mm, count, ts):
+        """第一个 timestamp >= ts 的记录下标 (记录按时间升序)"""
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._ts_at(mm, mid) < ts: lo = mid + 1
+            else: hi = mid
+        return lo
+
+    def _scan(self, start_ts=None, end_ts=None):
+        """遍历 [start_ts, end_ts) 内的原始记录元组 (timestamp, duration, tag_id, interruptions, focused, planned, completed)"""
+        mm, count = self._view()
+        lo = 0 if start_ts is None else self._lower_bound(mm, count, start_ts)
+        hi = count if end_ts is None else self._lower_bound(mm, count, end_ts)
+        if hi <= lo: return iter(())
+        view = memoryview(mm)[self.data_offset + lo * RECORD.size:self.data_offset + hi * RECORD.size]
+        return RECORD.iter_unpack(view)
+
+    def _tag_name(self, tag_id):
+        return UNTAGGED if tag_id == NO_TAG else self.tags[tag_id]
+
+    def _to_record(self, row):
+        ts, dur, tag_id, interruptions, focused, planned, completed = row
+        rec = {"date": self.calendar.label(ts), "timestamp": ts, "duration": dur}
+        if tag_id != NO_TAG: rec["tag"] = self.tags[tag_id]
+        if planned: rec["planned"] = planned
+        if focused >= 0: rec["focused"] = round(focused, 1)  # f32 存储，记录本身只保留一位小数
+        if interruptions or planned: rec["interruptions"] = interruptions
+        if completed: rec["completed"] = completed == 2
+        return rec
+
+    # ---------- IRepository ----------
+    @traced("repo.binary.load")
+    def load_all(self):
+        with self._lock, self.lock.shared():
+            return [self._to_record(row) for row in self._scan()]
+
+    @traced("repo.binary.save")
+    def save_all(self, data):
+        rows = sorted((_row(r) for r in data if "timestamp" in r), key=lambda r: r[0])
+        tags = list(dict.fromkeys(row[2] for row in rows if row[2] is not None))
+        tag_ids = {t: i for i, t in enumerate(tags)}
+        header = _encode_header(tags)
+
+        def write(f):
+            f.write(header)
+            f.write(b"".join(_pack(row, NO_TAG if row[2] is None else tag_ids[row[2]]) for row in rows))
+
+        with self._lock, self.lock.exclusive():
+            self._unmap()
+            atomic_write(self.file_path, write, binary=True)
+            self._read_header()
+
+    @traced("repo.binary.append")
+    def append(self, record):
+        ts, tag = float(record["timestamp"]), record.get("tag")
+        with self._lock, self.lock.exclusive():
+            mm, count = self._view()
+            if count and ts < self._ts_at(mm, count - 1):
+                # 时间倒序的记录会破坏有序性，退化为整体重写
+                self.save_all(self.load_all() + [record])
+                return
+            if tag is not None and tag not in self.tag_ids and not self._add_tag(tag):
+                self.save_all(self.load_all() + [record])  # 预留区已满：整体重写并扩大头部
+                return
+            tag_id = NO_TAG if tag is None else self.tag_ids[tag]
+            self._unmap()
+            with open(self.file_path, 'r+b') as f:
+                # 丢弃中断写入留下的不完整记录，保证新记录按记录长度对齐
+                f.truncate(self.data_offset + count * RECORD.size)
+                f.seek(0, os.SEEK_END)
+                f.write(_pack(_row(record), tag_id))
+
+    @traced("repo.binary.append_many")
+    def append_many(self, records):
+        """
+        批量追加 (导入)。批内先按时间排序：整批不早于现有末条且新标签放得下时直接写到文件尾，
+        否则把现有记录与这一批按时间戳归并、流式重写整个文件 (现有记录按原始字节搬运，不解码)。
+        """
+        rows = sorted((_row(r) for r in records if "timestamp" in r), key=lambda r: r[0])
+        if not rows: return
+        with self._lock, self.lock.exclusive():
+            mm, count = self._view()  # 先刷新头部：其他进程可能已写入新标签
+            new_tags = list(dict.fromkeys(row[2] for row in rows if row[2] is not None and row[2] not in self.tag_ids))
+            in_order = not count or rows[0][0] >= self._ts_at(mm, count - 1)
+            if not in_order or not all(self._add_tag(tag) for tag in new_tags):
+                self._merge_rewrite(rows)
+                return
+            packed = b"".join(_pack(row, NO_TAG if row[2] is None else self.tag_ids[row[2]]) for row in rows)
+            self._unmap()
+            with open(self.file_path, 'r+b') as f:
+                f.truncate(self.data_offset + count * RECORD.size)
+                f.seek(0, os.SEEK_END)
+                f.write(packed)
+
+    def _merge_rewrite(self, rows):
+        """
+        在 _lock 与写锁内调用：rows 已按时间排序；新标签追加在字典末尾，现有记录的标签编号不变。
+        对每条新记录二分定位插入点，插入点之间的现有记录按字节块整段复制 (不解码)，
+        代价为一次顺序复制加上每条新记录一次二分查找。查找与复制都用普通文件读取而不经 mmap，
+        整个文件的页不会计入进程常驻内存。
+        """
+        tags = self.tags + list(dict.fromkeys(row[2] for row in rows if row[2] is not None and row[2] not in self.tag_ids))
+        tag_ids = {t: i for i, t in enumerate(tags)}
+        _, count = self._view()
+        start, size = self.data_offset, RECORD.size
+
+        def copy(src, f, lo, hi):
+            src.seek(start + lo * size)
+            for remaining in range((hi - lo) * size, 0, -(1 << 20)):
+                f.write(src.read(min(remaining, 1 << 20)))
+
+        def write(f):
+            f.write(_encode_header(tags))
+            with open(self.file_path, 'rb') as src:  # 替换文件前关闭 (Windows 下打开的文件不能被替换)
+                done = 0
+                for row in rows:
+                    # 时间戳相同时现有记录在前
+                    at = max(done, self._lower_bound(src, count, math.nextafter(row[0], math.inf)))
+                    copy(src, f, done, at)
+                    f.write(_pack(row, NO_TAG if row[2] is None else tag_ids[row[2]]))
+                    done = at
+                copy(src, f, done, count)
+            self._unmap()  # 替换文件前释放映射
+
+        atomic_write(self.file_path, write, binary=True)
+        self._read_header()
+
+    def iter_all(self):
+        """分批复制记录块再解码：不长期持有 mmap 视图，遍历期间仍可追加"""
+        i = 0
+        while True:
+            with self._lock, self.lock.shared():
+                mm, count = self._view()
+                if i >= count: return
+                hi = min(count, i + 4096)
+                raw = mm[self.data_offset + i * RECORD.size:self.data_offset + hi * RECORD.size]
+                batch = [self._to_record(row) for row in RECORD.iter_unpack(raw)]
+            yield from batch
+            i = hi
+
+    def existing_timestamps(self, timestamps):
+        """
+        timestamps 中已有记录的时间戳 (导入去重)。
+        键所在时间段内的记录不多时整段解码比较，否则逐个二分查找；都不需要把全部键载入内存。
+        """
+        with self._lock, self.lock.shared():
+            mm, count = self._view()
+            if not count: return set()
+            last = self._ts_at(mm, count - 1)
+            keys = sorted(ts for ts in timestamps if ts <= last)  # 晚于末条的键 (通常是大多数) 不可能已存在
+            if not keys: return set()
+            with open(self.file_path, 'rb') as f:
+                end = math.nextafter(keys[-1], math.inf)
+                lo, hi = self._lower_bound(f, count, keys[0]), self._lower_bound(f, count, end)
+                if hi - lo <= 8 * len(keys):
+                    f.seek(self.data_offset + lo * RECORD.size)
+                    return {row[0] for row in RECORD.iter_unpack(f.read((hi - lo) * RECORD.size))}.intersection(keys)
+                found = set()
+                for ts in keys:
+                    i = self._lower_bound(f, count, ts)
+                    if i < count and self._ts_at(f, i) == ts: found.add(ts)
+                return found
+
+    def _add_tag(self, tag):
+        """在写锁内调用：把新标签写进头部预留区，先写字典项，再更新 tag_count"""
+        raw = tag.encode("utf-8")[:255]
+        if self.tag_table_end + 1 + len(raw) > self.data_offset: return False
+        self._unmap()
+        with open(self.file_path, 'r+b') as f:
+            f.seek(self.tag_table_end)
+            f.write(bytes([len(raw)]) + raw)
+            f.flush()
+            f.seek(HEADER.size - 2)
+            f.write(struct.pack("<H", len(self.tags) + 1))
+        self.tag_ids[tag] = len(self.tags)
+        self.tags.append(tag)
+        self.tag_table_end += 1 + len(raw)
+        return True
+
+    # ---------- IHistoryQueryRepository ----------
+    def sum_duration(self, start_ts=None, end_ts=None):
+        with self._lock, self.lock.shared():
+            return sum(row[1] for row in self._scan(start_ts, end_ts))
+
+    def tag_totals(self, start_ts):
+        with self._lock, self.lock.shared():
+            totals = {}
+            for row in self._scan(start_ts):
+                totals[row[2]] = totals.get(row[2], 0) + row[1]
+            return {self._tag_name(k): v for k, v in totals.items()}
+
+    def session_counts(self, start_ts, end_ts):
+        with self._lock, self.lock.shared():
+            sessions = interruptions = 0
+            for row in self._scan(start_ts, end_ts):
+                sessions += 1
+                interruptions += row[3]
+            return sessions, interruptions
+
+    def recent(self, n):
+        with self._lock, self.lock.shared():
+            mm, count = self._view()
+            lo = max(0, count - n)
+            tail = [self._to_record(row) for row in self._scan(self._ts_at(mm, lo))] if count else []
+        # 时间戳相同时先写入的排前面，与 JSON 后端的稳定排序一致
+        return sorted(tail, key=lambda r: r["timestamp"], reverse=True)[:n]
+
+    def scan_range(self, start_ts, end_ts):
+        with self._lock, self.lock.shared():
+            return [(row[0], row[1], self._tag_name(row[2])) for row in self._scan(start_ts, end_ts)]
+
+
+def _json_repo(path):
+    return JsonLinesRepository(path) if path.endswith(".jsonl") else JsonRepository(path)
+
+
+def json_to_binary(src, dst):
+    records = _json_repo(src).load_all()
+    if os.path.exists(dst): os.remove(dst)
+    BinaryHistoryRepository(dst).save_all(records)
+    return len(records)
+
+
+def binary_to_json(src, dst):
+    records = BinaryHistoryRepository(src).load_all()
+    _json_repo(dst).save_all(records)
+    return len(records)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] not in ("to-bin", "to-json"):
+        print("用法：python -m src.binary_history to-bin|to-json 源文件 目标文件")
+        sys.exit(1)
+    convert = json_to_binary if sys.argv[1] == "to-bin" else binary_to_json
+    print(f"已转换 {convert(sys.argv[2], sys.argv[3])} 条记录 → {sys.argv[3]}")
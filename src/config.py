@@ -1,7 +1,10 @@
 # src/config.py
 import os
 import json
+import atexit
 import threading
+from contextlib import contextmanager
+from types import MappingProxyType
 
 
 class AppConfig:
@@ -66,6 +69,20 @@ class AppConfig:
     MINI_TIME_FONT = ("SF Pro Display", 46)
     MINI_TEXT_FONT = ("SF Pro Text", 12)
 
+    # --- 数据存储 ---
+    STORAGE_BACKEND = "json"  # "json" / "sqlite" / "binary" (历史用定长二进制文件，任务仍为 JSON)
+    SQLITE_DB_FILE = "zenpomo.db"
+    HISTORY_BINARY_FILE = "focus_history.bin"
+    SESSION_CHECKPOINT_FILE = "session.checkpoint.jsonl"  # 进行中会话的检查点，异常退出后启动时据此恢复或补记
+    DAEMON_SOCKET = "zenpomo.sock"  # 无界面守护进程的控制套接字 (python -m src.daemon serve)
+    DAEMON_CHECKPOINT_FILE = "daemon.checkpoint.jsonl"  # 守护进程自己的会话检查点，与界面的互不覆盖
+    RENDER_STATS = False  # 每次专注结束时打印渲染调度统计 (刷新次数 / 耗时)
+    PROFILING = False  # 开启内置性能埋点 (仓储读写 / 服务调用 / 界面渲染的耗时、计数与直方图)
+    PROFILE_TRACE_FILE = "zenpomo.trace.json"  # 开启埋点时进程退出前导出的 Chrome Trace 文件 (为空则不导出)
+    CONFIG_WATCH = True  # 监视 config.json，外部修改后自动重载并只重设受影响的控件
+    CONFIG_WATCH_INTERVAL = 1.0  # 无 inotify 时轮询 config.json 状态的间隔 (秒)
+    TIMEZONE = ""  # 统计分桶使用的时区 (如 "Asia/Shanghai")，为空时跟随系统时区
+
     ZEN_MESSAGES = {
         "start": "🍃 调整呼吸，进入状态...",
         "focus": "🌊 保持心流，沉浸当下...",
@@ -73,14 +90,76 @@ class AppConfig:
     }
 
 
+def _freeze(value):
+    """列表 → 元组、字典 → 只读映射 (递归)，快照中的值不能被调用方原地修改"""
+    if isinstance(value, (list, tuple)): return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict): return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    return value
+
+
+def _normalize_color(value):
+    """#abc / #AABBCC → #aabbcc；其他写法 (颜色名、"transparent") 原样保留"""
+    if not isinstance(value, str) or not value.startswith("#"): return value
+    digits = value[1:]
+    if len(digits) == 3: digits = "".join(c * 2 for c in digits)
+    try:
+        int(digits, 16)
+    except ValueError:
+        return value
+    return "#" + digits.lower() if len(digits) == 6 else value
+
+
+def _derive(key, value):
+    """编译单项配置：字体统一为元组 (config.json 中是列表)，颜色统一为小写六位十六进制"""
+    if key.endswith("_FONT") and isinstance(value, (list, tuple)):
+        return tuple(int(v) if isinstance(v, float) and v.is_integer() else v for v in value)
+    if key.startswith("COLOR_") or key.endswith("_COLOR"): return _normalize_color(value)
+    return _freeze(value)
+
+
+class ConfigSnapshot:
+    """
+    不可变的已编译配置：属性访问 (cfg.COLOR_PRIMARY) 即普通实例属性查找，没有函数调用与默认值处理。
+    每次配置变更整体替换为新快照，持有旧快照的代码看到的始终是一致的一组值。
+    """
+
+    def __init__(self, values, version=0):
+        self.__dict__.update({k: _derive(k, v) for k, v in values.items()})
+        self.__dict__["version"] = version
+
+    def __setattr__(self, key, value):
+        raise AttributeError("ConfigSnapshot is read-only; use config_manager.set()")
+
+    def get(self, key, default=None):
+        return self.__dict__.get(key, default)
+
+    def __getitem__(self, key):
+        return self.__dict__[key]
+
+    def keys(self):
+        return [k for k in self.__dict__ if k.isupper()]
+
+    def changed_keys(self, other):
+        """与另一份快照相比值不同 (或新增 / 删除) 的配置项"""
+        mine, theirs = self.__dict__, other.__dict__
+        return {k for k in mine.keys() | theirs.keys() if k.isupper() and mine.get(k, _MISSING) != theirs.get(k, _MISSING)}
+
+
+_MISSING = object()
+
+
 class ConfigManager:
     """
     配置管理器 (单例模式)。
     支持从 config.json 加载配置，支持运行时修改并保存。
+    读取走 snapshot (不可变的已编译快照)；修改后重建快照、通知订阅者，并在 SAVE_DELAY 秒后合并写盘一次。
+    多项修改可放进 with config_manager.batch(): 中，只重建 / 通知 / 保存一次。
+    reload() 重新读取 config.json (由 ConfigWatcher 在文件变化时触发)，只把值有变化的键通知给订阅者。
     """
     _instance = None
     _lock = threading.Lock()
     CONFIG_FILE = "config.json"
+    SAVE_DELAY = 0.5  # 保存防抖窗口 (秒)
 
     def __new__(cls, *args, **kwargs):
         if not cls._instance:
@@ -92,42 +171,137 @@ class ConfigManager:
     def __init__(self):
         if not hasattr(self, "_initialized"):
             self._config = {}
+            self._state_lock = threading.RLock()
+            self._batch_depth = 0
+            self._batch_changed = set()
+            self._subscribers = []  # (回调, 关注的键集合或 None)
+            self._save_timer = None
+            self._unsaved = set()  # 运行时修改、尚未写盘的键；重载时保留这些值
             self._load_defaults()
             self.load_from_file()
+            self.snapshot = ConfigSnapshot(self._config)
+            atexit.register(self.flush)
             self._initialized = True
 
     def _load_defaults(self):
         """从 AppConfig 加载默认值"""
-        for key in dir(AppConfig):
-            if key.isupper():  # 只加载大写常量
-                self._config[key] = getattr(AppConfig, key)
+        self._config.update({k: v for k, v in vars(AppConfig).items() if k.isupper()})  # 只加载大写常量
+
+    def _read_file(self):
+        """返回 config.json 的内容；文件不存在为 {}，解析失败 (如编辑器写到一半) 为 None"""
+        if not os.path.exists(self.CONFIG_FILE): return {}
+        try:
+            with open(self.CONFIG_FILE, 'r', encoding='utf-8') as f:
+                user_config = json.load(f)
+            if not isinstance(user_config, dict): raise ValueError("config root must be an object")
+            return user_config
+        except Exception as e:
+            print(f"Config load error: {e}")
+            return None
 
     def load_from_file(self):
-        if os.path.exists(self.CONFIG_FILE):
-            try:
-                with open(self.CONFIG_FILE, 'r', encoding='utf-8') as f:
-                    user_config = json.load(f)
-                    self._config.update(user_config)
-            except Exception as e:
-                print(f"Config load error: {e}")
+        self._config.update(self._read_file() or {})
+
+    def reload(self):
+        """
+        重新读取 config.json：默认值 + 文件内容构成新配置 (文件中删掉的键回到默认值)，
+        只提交值有变化的键，且不回写文件。文件无法解析时保持当前配置。返回变更的键集合。
+        """
+        user_config = self._read_file()
+        if user_config is None: return set()
+        fresh = {k: v for k, v in vars(AppConfig).items() if k.isupper()}
+        fresh.update(user_config)
+        with self._state_lock:
+            for k in self._unsaved:  # 本进程尚未落盘的修改优先
+                if k in self._config: fresh[k] = self._config[k]
+            changed = {k for k in fresh.keys() | self._config.keys()
+                       if fresh.get(k, _MISSING) != self._config.get(k, _MISSING)}
+            if not changed: return changed
+            self._config = fresh
+            self._batch_changed |= changed
+            if self._batch_depth == 0: self._commit(save=False)
+        return changed
 
     def save_to_file(self):
         try:
             # 简单过滤不可序列化对象
-            serializable_config = {k: v for k, v in self._config.items()
-                                   if isinstance(v, (str, int, float, bool, dict, list))}
-            with open(self.CONFIG_FILE, 'w', encoding='utf-8') as f:
+            with self._state_lock:
+                serializable_config = {k: v for k, v in self._config.items()
+                                       if isinstance(v, (str, int, float, bool, dict, list))}
+            tmp = self.CONFIG_FILE + ".tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
                 json.dump(serializable_config, f, indent=4, ensure_ascii=False)
+            os.replace(tmp, self.CONFIG_FILE)
         except Exception as e:
             print(f"Config save error: {e}")
 
     def get(self, key, default=None):
-        return self._config.get(key, default)
+        return self.snapshot.get(key, default)
 
     def set(self, key, value):
-        self._config[key] = value
+        self.update({key: value})
+
+    def update(self, values):
+        """一次修改多项配置"""
+        with self._state_lock:
+            changed = {k for k, v in values.items() if self._config.get(k, _MISSING) != v}
+            if not changed: return
+            self._config.update({k: values[k] for k in changed})
+            self._batch_changed |= changed
+            self._unsaved |= changed
+            if self._batch_depth == 0: self._commit()
+
+    @contextmanager
+    def batch(self):
+        """事务：块内的 set / update 在退出时统一生效 (可嵌套，最外层退出时提交)"""
+        with self._state_lock:
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._state_lock:
+                self._batch_depth -= 1
+                if self._batch_depth == 0 and self._batch_changed: self._commit()
+
+    def _commit(self, save=True):
+        """在 _state_lock 内调用：重建快照、安排保存并通知订阅者"""
+        changed, self._batch_changed = self._batch_changed, set()
+        self.snapshot = ConfigSnapshot(self._config, self.snapshot.version + 1)
+        if save or self._unsaved: self._schedule_save()
+        self._notify(self.snapshot, changed)
+
+    def _notify(self, snapshot, changed):
+        for callback, keys in list(self._subscribers):
+            if keys is not None and not (keys & changed): continue
+            try:
+                callback(snapshot, changed)
+            except Exception as e:
+                print(f"Config subscriber error: {e}")
+
+    def subscribe(self, callback, keys=None):
+        """
+        配置变更时调用 callback(新快照, 变更的键集合)；keys 非空时只在这些键变化时调用。
+        回调在提交修改的线程中执行。返回取消订阅的函数。
+        """
+        entry = (callback, frozenset(keys) if keys is not None else None)
+        self._subscribers.append(entry)
+        return lambda: self._subscribers.remove(entry) if entry in self._subscribers else None
+
+    def _schedule_save(self):
+        if self._save_timer is not None: self._save_timer.cancel()
+        self._save_timer = threading.Timer(self.SAVE_DELAY, self.flush)
+        self._save_timer.daemon = True
+        self._save_timer.start()
+
+    def flush(self):
+        """立即写出尚未保存的修改 (进程退出时自动调用)"""
+        with self._state_lock:
+            timer, self._save_timer = self._save_timer, None
+            self._unsaved = set()
+        if timer is None: return
+        timer.cancel()
         self.save_to_file()
 
 
 # 全局实例
-config_manager = ConfigManager()
\ No newline at end of file
+config_manager = ConfigManager()
@@ -0,0 +1,126 @@
+# src/config_watch.py
+"""
+config.json 监视器：文件变化时调用 on_change (通常投递到 UI 线程执行 config_manager.reload)。
+Linux 下用 inotify 监视所在目录 (保存时常以新文件替换旧文件，直接监视文件会丢失后续事件)，
+其他平台或 inotify 不可用时退化为定期比较 (mtime, 大小, inode)。
+事件之后等待 DEBOUNCE 秒合并编辑器的连续写入，且只有文件签名确实变化才回调。
+"""
+import os
+import sys
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+
+IN_MODIFY, IN_CLOSE_WRITE, IN_MOVED_FROM, IN_MOVED_TO = 0x002, 0x008, 0x040, 0x080
+IN_CREATE, IN_DELETE = 0x100, 0x200
+IN_NONBLOCK, IN_CLOEXEC = 0o4000, 0o2000000
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+def _load_inotify():
+    if not sys.platform.startswith("linux"): return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+def file_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+class ConfigWatcher:
+    DEBOUNCE = 0.05
+
+    def __init__(self, path, on_change, poll_interval=1.0):
+        self.path = os.path.abspath(path)
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.mode = None  # "inotify" / "poll"，start 之后确定
+        self._signature = file_signature(self.path)
+        self._stop = threading.Event()
+        self._thread = None
+        self._fd = None
+
+    def start(self):
+        if self._thread is not None: return self
+        self._fd = self._open_inotify()
+        self.mode = "inotify" if self._fd is not None else "poll"
+        self._thread = threading.Thread(target=self._run, name="config-watch", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None: self._thread.join(timeout=2)
+        if self._fd is not None: os.close(self._fd); self._fd = None
+
+    def _open_inotify(self):
+        libc = _load_inotify()
+        if libc is None: return None
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0: return None
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+        if libc.inotify_add_watch(fd, os.path.dirname(self.path).encode(), mask) < 0:
+            os.close(fd)
+            return None
+        return fd
+
+    def _run(self):
+        wait = self._wait_inotify if self.mode == "inotify" else self._wait_poll
+        while not self._stop.is_set():
+            try:
+                if not wait(): continue
+            except OSError as e:
+                print(f"Config watch error: {e}")
+                if self._fd is not None: os.close(self._fd); self._fd = None
+                self.mode, wait = "poll", self._wait_poll
+                continue
+            self._stop.wait(self.DEBOUNCE)
+            if self._fd is not None: self._drain()
+            self._check()
+
+    def _wait_poll(self):
+        self._stop.wait(self.poll_interval)
+        return True
+
+    def _wait_inotify(self):
+        """等待一批事件，返回其中是否涉及被监视的文件 (每 0.5 秒醒来检查一次停止标志)"""
+        ready, _, _ = select.select([self._fd], [], [], 0.5)
+        return bool(ready) and self._drain()
+
+    def _drain(self):
+        name, hit = os.path.basename(self.path).encode(), False
+        while True:
+            try:
+                buf = os.read(self._fd, 4096)
+            except BlockingIOError:
+                return hit
+            except OSError as e:
+                if e.errno == errno.EINTR: continue
+                raise
+            offset = 0
+            while offset + _EVENT.size <= len(buf):
+                _, _, _, length = _EVENT.unpack_from(buf, offset)
+                offset += _EVENT.size
+                if buf[offset:offset + length].rstrip(b"\0") == name: hit = True
+                offset += length
+
+    def _check(self):
+        signature = file_signature(self.path)
+        if signature == self._signature: return
+        self._signature = signature
+        try:
+            self.on_change()
+        except Exception as e:
+            print(f"Config watch callback error: {e}")
@@ -2,33 +2,91 @@
 import os
 import sys
 import json
+import atexit
+import math
+import time
 import uuid
+import heapq
+import random
+import bisect
 import platform
 import threading
 from datetime import datetime, timedelta
 from abc import ABC, abstractmethod
+from contextlib import contextmanager, nullcontext
+
+try:
+    import fcntl
+except ImportError:  # Windows：只有进程内互斥
+    fcntl = None
+from .config import config_manager
+from .time_buckets import BucketCalendar, GRANULARITIES
+from .profiling import profiler, traced
 
 
 # ===================================================
 # 核心计时引擎 (TimerEngine - SRP)
 # ===================================================
 class TimerEngine:
-    def __init__(self, duration_minutes):
+    """
+    倒计时引擎，同时记录专注区间日志：intervals 为已结束的 (开始, 结束) 区间 (clock 时间)，
+    暂停 / 继续 / 停止只在状态变化时追加一项。summary() 给出实际专注秒数与打断次数，
+    打断 = 暂停 + 重置 + 未完成就停止；重置前已专注的时间照样计入。
+    """
+    MIN_RECORD_SECONDS = 60  # 提前停止时专注不足该秒数不记录 (误触开始)
+
+    def __init__(self, duration_minutes, clock=time.monotonic):
         self.total_seconds = int(duration_minutes * 60)
         self.time_left = self.total_seconds
         self.is_running = False
         self.is_paused = False
+        self.clock = clock
+        self.intervals = []  # [(开始, 结束)]
+        self.carried = 0.0  # 不在区间日志里的已专注秒数 (从检查点恢复的部分)
+        self.interruptions = 0
+        self.completed = False
+        self._since = None  # 当前区间的开始时刻，未在计时时为 None
+
+    # ---------- 区间日志 ----------
+    def _open_interval(self):
+        if self._since is None: self._since = self.clock()
+
+    def _close_interval(self, at=None):
+        if self._since is None: return
+        self.intervals.append((self._since, self.clock() if at is None else at))
+        self._since = None
+
+    def focused_seconds(self):
+        total = self.carried + sum(end - start for start, end in self.intervals)
+        return total + (self.clock() - self._since if self._since is not None else 0.0)
 
+    def summary(self):
+        """写入历史的会话明细：实际专注秒数、打断次数、是否完成"""
+        return {"focused": round(self.focused_seconds(), 1), "interruptions": self.interruptions,
+                "completed": self.completed}
+
+    # ---------- 状态 ----------
     def start(self):
         self.is_running = True; self.is_paused = False
+        self._open_interval()
 
     def stop(self):
+        if self.is_running and not self.completed: self.interruptions += 1
+        self._close_interval()
         self.is_running = False; self.is_paused = False
 
     def pause_toggle(self):
-        if self.is_running: self.is_paused = not self.is_paused
+        if not self.is_running: return
+        self.is_paused = not self.is_paused
+        if self.is_paused:
+            self.interruptions += 1
+            self._close_interval()
+        else:
+            self._open_interval()
 
     def reset(self):
+        self.interruptions += 1
+        self._close_interval()
         self.time_left = self.total_seconds;
         self.is_paused = True;
         self.is_running = True
@@ -43,6 +101,8 @@ class TimerEngine:
             return False, self._get_progress()
         else:
             self.is_running = False
+            self.completed = True
+            self._close_interval()
             return True, 1.0
 
     def _get_progress(self):
@@ -53,6 +113,405 @@ class TimerEngine:
         m, s = divmod(self.time_left, 60)
         return f"{m:02d}:{s:02d}"
 
+    def next_tick_delay_ms(self):
+        """距下一次 tick 的等待毫秒数 (计数模式固定 1 秒)"""
+        return 1000
+
+
+class MonotonicTimerEngine(TimerEngine):
+    """
+    截止时间模式计时引擎。
+    剩余时间 = 截止时间 - time.monotonic()，不再按 tick 次数递减，回调延迟与主循环卡顿不会累积；
+    每次 tick 同时比对墙上时钟，单调时钟在系统休眠期间停走时，把休眠时长补记为已流逝。
+    clock / wall_clock 可注入，便于用假时钟做模拟验证。
+    """
+    SUSPEND_THRESHOLD = 2.0  # 墙上时钟比单调时钟多走超过该秒数，视为发生过休眠
+    BOUNDARY_SLACK_MS = 2  # 唤醒略晚于整秒边界，保证显示值已翻到下一秒
+
+    def __init__(self, duration_minutes, clock=time.monotonic, wall_clock=time.time):
+        super().__init__(duration_minutes, clock)
+        self.wall_clock = wall_clock
+        self.deadline = None  # 运行中的截止时刻 (单调时钟)
+        self.remaining = float(self.total_seconds)  # 暂停 / 未开始时的精确剩余秒数
+        self._anchor = None  # 上次对时的 (单调时间, 墙上时间)
+
+    def start(self):
+        super().start()
+        self._resume()
+
+    def stop(self):
+        self._freeze()
+        super().stop()
+
+    def pause_toggle(self):
+        if not self.is_running: return
+        if self.is_paused: self._resume()
+        else: self._freeze()
+        super().pause_toggle()
+
+    def reset(self):
+        super().reset()
+        self.deadline = None
+        self.remaining = float(self.total_seconds)
+
+    def restore(self, remaining, paused, carried=0.0, interruptions=0):
+        """
+        从会话检查点恢复：按剩余秒数继续计时 (paused 时停在暂停状态)。
+        carried 为重置前已专注的秒数，与倒计时已走过的部分一起计入专注时长。
+        """
+        self.remaining = max(0.0, min(float(remaining), float(self.total_seconds)))
+        self.time_left = math.ceil(self.remaining)
+        self.is_running, self.is_paused = True, paused
+        self.carried = carried + (self.total_seconds - self.remaining)
+        self.interruptions = interruptions
+        self.deadline = None
+        if not paused:
+            self._resume()
+            self._open_interval()
+
+    def _resume(self):
+        self._anchor = (self.clock(), self.wall_clock())
+        self.deadline = self._anchor[0] + self.remaining
+
+    def _freeze(self):
+        if self.deadline is not None:
+            self._reconcile()
+            self.remaining = max(0.0, self.deadline - self.clock())
+        self.deadline = None
+
+    def _reconcile(self):
+        """对时：若两次对时之间墙上时钟明显多走，说明单调时钟在休眠中停走，截止时间相应提前"""
+        mono, wall = self.clock(), self.wall_clock()
+        if self._anchor is not None and self.deadline is not None:
+            gap = (wall - self._anchor[1]) - (mono - self._anchor[0])
+            if gap > self.SUSPEND_THRESHOLD:
+                self.deadline -= gap
+                if self._since is not None: self._since -= gap  # 与倒计时一致，休眠时长计入当前区间
+        self._anchor = (mono, wall)
+
+    def remaining_seconds(self):
+        if self.deadline is None: return self.remaining
+        return max(0.0, self.deadline - self.clock())
+
+    def _get_progress(self):
+        if self.total_seconds == 0: return 1.0
+        return 1 - (self.remaining_seconds() / self.total_seconds)
+
+    def tick(self):
+        """返回 (是否完成, 进度0-1)"""
+        if not self.is_running: return False, 0.0
+        if self.is_paused: return False, self._get_progress()
+
+        self._reconcile()
+        left = self.remaining_seconds()
+        self.time_left = math.ceil(left)
+        if left > 0: return False, self._get_progress()
+
+        deadline = self.deadline
+        self._freeze()
+        self.is_running = False
+        self.completed = True
+        self._close_interval(deadline)  # 回调晚到的那一小段不算专注
+        return True, 1.0
+
+    def next_tick_delay_ms(self):
+        """等到剩余时间的下一个整秒边界再唤醒，而不是固定间隔 1 秒"""
+        if self.deadline is None: return 1000
+        frac = self.remaining_seconds() % 1.0
+        return int(frac * 1000) + self.BOUNDARY_SLACK_MS if frac > 0 else 1000
+
+
+class TimerScheduler:
+    """
+    多计时器调度：所有 MonotonicTimerEngine 的截止时间放在一个小顶堆里，宿主只在最近的截止时刻唤醒一次，
+    而不是每个计时器每秒一个回调。增删、暂停 / 继续都是 O(log n)；被暂停 / 重置 / 停止的计时器在堆里的旧条目
+    靠代数 (gen) 失效，出堆时丢弃，失效条目过多时整体重建。
+    after / after_cancel 与 Tk 的 root.after / root.after_cancel 同签名 (毫秒)，asyncio 下可用 call_later 包一层。
+    完成的计时器按各自标签调用 history.record_focus(分钟, 标签, session=会话明细)，可传 HistoryService 或 AsyncServices。
+    """
+    MAX_SLEEP = 30.0  # 最长休眠秒数：醒来后检查系统是否休眠过
+
+    def __init__(self, after=None, after_cancel=None, history=None, on_finish=None,
+                 clock=time.monotonic, wall_clock=time.time):
+        self.after, self.after_cancel = after, after_cancel
+        self.history, self.on_finish = history, on_finish
+        self.clock, self.wall_clock = clock, wall_clock
+        self.timers = {}  # id → {"engine", "minutes", "tag", "gen"}
+        self._heap = []   # (截止时间, gen, id)
+        self._seq = 0
+        self._armed = None  # (截止时间, after 返回的句柄)
+        self._anchor = (clock(), wall_clock())
+
+    def __len__(self):
+        return len(self.timers)
+
+    # ---------- 计时器操作 ----------
+    def add(self, minutes, tag, timer_id=None):
+        if timer_id is None:
+            self._seq += 1
+            timer_id = f"t{self._seq}"
+        engine = MonotonicTimerEngine(minutes, clock=self.clock, wall_clock=self.wall_clock)
+        engine.start()
+        self.timers[timer_id] = {"engine": engine, "minutes": minutes, "tag": tag, "gen": 0}
+        self._push(timer_id)
+        self._rearm()
+        return timer_id
+
+    def pause_toggle(self, timer_id):
+        t = self.timers[timer_id]
+        t["engine"].pause_toggle()
+        t["gen"] += 1
+        self._push(timer_id)
+        self._rearm()
+
+    def reset(self, timer_id):
+        """与 TimerEngine.reset 一致：回到初始时长并处于暂停状态"""
+        t = self.timers[timer_id]
+        t["engine"].reset()
+        t["gen"] += 1
+        self._rearm()
+
+    def remove(self, timer_id):
+        t = self.timers.pop(timer_id, None)
+        if t is None: return None
+        t["engine"].stop()
+        self._rearm()
+        return t
+
+    def status(self, timer_id):
+        t = self.timers[timer_id]
+        e = t["engine"]
+        return {"id": timer_id, "tag": t["tag"], "minutes": t["minutes"],
+                "state": "paused" if e.is_paused else "running", "remaining": round(e.remaining_seconds(), 3)}
+
+    # ---------- 堆 ----------
+    def _push(self, timer_id):
+        t = self.timers[timer_id]
+        e = t["engine"]
+        if e.deadline is None or e.is_paused: return
+        heapq.heappush(self._heap, (e.deadline, t["gen"], timer_id))
+        # 失效条目超过有效条目一倍时重建，堆大小保持 O(n)
+        if len(self._heap) > 2 * len(self.timers) + 64: self._rebuild()
+
+    def _valid(self, entry):
+        t = self.timers.get(entry[2])
+        return t is not None and t["gen"] == entry[1] and t["engine"].deadline == entry[0]
+
+    def _rebuild(self):
+        self._heap = [(t["engine"].deadline, t["gen"], tid) for tid, t in self.timers.items()
+                      if t["engine"].deadline is not None and not t["engine"].is_paused]
+        heapq.heapify(self._heap)
+
+    def next_deadline(self):
+        """最近的有效截止时间 (单调时钟)，没有运行中的计时器时为 None"""
+        while self._heap and not self._valid(self._heap[0]): heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    # ---------- 唤醒 ----------
+    def _check_suspend(self):
+        """单调时钟在系统休眠时停走：检测到休眠后让所有运行中的计时器对时并重建堆 (只在休眠后 O(n))"""
+        mono, wall = self.clock(), self.wall_clock()
+        gap = (wall - self._anchor[1]) - (mono - self._anchor[0])
+        self._anchor = (mono, wall)
+        if gap <= MonotonicTimerEngine.SUSPEND_THRESHOLD: return
+        for t in self.timers.values():
+            e = t["engine"]
+            if e.deadline is not None and not e.is_paused:
+                e._reconcile()
+                t["gen"] += 1
+        self._rebuild()
+
+    @traced("timer.scheduler.poll")
+    def poll(self):
+        """处理所有已到期的计时器，返回本次完成的计时器 id 列表"""
+        self._check_suspend()
+        now, finished = self.clock(), []
+        while self.next_deadline() is not None and self._heap[0][0] <= now:
+            _, _, timer_id = heapq.heappop(self._heap)
+            t = self.timers[timer_id]
+            done, _ = t["engine"].tick()
+            if not done:  # 时钟抖动：尚未真正到点
+                self._push(timer_id)
+                continue
+            del self.timers[timer_id]
+            finished.append(timer_id)
+            if self.history is not None: self.history.record_focus(t["minutes"], t["tag"], session=t["engine"].summary())
+            if self.on_finish: self.on_finish(timer_id, t)
+        self._rearm()
+        return finished
+
+    def _rearm(self):
+        """按最近截止时间重新预约唤醒；截止时间没变时保留现有预约"""
+        if self.after is None: return
+        deadline = self.next_deadline()
+        if self._armed is not None:
+            if deadline is not None and self._armed[0] == deadline: return
+            self.after_cancel(self._armed[1])
+            self._armed = None
+        if deadline is None: return
+        delay = min(max(0.0, deadline - self.clock()), self.MAX_SLEEP)
+        self._armed = (deadline, self.after(int(math.ceil(delay * 1000)), self._on_wakeup))
+
+    def _on_wakeup(self):
+        self._armed = None
+        self.poll()
+
+
+class SessionCheckpoint:
+    """
+    进行中会话的检查点日志 (JSON Lines，只包含当前这一个会话)。
+    只在状态变化时追加一行并 fsync：start (时长、标签、截止时间) / pause / resume (新截止时间) / reset；
+    运行期间每 HEARTBEAT 秒 touch 一次文件 (只更新修改时间，不写内容)，用于估计进程中断的时刻。
+    会话正常结束时删除文件。启动时 recover() 只读这个小文件，与历史规模无关：
+    - 中断不超过 RESUME_GRACE 秒且还没到时长：视为一直在专注，按原截止时间恢复 (暂停中的会话原样恢复)；
+    - 否则结束该会话，按实际专注秒数 (计到最后一次心跳，含重置前的部分) 与打断次数记入历史。
+    先删检查点再记录历史：两步之间崩溃最多丢一条记录，不会重复记录。
+    所有时间为墙上时钟 (进程重启后单调时钟不可比)。
+    submit(fn, *args) 决定文件操作在哪执行：界面 / 守护进程传入写线程 (ServiceExecutor.write)，
+    事件时刻在调用线程取好，写入与 fsync 按提交顺序在写线程完成；默认在当前线程直接执行。
+    """
+    HEARTBEAT = 60.0
+    RESUME_GRACE = 300.0
+
+    def __init__(self, filename="session.checkpoint.jsonl", clock=time.time, submit=None):
+        self.file_path = os.path.join(os.getcwd(), filename)
+        self.clock = clock
+        self.submit = submit
+        self._last_touch = 0.0
+
+    def _run(self, fn, *args):
+        if self.submit is None: fn(*args)
+        else: self.submit(fn, *args)
+
+    # ---------- 写入 ----------
+    def _write(self, event, truncate=False):
+        event["at"] = self._last_touch = round(self.clock(), 3)
+        line = (json.dumps(event, ensure_ascii=False, separators=(',', ':')) + "\n").encode('utf-8')
+        self._run(self._append, line, truncate)
+
+    def _append(self, line, truncate):
+        flags = os.O_WRONLY | os.O_CREAT | (os.O_TRUNC if truncate else os.O_APPEND)
+        try:
+            fd = os.open(self.file_path, flags, 0o644)
+            try:
+                os.write(fd, line)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError as e:
+            print(f"Checkpoint error: {e}")
+
+    def start(self, minutes, tag, remaining=None, paused=False, carried=0.0, interruptions=0):
+        """开始 (或恢复后重新登记) 一个会话；remaining / carried / interruptions 为恢复时的状态"""
+        total = minutes * 60
+        remaining = total if remaining is None else remaining
+        event = {"event": "start", "minutes": minutes, "tag": tag, "focused": round(total - remaining, 3),
+                 "paused": paused}
+        if not paused: event["deadline"] = round(self.clock() + remaining, 3)
+        if carried: event["carried"] = round(carried, 3)
+        if interruptions: event["interruptions"] = interruptions
+        self._write(event, truncate=True)
+
+    def pause(self):
+        self._write({"event": "pause"})
+
+    def resume(self, remaining):
+        self._write({"event": "resume", "deadline": round(self.clock() + remaining, 3)})
+
+    def reset(self):
+        self._write({"event": "reset"})
+
+    def heartbeat(self):
+        """计时过程中频繁调用也无妨：每 HEARTBEAT 秒才真正 touch 一次"""
+        now = self.clock()
+        if now - self._last_touch < self.HEARTBEAT: return
+        self._last_touch = now
+        self._run(self._touch)
+
+    def _touch(self):
+        try:
+            os.utime(self.file_path)
+        except OSError:
+            pass
+
+    def clear(self):
+        self._run(self._remove)
+
+    def _remove(self):
+        try:
+            os.remove(self.file_path)
+        except FileNotFoundError:
+            pass
+
+    # ---------- 恢复 ----------
+    def load(self):
+        """重放事件，返回会话状态；没有未结束的会话时返回 None"""
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+            last_alive = os.path.getmtime(self.file_path)
+        except OSError:
+            return None
+        state = None
+        for line in lines:
+            try:
+                ev = json.loads(line)
+            except ValueError:
+                continue  # 写到一半的末行
+            kind, at = ev.get("event"), ev.get("at", 0.0)
+            if kind == "start":
+                state = {"minutes": ev["minutes"], "tag": ev["tag"], "focused": float(ev.get("focused", 0.0)),
+                         "carried": float(ev.get("carried", 0.0)), "interruptions": ev.get("interruptions", 0),
+                         "running_since": None if ev.get("paused") else at, "last_at": at}
+            elif state is None:
+                continue
+            elif kind == "pause" and state["running_since"] is not None:
+                state["focused"] += at - state["running_since"]
+                state["running_since"] = None
+                state["interruptions"] += 1
+            elif kind == "resume" and state["running_since"] is None:
+                state["running_since"] = at
+            elif kind == "reset":
+                # 倒计时归零，已专注的部分转入 carried
+                if state["running_since"] is not None: state["focused"] += at - state["running_since"]
+                state["carried"] += state["focused"]
+                state["focused"], state["running_since"] = 0.0, None
+                state["interruptions"] += 1
+            if state is not None: state["last_at"] = at
+        if state is not None: state["last_alive"] = max(state["last_at"], last_alive)
+        return state
+
+    def recover(self, history):
+        """
+        处理上次中断的会话。返回 None (没有)、
+        {"action": "resume", "minutes", "tag", "remaining", "paused", "carried", "interruptions"}
+        (调用方据此恢复计时并重新 start)，
+        或 {"action": "recorded", "minutes", "tag", "focused_minutes"} (已结束并记入 history)。
+        """
+        state = self.load()
+        if state is None: return None
+        now, total = self.clock(), state["minutes"] * 60
+        gap = now - state["last_alive"]
+        focused, ended_at = state["focused"], state["last_at"]
+        if state["running_since"] is not None:
+            # 短暂中断按一直在专注处理；长时间中断只计到最后一次心跳；都不超过截止时间
+            deadline = state["running_since"] + (total - focused)
+            ended_at = min(now if gap <= self.RESUME_GRACE else state["last_alive"], deadline)
+            focused += max(0.0, ended_at - state["running_since"])
+        focused = min(focused, total)
+        info = {"minutes": state["minutes"], "tag": state["tag"]}
+        if gap <= self.RESUME_GRACE and focused < total:
+            return dict(info, action="resume", remaining=total - focused, paused=state["running_since"] is None,
+                        carried=state["carried"], interruptions=state["interruptions"])
+
+        self.clear()
+        completed = focused >= total
+        session = {"focused": round(state["carried"] + focused, 1),
+                   "interruptions": state["interruptions"] + (0 if completed else 1), "completed": completed}
+        if session["focused"] >= TimerEngine.MIN_RECORD_SECONDS:
+            history.record_focus(state["minutes"], state["tag"], timestamp=ended_at, session=session)
+        return dict(info, action="recorded", focused_minutes=round(session["focused"] / 60))
+
 
 # ===================================================
 # Infrastructure / Utils
@@ -83,117 +542,977 @@ class SoundManager:
         threading.Thread(target=_play, daemon=True).start()
 
 
+def atomic_write(file_path, write_fn, binary=False):
+    """
+    原子写文件：写临时文件 → fsync → os.replace 覆盖。
+    任何时刻磁盘上要么是完整的旧文件，要么是完整的新文件，不会留下截断内容。
+    """
+    tmp_path = f"{file_path}.{os.getpid()}.tmp"
+    try:
+        with (open(tmp_path, 'wb') if binary else open(tmp_path, 'w', encoding='utf-8')) as f:
+            write_fn(f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+
+
+_JSON_SEPARATORS = " \t\r\n,"
+_JSON_END = _JSON_SEPARATORS + "]"
+
+
+def iter_json_array(f, chunk_size=1 << 16):
+    """
+    流式解析顶层 JSON 数组：按 chunk_size 字符分块读取，逐个产出元素，内存只与单个元素大小有关。
+    格式错误时抛出 ValueError。
+    """
+    decoder = json.JSONDecoder()
+    buf, pos, eof, started = "", 0, False, False
+    while True:
+        while pos < len(buf) and buf[pos] in _JSON_SEPARATORS: pos += 1
+        if pos < len(buf):
+            if not started:
+                if buf[pos] != "[": raise ValueError("expected a JSON array")
+                started, pos = True, pos + 1
+                continue
+            if buf[pos] == "]": return
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+                # 元素之后须紧跟分隔符或 "]"，否则可能是被块边界截断的数字 (如 "1.5e")，补读后再解析
+                if eof or (end < len(buf) and buf[end] in _JSON_END):
+                    yield item
+                    pos = end
+                    continue
+            except ValueError:
+                if eof: raise
+        elif eof:
+            raise ValueError("unexpected end of JSON array")
+        chunk = f.read(chunk_size)
+        buf, pos, eof = buf[pos:] + chunk, 0, not chunk
+
+
+class ConcurrentModificationError(Exception):
+    """写入时发现文件版本已被其他进程 (或其他实例) 推进"""
+
+
+class FileLock:
+    """
+    跨进程读写锁 (fcntl.flock 建议锁) + 版本号。
+    锁文件是数据文件旁的 <文件名>.lock：数据文件每次保存都会被 os.replace 换成新文件，不能直接锁它。
+    锁文件内容为写入版本号，每次成功写入加一，用于乐观并发校验。
+    同一线程内可重入；进程内各线程先经 RLock 互斥，再由 flock 与其他进程互斥。
+    """
+
+    def __init__(self, data_path):
+        self.path = data_path + ".lock"
+        self._local = threading.RLock()
+        self._fd = None
+        self._mode = None  # 当前持有的模式 ("shared" / "exclusive")，None 表示未持有
+        self._depth = 0
+        self.last_wait = self.max_wait = 0.0  # 最近一次 / 最长一次等锁耗时 (秒)
+
+    def _open(self):
+        if self._fd is None: self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        return self._fd
+
+    @contextmanager
+    def _hold(self, mode):
+        start = time.perf_counter()
+        with self._local:
+            if self._depth == 0:
+                if fcntl is not None:
+                    fcntl.flock(self._open(), fcntl.LOCK_SH if mode == "shared" else fcntl.LOCK_EX)
+                self._mode = mode
+                self.last_wait = time.perf_counter() - start
+                self.max_wait = max(self.max_wait, self.last_wait)
+                profiler.observe("lock.wait_ms", self.last_wait * 1000)
+            elif mode == "exclusive" and self._mode == "shared":
+                raise RuntimeError("cannot upgrade a shared file lock")
+            self._depth += 1
+            try:
+                yield self
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    if fcntl is not None: fcntl.flock(self._fd, fcntl.LOCK_UN)
+                    self._mode = None
+
+    def shared(self):
+        """读锁：多个进程可同时持有，与写锁互斥"""
+        return self._hold("shared")
+
+    def exclusive(self):
+        """写锁：独占"""
+        return self._hold("exclusive")
+
+    def read_version(self):
+        with self.shared():
+            os.lseek(self._open(), 0, os.SEEK_SET)
+            raw = os.read(self._fd, 32)
+        try:
+            return int(raw or 0)
+        except ValueError:
+            return 0
+
+    def bump_version(self):
+        """在写锁内调用：版本号加一并返回"""
+        version = self.read_version() + 1
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        os.write(self._fd, str(version).encode().ljust(20))
+        return version
+
+
 # ===================================================
 # Repository Pattern
 # ===================================================
 class IRepository(ABC):
+    """
+    仓储接口。load_all 返回的数据可能是仓储内部缓存，调用方应视为只读：
+    修改时构造新的列表 / 字典再交给 save_all (写时复制)。
+    """
+
     @abstractmethod
     def load_all(self): pass
 
     @abstractmethod
     def save_all(self, data): pass
 
+    def append(self, record):
+        """追加单条记录，默认退化为整体读写；支持增量写入的仓储应覆盖此方法"""
+        self.save_all(self.load_all() + [record])
+
+    def append_many(self, records):
+        """批量追加 (导入)，默认经 update 整体读写一次；支持批量写入的仓储应覆盖此方法"""
+        records = list(records)
+        if records: self.update(lambda data: data + records)
+
+    def iter_all(self):
+        """逐条遍历全部记录 (导出 / 导入去重)，默认遍历 load_all；能流式读取的仓储应覆盖此方法"""
+        return iter(self.load_all())
+
+    def update(self, fn):
+        """
+        读-改-写：fn(当前数据) 返回新数据 (不修改传入对象)，返回 None 表示无需写入。
+        返回写入后的数据。文件仓储会在并发修改时基于最新数据重新调用 fn，因此 fn 必须可重复执行。
+        """
+        data = self.load_all()
+        new = fn(data)
+        if new is None: return data
+        self.save_all(new)
+        return new
+
+
+class ITaskQueryRepository(IRepository):
+    """可在存储端直接完成排序与单条增删改的任务仓储 (如 SQLite)，TaskService 会优先使用这些接口"""
+
+    @abstractmethod
+    def sorted_tasks(self): pass
+
+    @abstractmethod
+    def insert_task(self, task): pass
+
+    @abstractmethod
+    def toggle_task(self, task_id, updated_at): pass
+
+    @abstractmethod
+    def delete_task(self, task_id): pass
+
+
+class IHistoryQueryRepository(IRepository):
+    """可在存储端完成过滤、聚合与 Top-N 的历史仓储 (如 SQLite)，HistoryService 会优先使用这些接口"""
+
+    @abstractmethod
+    def sum_duration(self, start_ts=None, end_ts=None): pass
+
+    @abstractmethod
+    def tag_totals(self, start_ts): pass
+
+    @abstractmethod
+    def recent(self, n): pass
+
+    @abstractmethod
+    def session_counts(self, start_ts, end_ts):
+        """[start_ts, end_ts) 内的 (会话数, 打断次数合计)"""
+
+    @abstractmethod
+    def scan_range(self, start_ts, end_ts):
+        """按时间升序返回 [start_ts, end_ts) 内的 (timestamp, duration, tag) 元组"""
+
+
+class FileReadCache:
+    """
+    文件解析结果缓存，以 (mtime, size, inode) 作为有效性签名。
+    外部程序改写文件 (包括替换成新文件) 后签名变化，下次读取自动重新解析。
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.signature = None
+        self.data = None
+
+    def current_signature(self):
+        try:
+            st = os.stat(self.file_path)
+            return st.st_mtime_ns, st.st_size, st.st_ino
+        except OSError:
+            return None
+
+    def store(self, data, signature=None):
+        self.signature = signature or self.current_signature()
+        self.data = data
+
+    def invalidate(self):
+        self.signature, self.data = None, None
+
+
+class FileRepository(IRepository):
+    """
+    多实例安全的文件仓储基类：读取持读锁、写入持写锁 (FileLock)，每次写入推进版本号。
+    update 采用乐观并发：锁外读取并计算，写入前在写锁内校验版本号，被其他进程抢先则基于最新数据重试
+    (随机退避)。修改函数通常不在文件锁内执行，避免与调用方自己的锁形成死锁；
+    连续冲突 MAX_RETRIES 次后改为持写锁读-改-写 (此时修改函数在锁内执行)，保证有限步内完成。
+    """
+    RETRY_BACKOFF = 0.002  # 首次冲突后的退避上限 (秒)，之后逐次翻倍，最多 0.05 秒
+    MAX_RETRIES = 5
 
-class JsonRepository(IRepository):
     def __init__(self, filename):
         self.file_path = os.path.join(os.getcwd(), filename)
+        self.lock = FileLock(self.file_path)
+        self._cache = FileReadCache(self.file_path)
+        self._cache_version = None  # 缓存内容对应的版本号
+        self.conflicts = 0  # 累计版本冲突次数
+        self.locked_updates = 0  # 冲突过多、退回写锁内完成的 update 次数
+        self.last_retries = 0  # 最近一次 update 的重试次数
+
+    def load_versioned(self):
+        """返回 (数据, 版本号)：读取前后版本号一致才说明期间没有写入完成，否则重读"""
+        while True:
+            version = self.lock.read_version()
+            # 版本号不符说明缓存 (即使文件签名相同) 已过期
+            if self._cache_version != version: self._cache.invalidate()
+            data = self.load_all()
+            if self.lock.read_version() == version: return data, version
+
+    def _cached(self):
+        """缓存与文件一致时返回缓存数据，否则 None"""
+        signature = self._cache.signature
+        return self._cache.data if signature is not None and signature == self._cache.current_signature() else None
 
+    def _check_version(self, expected_version):
+        if expected_version is not None and self.lock.read_version() != expected_version:
+            raise ConcurrentModificationError(self.file_path)
+
+    def update(self, fn):
+        backoff, retries = self.RETRY_BACKOFF, 0
+        try:
+            while True:
+                data, version = self.load_versioned()
+                new = fn(data)
+                if new is None: return data
+                try:
+                    self.save_all(new, expected_version=version)
+                    return new
+                except ConcurrentModificationError:
+                    retries += 1
+                    self.conflicts += 1
+                    profiler.count("repo.conflict")
+                    if retries >= self.MAX_RETRIES: break
+                    time.sleep(random.uniform(0, backoff))
+                    backoff = min(backoff * 2, 0.05)
+            # 持写锁期间其他进程无法写入，一次即可完成
+            self.locked_updates += 1
+            profiler.count("repo.locked_update")
+            with self.lock.exclusive():
+                data, _ = self.load_versioned()
+                new = fn(data)
+                if new is None: return data
+                self.save_all(new)
+                return new
+        finally:
+            self.last_retries = retries
+            profiler.observe("repo.update_retries", retries)
+
+
+class JsonRepository(FileRepository):
+    @traced("repo.json.load")
     def load_all(self):
-        if not os.path.exists(self.file_path): return []
+        signature = self._cache.current_signature()
+        if signature is None: return []
+        if signature == self._cache.signature: profiler.count("repo.cache_hit"); return self._cache.data
         try:
-            with open(self.file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with self.lock.shared(), open(self.file_path, 'r', encoding='utf-8') as f:
+                signature = self._cache.current_signature()  # 持锁后重取，对应实际读到的内容
+                version = self.lock.read_version()
+                data = json.load(f)
         except:
             return []
+        self._cache.store(data, signature)
+        self._cache_version = version
+        return data
 
-    def save_all(self, data):
+    def iter_all(self):
+        """缓存有效时遍历缓存，否则持读锁分块解析文件 (不整体载入，也不写入缓存)"""
+        cached = self._cached()
+        if cached is not None:
+            yield from cached
+            return
+        if not os.path.exists(self.file_path): return
+        with self.lock.shared(), open(self.file_path, 'r', encoding='utf-8') as f:
+            yield from iter_json_array(f)
+
+    @traced("repo.json.save")
+    def save_all(self, data, expected_version=None):
+        """expected_version 不为 None 时，文件版本已变化则抛出 ConcurrentModificationError 且不写入"""
+        try:
+            text = json.dumps(data, indent=4, ensure_ascii=False)  # 序列化放在锁外，缩短持锁时间
+            with self.lock.exclusive():
+                self._check_version(expected_version)
+                atomic_write(self.file_path, lambda f: f.write(text))
+                self._cache_version = self.lock.bump_version()
+                self._cache.store(data)
+        except ConcurrentModificationError:
+            raise
+        except Exception as e:
+            self._cache.invalidate()
+            print(f"Save error: {e}")
+
+
+class JsonLinesRepository(FileRepository):
+    """
+    追加写日志仓储 (JSON Lines)。
+    每条记录占一行，append 只写一行并把记录追加到缓存列表末尾 (原地追加，不复制)，代价与历史总量无关；
+    因此 load_all 返回的列表只会在末尾增长，持有它的调用方可按长度识别新增记录。
+    文件只有追加，没有需要定期回收的空间；读取时发现无法解析的行则在写锁内重读并修复 (见 _repair)。
+    首次使用时自动从旧版 JSON 数组文件迁移。
+    """
+    TAIL_BYTES = 32  # read_appended 用来确认文件未被重写的末尾字节数
+
+    def __init__(self, filename, legacy_filename=None):
+        super().__init__(filename)
+        self.legacy_path = os.path.join(os.getcwd(), legacy_filename) if legacy_filename else None
+        self._migrate_legacy()
+
+    def _migrate_legacy(self):
+        """一次性迁移：日志文件不存在而旧版数组文件存在时，整体转换 (旧文件保留不动)"""
+        if os.path.exists(self.file_path): return
+        if not self.legacy_path or not os.path.exists(self.legacy_path): return
+        try:
+            with open(self.legacy_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Migrate error: {e}")
+            return
+        if isinstance(data, list): self.save_all(data)
+
+    @staticmethod
+    def _encode(record):
+        return json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n"
+
+    @traced("repo.jsonl.load")
+    def load_all(self):
+        signature = self._cache.current_signature()
+        if signature is None: return []
+        if signature == self._cache.signature: profiler.count("repo.cache_hit"); return self._cache.data
+        data, has_bad_line = [], False
+        try:
+            with self.lock.shared(), open(self.file_path, 'r', encoding='utf-8', errors='replace') as f:
+                signature = self._cache.current_signature()
+                version = self.lock.read_version()
+                for line in f:
+                    line = line.strip()
+                    if not line: continue
+                    try:
+                        data.append(json.loads(line))
+                    except ValueError:
+                        has_bad_line = True
+        except OSError:
+            return []
+        if has_bad_line: return self._repair()
+        self._cache.store(data, signature); self._cache_version = version
+        return data
+
+    def _repair(self):
+        """
+        在写锁内重读整个文件再重写：读锁释放后其他进程可能已写入或已修复，不能用锁外读到的数据覆盖。
+        只有末尾不带换行的残行 (追加被中断) 直接丢弃；中间无法解析的行移到 <文件名>.corrupt 并打印提示。
+        """
+        with self.lock.exclusive():
+            try:
+                with open(self.file_path, 'r', encoding='utf-8', errors='replace') as f:
+                    lines = f.read().split("\n")
+            except OSError:
+                return []
+            tail = lines.pop()  # 文件以换行结尾时为空串，否则是最后一行 (可能写到一半)
+            data, corrupt = [], []
+            for line in lines:
+                if not line.strip(): continue
+                try:
+                    data.append(json.loads(line))
+                except ValueError:
+                    corrupt.append(line)
+            if tail.strip():
+                try:
+                    data.append(json.loads(tail))
+                except ValueError:
+                    pass  # 中断写入留下的残行
+            if corrupt:
+                try:
+                    with open(self.file_path + ".corrupt", 'a', encoding='utf-8') as f:
+                        f.write("".join(line + "\n" for line in corrupt))
+                    print(f"Repair: moved {len(corrupt)} corrupt line(s) to {self.file_path}.corrupt")
+                except OSError as e:
+                    print(f"Repair error: {e}")
+                    return data  # 损坏行无处保存时不重写，原文件保持不变
+            self.save_all(data)
+        return data
+
+    @traced("repo.jsonl.save")
+    def save_all(self, data, expected_version=None):
         try:
-            with open(self.file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=4, ensure_ascii=False)
+            text = "".join(self._encode(rec) for rec in data)  # 序列化放在锁外，缩短持锁时间
+            with self.lock.exclusive():
+                self._check_version(expected_version)
+                atomic_write(self.file_path, lambda f: f.write(text))
+                self._cache_version = self.lock.bump_version()
+                self._cache.store(list(data))  # 缓存之后会被原地追加，不能与调用方共用同一列表
+        except ConcurrentModificationError:
+            raise
         except Exception as e:
+            self._cache.invalidate()
             print(f"Save error: {e}")
 
+    def iter_all(self):
+        """缓存有效时遍历缓存，否则持读锁逐行解析 (跳过残行，不整体载入，也不写入缓存)"""
+        cached = self._cached()
+        if cached is not None:
+            yield from cached
+            return
+        if not os.path.exists(self.file_path): return
+        with self.lock.shared(), open(self.file_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line: continue
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
+
+    def read_appended(self, offset, end, tail):
+        """
+        读取 [offset, end) 字节范围内追加的记录 (调用方持读锁)，跳过无法解析的行。
+        tail 为上次读到的最后 TAIL_BYTES 个字节：与文件 offset 之前的内容不符说明文件已被整体重写
+        (新文件可能复用旧 inode)，返回 None；tail 为 None 时不校验。否则返回 (记录列表, 新的 tail)。
+        """
+        start = max(0, offset - self.TAIL_BYTES)
+        try:
+            with open(self.file_path, 'rb') as f:
+                f.seek(start)
+                raw = f.read(end - start)
+        except OSError:
+            return None
+        if tail is not None and raw[:offset - start] != tail: return None
+        records = []
+        for line in raw[offset - start:].split(b"\n"):
+            if not line.strip(): continue
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+        return records, raw[-self.TAIL_BYTES:]
+
+    def _write_lines(self, data):
+        """在写锁内调用：把已编码的若干行追加到文件末尾，返回推进后的版本号"""
+        with open(self.file_path, 'a+b') as f:
+            # 上次写入若被中断、末尾缺少换行，先补齐，避免新记录与残行粘连
+            if f.seek(0, os.SEEK_END) > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n": data = b"\n" + data
+            f.write(data)
+        return self.lock.bump_version()
+
+    @traced("repo.jsonl.append_many")
+    def append_many(self, records):
+        """批量追加 (导入)：一次写入所有行，整块写入不会留下残行"""
+        if not records: return
+        data = "".join(self._encode(rec) for rec in records).encode('utf-8')
+        try:
+            with self.lock.exclusive():
+                self._cache_version = self._write_lines(data)
+        finally:
+            self._cache.invalidate()  # 大批量导入不把记录补进缓存
+
+    @traced("repo.jsonl.append")
+    def append(self, record):
+        line = self._encode(record).encode('utf-8')
+        try:
+            # 写锁：与其他进程的追加、修复重写互斥 (重写期间追加到旧文件的记录会丢失)
+            with self.lock.exclusive():
+                cache_valid = self._cached() is not None
+                version = self._write_lines(line)
+                # 缓存在追加前仍然有效时直接补上新记录 (原地追加，O(1))
+                if cache_valid and self._cache_version == version - 1:
+                    self._cache.data.append(record)
+                    self._cache.store(self._cache.data); self._cache_version = version
+                else: self._cache.invalidate()
+        except Exception as e:
+            self._cache.invalidate()
+            print(f"Append error: {e}")
+
+
+class WriteBehindRepository(IRepository):
+    """
+    写回缓冲仓储 (装饰器，包装任意 IRepository)。
+    save_all 只在内存中记下最新快照并立即返回，后台写线程等待 delay 秒合并窗口后统一落盘，
+    短时间内的连续修改只产生一次写入；读操作优先返回尚未落盘的快照；进程退出时 (atexit) 同步刷盘。
+    约定：传给 save_all 的数据交由仓储持有，调用方之后不再修改。
+    update 的修改函数会一并排队：落盘时若文件已被其他进程修改，在最新数据上重放这些函数，不丢失任何一方的修改。
+    """
+    DELAY = 0.3
+    _EMPTY = object()
+
+    def __init__(self, inner: IRepository, delay=None):
+        self.inner = inner
+        self.delay = self.DELAY if delay is None else delay
+        self._pending = self._EMPTY  # 等待落盘的最新快照
+        self._inflight = self._EMPTY  # 正在落盘的快照
+        # 待落盘的 update 函数及第一个函数作用的数据；None 表示待落盘的是 save_all 给出的整体快照
+        self._ops, self._ops_base = [], None
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()  # 保证同一时刻只有一个写入
+        self._worker = None
+        atexit.register(self.flush)
+
+    @property
+    def file_path(self):
+        return self.inner.file_path
+
+    def load_all(self):
+        with self._cond:
+            data = self._pending if self._pending is not self._EMPTY else self._inflight
+        if data is not self._EMPTY: return data
+        return self.inner.load_all()
+
+    def iter_all(self):
+        with self._cond:
+            data = self._pending if self._pending is not self._EMPTY else self._inflight
+        return iter(data) if data is not self._EMPTY else self.inner.iter_all()
+
+    def save_all(self, data):
+        with self._cond:
+            self._pending = data
+            self._ops, self._ops_base = None, None  # 整体快照覆盖之前排队的修改
+            self._start_worker()
+
+    def update(self, fn):
+        """调用方需自行串行化 (如 TaskService 的锁)"""
+        with self._cond:
+            base = self._pending if self._pending is not self._EMPTY else self._inflight
+        if base is self._EMPTY: base = self.inner.load_all()
+        new = fn(base)
+        if new is None: return base
+        with self._cond:
+            if self._ops is not None:
+                if not self._ops: self._ops_base = base
+                self._ops.append(fn)
+            self._pending = new
+            self._start_worker()
+        return new
+
+    def _start_worker(self):
+        """在 _cond 内调用"""
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="repo-writer", daemon=True)
+            self._worker.start()
+        self._cond.notify()
+
+    def flush(self):
+        """同步写出所有未落盘的修改"""
+        self._write_pending()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is self._EMPTY: self._cond.wait()
+            time.sleep(self.delay)  # 合并窗口：期间的后续 save_all 只会覆盖快照
+            self._write_pending()
+
+    @traced("repo.write_behind.flush")
+    def _write_pending(self):
+        with self._io_lock:
+            with self._cond:
+                if self._pending is self._EMPTY: return
+                data, self._pending = self._pending, self._EMPTY
+                ops, base = self._ops, self._ops_base
+                self._ops, self._ops_base = [], None
+                self._inflight = data
+            try:
+                if not ops: self.inner.save_all(data)  # 整体快照：最后写入者生效
+                else: self.inner.update(lambda current: data if current is base else self._replay(ops, current))
+            finally:
+                with self._cond: self._inflight = self._EMPTY
+
+    @staticmethod
+    def _replay(ops, data):
+        for fn in ops:
+            new = fn(data)
+            if new is not None: data = new
+        return data
+
 
 # ===================================================
 # Service Layer
 # ===================================================
+class TaskStore:
+    """
+    任务内存索引：id → 任务 的哈希表 + 按排序键维护的有序列表。
+    增删改通过 bisect 增量维护顺序，按 id 查找 O(1)，有序读取无需重新排序。
+    """
+
+    def __init__(self, tasks=()):
+        self.by_id = {t["id"]: t for t in tasks}
+        entries = sorted(((self.sort_key(t), t["id"]), t) for t in self.by_id.values())
+        # 两个平行数组：_keys 供 bisect 定位，_tasks 按同一顺序存放任务对象
+        self._keys = [k for k, _ in entries]
+        self._tasks = [t for _, t in entries]
+
+    @staticmethod
+    def sort_key(t):
+        due = t.get('due_date') or ""
+        return 1 if t.get('completed') else 0, 0 if due else 1, due, -t.get('created_at', 0)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def get(self, task_id):
+        return self.by_id.get(task_id)
+
+    def put(self, task):
+        """新增或替换任务 (替换时传入新的字典对象)"""
+        self.remove(task["id"])
+        self.by_id[task["id"]] = task
+        key = (self.sort_key(task), task["id"])
+        pos = bisect.bisect_left(self._keys, key)
+        self._keys.insert(pos, key)
+        self._tasks.insert(pos, task)
+
+    def remove(self, task_id):
+        task = self.by_id.pop(task_id, None)
+        if task is None: return None
+        pos = bisect.bisect_left(self._keys, (self.sort_key(task), task_id))
+        del self._keys[pos]
+        del self._tasks[pos]
+        return task
+
+    def sorted_tasks(self):
+        return list(self._tasks)
+
+    def to_list(self):
+        return list(self.by_id.values())
+
+
 class TaskService:
     def __init__(self, repository: IRepository):
         self.repo = repository
+        self._store = None
+        self._source = None  # 构建 _store 时仓储返回的数据对象
+        self._lock = threading.RLock()  # 读线程池与写线程会同时访问 _store
 
-    def get_tasks(self):
-        tasks = self.repo.load_all()
+    def _get_store(self):
+        """仓储返回的数据对象不变 (命中缓存) 时复用索引，否则重建"""
+        data = self.repo.load_all()
+        if self._store is None or data is not self._source:
+            self._store, self._source = TaskStore(data), data
+        return self._store
 
-        def sort_key(x):
-            return (1 if x.get('completed') else 0, 0 if x.get('due_date') else 1, x.get('due_date', ""),
-                    -x.get('created_at', 0))
+    def _update(self, mutate):
+        """
+        mutate(store) 修改任务索引，返回 False 表示无变化。
+        通过仓储的 update 执行：数据未被其他进程改动时直接增量修改现有索引；
+        否则 (或写入时发现冲突被重试) 基于最新数据重建索引后再执行一次 mutate。
+        """
+        def apply(data):
+            with self._lock:  # 写回仓储可能在后台线程重放
+                store = self._store if self._store is not None and data is self._source else TaskStore(data)
+                if mutate(store) is False: return None
+                new = store.to_list()
+                self._store, self._source = store, new
+                return new
 
-        return sorted(tasks, key=sort_key)
+        with self._lock:
+            self.repo.update(apply)
 
+    @traced("service.tasks.get")
+    def get_tasks(self):
+        if isinstance(self.repo, ITaskQueryRepository): return self.repo.sorted_tasks()
+        with self._lock:
+            return self._get_store().sorted_tasks()
+
+    @traced("service.tasks.add")
     def add_task(self, title, due_date=""):
-        tasks = self.repo.load_all()
-        new_task = {
+        task = {
             "id": str(uuid.uuid4()), "title": title, "due_date": due_date, "completed": False,
             "created_at": datetime.now().timestamp(), "updated_at": datetime.now().timestamp()
         }
-        tasks.append(new_task)
-        self.repo.save_all(tasks)
+        if isinstance(self.repo, ITaskQueryRepository):
+            self.repo.insert_task(task)
+            return
+        self._update(lambda store: store.put(task))
 
+    @traced("service.tasks.toggle")
     def toggle_task(self, task_id):
-        tasks = self.repo.load_all()
-        for t in tasks:
-            if t["id"] == task_id:
-                t["completed"] = not t["completed"]
-                t["updated_at"] = datetime.now().timestamp()
-                break
-        self.repo.save_all(tasks)
+        if isinstance(self.repo, ITaskQueryRepository):
+            self.repo.toggle_task(task_id, datetime.now().timestamp())
+            return
+        def toggle(store):
+            t = store.get(task_id)
+            if t is None: return False
+            # 写时复制：替换为新字典，不修改缓存中的旧对象
+            store.put(dict(t, completed=not t["completed"], updated_at=datetime.now().timestamp()))
+        self._update(toggle)
 
+    @traced("service.tasks.delete")
     def delete_task(self, task_id):
-        tasks = self.repo.load_all()
-        tasks = [t for t in tasks if t["id"] != task_id]
-        self.repo.save_all(tasks)
+        if isinstance(self.repo, ITaskQueryRepository):
+            self.repo.delete_task(task_id)
+            return
+        self._update(lambda store: None if store.remove(task_id) is not None else False)
 
 
 # [请修改 src/core.py 中的 HistoryService 类]
 
+class HistoryIndex:
+    """
+    历史聚合索引：按日 / ISO 周 / 月 / 标签预先汇总专注时长，持久化到旁路 JSON 文件。
+    sessions 按同样的日 / 周 / 月标签 (格式互不重叠) 汇总 [会话数, 打断次数]，与时长在同一次 add 中累加。
+    source 记录索引覆盖到的历史文件状态 (大小, 修改时间, inode)，tail 为覆盖范围内最后几个字节：
+    文件只是追加了新行时从 source 的大小处读取新增部分补齐，否则整体重建。
+    pending 为补进内存、尚未落盘的记录数，累计 SAVE_EVERY 条才重写一次索引文件；
+    未落盘的部分下次打开时同样从文件尾部补齐，不会丢失。
+    """
+    VERSION = 4
+    SAVE_EVERY = 50
+
+    def __init__(self, filename, calendar: BucketCalendar = None):
+        self.file_path = os.path.join(os.getcwd(), filename)
+        self.calendar = calendar or BucketCalendar()
+        self._reset()
+
+    def _reset(self):
+        self.source, self.tail, self.pending = None, b"", 0
+        self.day, self.week, self.month, self.tag, self.week_tag = {}, {}, {}, {}, {}
+        self.sessions = {}
+
+    def add(self, rec):
+        try:
+            d = self.calendar.day_of(rec["timestamp"])
+            dur = rec["duration"]
+        except Exception:
+            return
+        tag = rec.get("tag", "未分类")
+        interruptions = rec.get("interruptions", 0)
+        day = BucketCalendar.label_of_day(d, "day")
+        week = BucketCalendar.label_of_day(d, "week")
+        month = BucketCalendar.label_of_day(d, "month")
+
+        self.day[day] = self.day.get(day, 0) + dur
+        self.week[week] = self.week.get(week, 0) + dur
+        self.month[month] = self.month.get(month, 0) + dur
+        self.tag[tag] = self.tag.get(tag, 0) + dur
+        tags = self.week_tag.setdefault(week, {})
+        tags[tag] = tags.get(tag, 0) + dur
+        for label in (day, week, month):
+            counts = self.sessions.get(label)
+            if counts is None: self.sessions[label] = [1, interruptions]
+            else: counts[0] += 1; counts[1] += interruptions
+
+    @traced("history.index.rebuild")
+    def rebuild(self, data, source, tail=b""):
+        self._reset()
+        for rec in data: self.add(rec)
+        self.source, self.tail = source, tail
+
+    @traced("history.index.load")
+    def load(self):
+        """从磁盘读取索引，成功返回 True；失败时内存索引为空"""
+        self._reset()
+        if not os.path.exists(self.file_path): return False
+        try:
+            with open(self.file_path, 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+            # 时区变化后各桶归属不同，视为过期
+            if raw.get("version") != self.VERSION or raw.get("tz") != self.calendar.key: return False
+            self.source, self.tail, self.pending = raw["source"], bytes.fromhex(raw["tail"]), 0
+            self.day, self.week, self.month = raw["day"], raw["week"], raw["month"]
+            self.tag, self.week_tag, self.sessions = raw["tag"], raw["week_tag"], raw["sessions"]
+            return True
+        except Exception:
+            self._reset()
+            return False
+
+    @traced("history.index.save")
+    def save(self):
+        raw = {"version": self.VERSION, "tz": self.calendar.key, "source": self.source, "tail": self.tail.hex(),
+               "day": self.day, "week": self.week, "month": self.month, "tag": self.tag, "week_tag": self.week_tag,
+               "sessions": self.sessions}
+        try:
+            atomic_write(self.file_path, lambda f: json.dump(raw, f, ensure_ascii=False, separators=(',', ':')))
+            self.pending = 0
+        except Exception as e:
+            print(f"Index save error: {e}")
+
+
+class HistoryTimeline:
+    """
+    按时间戳排序的历史视图：有序时间戳列表 + 平行的 (timestamp, duration, tag) 元组。
+    时间段用 bisect 定位，查询代价只与时间段内的记录数有关。
+    """
+
+    def __init__(self, data):
+        rows = []
+        for rec in data:
+            try:
+                rows.append((float(rec["timestamp"]), rec["duration"], rec.get("tag", "未分类")))
+            except (KeyError, TypeError, ValueError):
+                continue
+        rows.sort(key=lambda r: r[0])
+        self.rows = rows
+        self.ts = [r[0] for r in rows]
+
+    def add(self, rec):
+        try:
+            row = (float(rec["timestamp"]), rec["duration"], rec.get("tag", "未分类"))
+        except (KeyError, TypeError, ValueError):
+            return
+        pos = bisect.bisect_right(self.ts, row[0])
+        self.ts.insert(pos, row[0])
+        self.rows.insert(pos, row)
+
+    def scan(self, start_ts, end_ts):
+        return self.rows[bisect.bisect_left(self.ts, start_ts):bisect.bisect_left(self.ts, end_ts)]
+
+
 class HistoryService:
-    def __init__(self, repository: IRepository):
+    GRANULARITIES = GRANULARITIES
+
+    def __init__(self, repository: IRepository, index: HistoryIndex = None, calendar: BucketCalendar = None):
         self.repo = repository
+        self.index = index
+        self.calendar = calendar or (index.calendar if index is not None else BucketCalendar())
+        self._index_ready = False
+        self._lock = threading.RLock()  # 索引可能被后台预读线程与 UI 线程同时访问
+        self._timeline, self._timeline_source, self._timeline_len = None, None, 0
+        if index is not None: atexit.register(self.flush)
+
+    def set_calendar(self, calendar: BucketCalendar):
+        """切换统计时区 (TIMEZONE 变更)：索引按新时区重建，二进制后端的 date 字段随之改变"""
+        with self._lock:
+            self.calendar = calendar
+            if self.index is not None:
+                self.index.calendar = calendar
+                self._index_ready = False  # 磁盘索引的 tz 不再匹配，下次查询时重建
+            if hasattr(self.repo, "calendar"): self.repo.calendar = calendar
+
+    def _source_signature(self):
+        try:
+            st = os.stat(self.repo.file_path)
+            return [st.st_size, st.st_mtime_ns, st.st_ino]
+        except (AttributeError, OSError):
+            return [0, 0, 0]
+
+    def _journal_lock(self, mode):
+        """历史文件的跨进程锁 (shared / exclusive)；仓储没有文件锁时不加锁"""
+        lock = getattr(self.repo, "lock", None)
+        return getattr(lock, mode)() if isinstance(lock, FileLock) else nullcontext()
 
-    def record_focus(self, minutes, tag):
+    def _ensure_index(self):
+        """
+        保证内存索引与历史文件一致：优先复用磁盘索引；文件只是追加了新行时只读取新增部分补齐 (包括其他进程的追加)，
+        文件被重写、索引缺失或时区不符时全量重建。
+        重建持历史文件写锁：读取 (可能触发修复重写) 与签名之间不会有其他进程追加。
+        """
+        source = self._source_signature()
+        if self._index_ready and self.index.source == source: return
+        if not self._index_ready: self.index.load()
+        if self.index.source != source:
+            if self._catch_up_index():
+                if self.index.pending >= self.index.SAVE_EVERY: self._save_index()
+            else:
+                with self._journal_lock("exclusive"):
+                    data = self.repo.load_all()
+                    source = self._source_signature()
+                    self.index.rebuild(data, source, self._journal_tail(source[0]))
+                    self.index.save()
+        self._index_ready = True
+
+    def _journal_tail(self, size):
+        """历史文件前 size 个字节的最后几个字节 (仓储不支持增量读取时为空)"""
+        if not hasattr(self.repo, "read_appended"): return b""
+        appended = self.repo.read_appended(size, size, None)
+        return appended[1] if appended else b""
+
+    def _catch_up_index(self):
+        """
+        把索引覆盖范围之后追加的记录补进索引：读锁内取签名并读取 [旧大小, 新大小) 的字节，期间不会有追加。
+        同一文件 (inode 相同、未变短、覆盖范围末尾字节一致) 才能补齐，否则返回 False。
+        """
+        old = self.index.source
+        if not old or len(old) != 3 or not hasattr(self.repo, "read_appended"): return False
+        with self._journal_lock("shared"):
+            source = self._source_signature()
+            if source[2] != old[2] or source[0] < old[0]: return False
+            appended = self.repo.read_appended(old[0], source[0], self.index.tail)
+        if appended is None: return False
+        records, self.index.tail = appended
+        for rec in records: self.index.add(rec)
+        self.index.source = source
+        self.index.pending += len(records)
+        return True
+
+    def _save_index(self):
+        """持历史文件写锁先补齐再落盘：落盘的索引总是覆盖到当时的文件末尾，不会被其他进程较旧的索引覆盖"""
+        with self._journal_lock("exclusive"):
+            if self.index.source != self._source_signature(): self._catch_up_index()
+            self.index.save()
+
+    def flush(self):
+        """把尚未落盘的索引增量写入索引文件 (进程退出时自动调用)；历史文件已被删除时不再写"""
+        with self._lock:
+            if self.index is None or not self._index_ready or not self.index.pending: return
+            if os.path.exists(self.repo.file_path): self._save_index()
+
+    @traced("service.history.record")
+    def record_focus(self, minutes, tag, timestamp=None, session=None):
+        """
+        timestamp 为会话结束时刻 (默认现在)；恢复中断会话时用实际结束时刻记账。
+        session 为 TimerEngine.summary() 的会话明细：此时 duration 按实际专注秒数折算 (四舍五入到分钟)，
+        另存 planned (计划分钟) / focused (秒) / interruptions / completed；不传时 duration 即 minutes。
+        """
+        now_ts = time.time() if timestamp is None else timestamp
         record = {
-            "date": datetime.now().strftime("%Y-%m-%d"),
-            "timestamp": datetime.now().timestamp(),
+            "date": self.calendar.label(now_ts, "day"),
+            "timestamp": now_ts,
             "duration": minutes,
             "tag": tag
         }
-        data = self.repo.load_all()
-        data.append(record)
-        self.repo.save_all(data)
+        if session is not None:
+            record["duration"] = round(session["focused"] / 60)
+            record.update(planned=minutes, focused=session["focused"], interruptions=session["interruptions"],
+                          completed=session["completed"])
+        with self._lock:
+            self.repo.append(record)
+            # 索引从文件尾部补齐：读到的正是索引覆盖范围之后的全部追加 (含其他进程的)，不会漏记或重记
+            if self.index is not None: self._ensure_index()
 
+    @traced("service.history.stats")
     def get_stats(self):
         """获取基础 KPI 数据"""
-        data = self.repo.load_all()
-        now = datetime.now()
-        today = now.strftime("%Y-%m-%d")
-        start_week = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
-        start_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-
-        stats = {"day": 0, "week": 0, "month": 0, "tag_dist": {}}
-        for rec in data:
-            try:
-                rec_time = datetime.fromtimestamp(rec["timestamp"])
-                dur = rec["duration"]
-                tag = rec.get("tag", "未分类")
-
-                if rec["date"] == today: stats["day"] += dur
-                if rec_time >= start_week:
-                    stats["week"] += dur
-                    stats["tag_dist"][tag] = stats["tag_dist"].get(tag, 0) + dur
-                if rec_time >= start_month: stats["month"] += dur
-            except:
-                continue
-        return stats
+        if isinstance(self.repo, IHistoryQueryRepository): return self._query_snapshot(0)["stats"]
+        if self.index is not None:
+            with self._lock:
+                self._ensure_index()
+                return self._stats_from_index(self._periods(time.time()))
+        return self.get_snapshot(recent_n=0)["stats"]
 
     def get_chart_data(self):
         """
@@ -202,41 +1521,211 @@ class HistoryService:
         - trend: 近7天每天的专注时长及百分比
         - recent: 最近 10 条详细记录
         """
-        data = self.repo.load_all()
+        snapshot = self.get_snapshot()
+        return {"trend": snapshot["trend"], "recent": snapshot["recent"]}
+
+    def _periods(self, now_ts):
+        """
+        当前时刻相关的桶边界 (配置时区)：今天 / 本周 / 本月的起点与标签、近7天的日期与边界。
+        之后的逐条聚合只需拿记录时间戳与这些整数边界比较。
+        """
+        cal = self.calendar
+        today = cal.date_of(now_ts)
+        days = [today - timedelta(days=i) for i in range(6, -1, -1)]
+        return {
+            "today": cal.day_start(today),
+            "tomorrow": cal.day_start(today + timedelta(days=1)),
+            "week": cal.day_start(today - timedelta(days=today.weekday())),
+            "month": cal.day_start(today.replace(day=1)),
+            "labels": {g: BucketCalendar.label_of_day(today, g) for g in ("day", "week", "month")},
+            "dates": [BucketCalendar.label_of_day(d, "day") for d in days],
+            "trend_bounds": [cal.day_start(d) for d in days] + [cal.day_start(today + timedelta(days=1))],
+        }
+
+    @traced("service.history.snapshot")
+    def get_snapshot(self, recent_n=10):
+        """
+        看板快照：一次读取、一次遍历同时得到
+        - stats: KPI、本周标签分布与会话数 / 打断率 (有索引时直接取汇总值)
+        - trend: 近7天每天的专注时长及百分比
+        - recent: 最近 N 条记录 (容量为 N 的小顶堆，无需整体排序)
+        """
+        if isinstance(self.repo, IHistoryQueryRepository): return self._query_snapshot(recent_n)
 
-        # 1. 准备近7天的日期骨架
-        dates = [(datetime.now() - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(6, -1, -1)]
+        data = self.repo.load_all()
+        p = self._periods(time.time())
+        dates, bounds = p["dates"], p["trend_bounds"]
         trend_map = {d: 0 for d in dates}
+        heap = []
+
+        use_index = self.index is not None
+        if use_index:
+            with self._lock:
+                self._ensure_index()
+                stats = self._stats_from_index(p)
+                for d in dates: trend_map[d] = self.index.day.get(d, 0)
+        else:
+            stats = {"day": 0, "week": 0, "month": 0, "tag_dist": {}}
+            counts = {"day": [0, 0], "week": [0, 0], "month": [0, 0]}  # [会话数, 打断次数]
+            c_day, c_week, c_month = counts["day"], counts["week"], counts["month"]
+            trend = [0] * len(dates)
+            t_today, t_tomorrow, t_week, t_month, t_trend = p["today"], p["tomorrow"], p["week"], p["month"], bounds[0]
 
-        # 2. 聚合数据 & 提取最近记录
-        # 按时间戳倒序排列
-        sorted_data = sorted(data, key=lambda x: x.get("timestamp", 0), reverse=True)
-        recent_records = sorted_data[:10]
+        for i, rec in enumerate(data):
+            if recent_n > 0:
+                # (时间戳, -序号)：时间戳相同时保留先出现的记录，与稳定倒序排序一致
+                item = (rec.get("timestamp", 0), -i, rec)
+                if len(heap) < recent_n: heapq.heappush(heap, item)
+                elif item[:2] > heap[0][:2]: heapq.heapreplace(heap, item)
+            if use_index: continue
 
-        for rec in data:
-            d = rec.get("date")
-            if d in trend_map:
-                trend_map[d] += rec.get("duration", 0)
-
-        # 3. 格式化为 UI 易用的结构
-        trend_list = []
-        max_val = max(trend_map.values()) if trend_map.values() and max(trend_map.values()) > 0 else 1
-
-        for d in dates:
-            val = trend_map[d]
-            trend_list.append({
-                "date_label": d[5:],  # 只显示 MM-DD
-                "full_date": d,
-                "minutes": val,
-                "percent": val / max_val  # 用于进度条长度
-            })
+            try:
+                ts = rec["timestamp"]
+                dur = rec["duration"]
+            except (KeyError, TypeError):
+                continue
+            if ts >= t_tomorrow: continue
+            if ts >= t_trend: trend[bisect.bisect_right(bounds, ts) - 1] += dur
+            if ts < t_week and ts < t_month: continue
+            n = rec.get("interruptions", 0)
+            if ts >= t_today: stats["day"] += dur; c_day[0] += 1; c_day[1] += n
+            if ts >= t_week:
+                tag = rec.get("tag", "未分类")
+                stats["week"] += dur
+                stats["tag_dist"][tag] = stats["tag_dist"].get(tag, 0) + dur
+                c_week[0] += 1; c_week[1] += n
+            if ts >= t_month: stats["month"] += dur; c_month[0] += 1; c_month[1] += n
 
+        if not use_index:
+            trend_map = dict(zip(dates, trend))
+            self._add_session_stats(stats, counts)
+        heap.sort(key=lambda item: item[:2], reverse=True)
         return {
-            "trend": trend_list,
-            "recent": recent_records
+            "stats": stats,
+            "trend": self._format_trend(dates, trend_map),
+            "recent": [item[2] for item in heap]
         }
 
+    @traced("service.history.query")
+    def query(self, start, end, granularity="day", group_by_tag=False):
+        """
+        任意时间段 [start, end) 按粒度 (hour / day / week / month) 汇总。
+        start / end 可为 datetime (无时区信息时按配置时区解释)、date 或时间戳。
+        返回按时间升序、零值补齐的桶列表：
+        [{"label", "start", "end", "minutes", "tags"(仅 group_by_tag 时)}]
+        """
+        start_ts, end_ts = self.calendar.to_timestamp(start), self.calendar.to_timestamp(end)
+        bounds, labels = self.calendar.bucket_bounds(start_ts, end_ts, granularity)
+        buckets = [{"label": labels[i], "start": bounds[i], "end": bounds[i + 1], "minutes": 0}
+                   for i in range(len(labels))]
+        if group_by_tag:
+            for b in buckets: b["tags"] = {}
+
+        j = 0
+        for ts, dur, tag in self._scan_range(start_ts, end_ts):
+            while ts >= bounds[j + 1]: j += 1  # 记录与桶边界都有序，指针只前进
+            bucket = buckets[j]
+            bucket["minutes"] += dur
+            if group_by_tag: bucket["tags"][tag] = bucket["tags"].get(tag, 0) + dur
+        return buckets
+
+    def _scan_range(self, start_ts, end_ts):
+        if isinstance(self.repo, IHistoryQueryRepository): return self.repo.scan_range(start_ts, end_ts)
+        with self._lock:
+            data = self.repo.load_all()
+            if self._timeline is None or self._timeline_source is not data or len(data) < self._timeline_len:
+                self._timeline, self._timeline_source = HistoryTimeline(data), data
+            else:
+                # 同一缓存列表只会在末尾增长 (原地追加)：新增记录逐条插入，不整体重建
+                for rec in data[self._timeline_len:]: self._timeline.add(rec)
+            self._timeline_len = len(data)
+            return self._timeline.scan(start_ts, end_ts)
+
+    def _query_snapshot(self, recent_n):
+        """过滤、聚合与 Top-N 全部下推给存储端，只取回结果"""
+        p = self._periods(time.time())
+        stats = {"day": self.repo.sum_duration(start_ts=p["today"], end_ts=p["tomorrow"]),
+                 "week": self.repo.sum_duration(start_ts=p["week"], end_ts=p["tomorrow"]),
+                 "month": self.repo.sum_duration(start_ts=p["month"], end_ts=p["tomorrow"]),
+                 "tag_dist": self.repo.tag_totals(p["week"])}
+        self._add_session_stats(stats, {"day": self.repo.session_counts(p["today"], p["tomorrow"]),
+                                        "week": self.repo.session_counts(p["week"], p["tomorrow"]),
+                                        "month": self.repo.session_counts(p["month"], p["tomorrow"])})
+        daily = self.query(p["trend_bounds"][0], p["trend_bounds"][-1], "day")
+        return {
+            "stats": stats,
+            "trend": self._format_trend(p["dates"], {b["label"]: b["minutes"] for b in daily}),
+            "recent": self.repo.recent(recent_n) if recent_n > 0 else []
+        }
+
+    def _stats_from_index(self, periods):
+        day, week, month = (periods["labels"][g] for g in ("day", "week", "month"))
+        stats = {"day": self.index.day.get(day, 0),
+                 "week": self.index.week.get(week, 0),
+                 "month": self.index.month.get(month, 0),
+                 "tag_dist": dict(self.index.week_tag.get(week, {}))}
+        return self._add_session_stats(stats, {g: self.index.sessions.get(periods["labels"][g], (0, 0))
+                                               for g in ("day", "week", "month")})
+
+    @staticmethod
+    def _add_session_stats(stats, counts):
+        """
+        counts: {"day" / "week" / "month": (会话数, 打断次数)}，
+        补充 sessions / interruptions / interruption_rate (平均每个会话的打断次数) 三组同样键的数据。
+        """
+        stats["sessions"] = {g: c[0] for g, c in counts.items()}
+        stats["interruptions"] = {g: c[1] for g, c in counts.items()}
+        stats["interruption_rate"] = {g: round(c[1] / c[0], 2) if c[0] else 0.0 for g, c in counts.items()}
+        return stats
+
+    @staticmethod
+    def _format_trend(dates, trend_map):
+        """格式化为 UI 易用的结构"""
+        max_val = max(trend_map.values()) if trend_map and max(trend_map.values()) > 0 else 1
+        return [{
+            "date_label": d[5:],  # 只显示 MM-DD
+            "full_date": d,
+            "minutes": trend_map[d],
+            "percent": trend_map[d] / max_val  # 用于进度条长度
+        } for d in dates]
+
 
 # 依赖注入
-task_service = TaskService(JsonRepository("tasks.json"))
-history_service = HistoryService(JsonRepository("focus_history.json"))
\ No newline at end of file
+def create_services():
+    """按 ConfigManager 的 STORAGE_BACKEND ("json" / "sqlite" / "binary") 组装仓储与服务"""
+    backend = config_manager.get("STORAGE_BACKEND", "json")
+    calendar = BucketCalendar(config_manager.get("TIMEZONE", ""))
+    if backend == "sqlite":
+        from .sqlite_store import open_sqlite_repositories
+        task_repo, history_repo = open_sqlite_repositories(config_manager.get("SQLITE_DB_FILE", "zenpomo.db"))
+        return TaskService(task_repo), HistoryService(history_repo, calendar=calendar)
+
+    task_service = TaskService(WriteBehindRepository(JsonRepository("tasks.json")))
+    journal = JsonLinesRepository("focus_history.jsonl", legacy_filename="focus_history.json")
+    if backend == "binary":
+        from .binary_history import BinaryHistoryRepository
+        # 二进制文件不存在时从 JSON 历史迁移一次
+        return task_service, HistoryService(BinaryHistoryRepository(
+            config_manager.get("HISTORY_BINARY_FILE", "focus_history.bin"), migrate_from=journal, calendar=calendar),
+            calendar=calendar)
+    return task_service, HistoryService(journal, HistoryIndex("focus_history.index.json", calendar))
+
+
+_services = None
+_services_lock = threading.Lock()
+
+
+def get_services():
+    """首次调用时才组装服务，导入 core 本身不触发任何文件 I/O"""
+    global _services
+    if _services is None:
+        with _services_lock:
+            if _services is None: _services = create_services()
+    return _services
+
+
+def __getattr__(name):
+    # 兼容 `from .core import task_service` 写法：模块级属性按需创建 (PEP 562)
+    if name == "task_service": return get_services()[0]
+    if name == "history_service": return get_services()[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -0,0 +1,350 @@
+# src/daemon.py
+"""
+无界面计时守护进程：在 asyncio 事件循环上运行计时引擎与任务 / 历史服务，通过 Unix 域套接字接受控制。
+
+协议 (一行一条，UTF-8)：
+    请求  命令 [参数...]          参数按 shell 规则切分，含空格的标签用引号，如 start 25 "📚 学习"
+    响应  一行紧凑 JSON            {"ok": true, ...} 或 {"ok": false, "error": "..."}
+命令：start [分钟] [标签] | pause (暂停 / 继续) | reset | stop | status | stats | info
+      tasks | task-add 标题 [截止日期] | task-toggle id | task-del id
+      并行计时器：timers | timer-add 分钟 [标签] | timer-pause id | timer-reset id | timer-stop id
+      profile [export [文件]]：性能埋点汇总 (需开启 PROFILING)，export 时同时写出 Chrome Trace 文件
+      watch：此后该连接还会收到状态变化事件 {"event": "started" | "paused" | "resumed" | "reset" | "stopped" | "finished", ...}
+             以及并行计时器完成事件 {"event": "timer-finished", "id", "tag", "minutes"}
+会话状态变化写入检查点 (SessionCheckpoint，DAEMON_CHECKPOINT_FILE)，守护进程被杀后重启时接着计时或按实际时长补记。
+检查点与 Tk 界面的分开：两者是各自独立的计时器，同时运行时不会互相覆盖或补记对方的会话；
+历史与任务文件则是共用的 (仓储层的文件锁保证多进程写入不丢失)。
+历史记录按实际专注秒数与打断次数 (暂停 / 重置 / 提前停止) 记账，stop 提前结束的会话同样记录。
+多个客户端 (命令行、脚本) 可同时连接；Tk 界面不连接守护进程，仍使用自己的计时器。
+计时不做逐秒 tick：只在预计完成时刻唤醒一次 (最长 MAX_SLEEP 秒对一次时，覆盖系统休眠)，status 查询时按截止时间即时计算，空闲时几乎不占 CPU。
+
+用法：python -m src.daemon serve [套接字路径]
+      python -m src.daemon status | start 25 "📚 学习" | ...   (作为客户端发送一条命令)
+"""
+import os
+import sys
+import json
+import math
+import time
+import shlex
+import socket
+import asyncio
+
+from .config import config_manager
+from .config_watch import ConfigWatcher
+from .core import MonotonicTimerEngine, TimerScheduler, SessionCheckpoint
+from .workers import ServiceExecutor, AsyncServices
+from .profiling import profiler
+
+
+def _encode(obj):
+    return (json.dumps(obj, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def default_socket_path():
+    return os.path.join(os.getcwd(), config_manager.get("DAEMON_SOCKET", "zenpomo.sock"))
+
+
+class TimerDaemon:
+    MAX_SLEEP = 30.0  # 单次最长休眠秒数，醒来后对时 (单调时钟在系统休眠期间停走)
+
+    def __init__(self, services: AsyncServices = None, engine_factory=MonotonicTimerEngine, checkpoint=None):
+        self.services = services or AsyncServices(ServiceExecutor())
+        self.engine_factory = engine_factory
+        # 检查点的 fsync 放在写线程，不阻塞事件循环；命令在检查点落盘后才应答
+        self._checkpoint_io = None
+        self.checkpoint = checkpoint or SessionCheckpoint(
+            config_manager.get("DAEMON_CHECKPOINT_FILE", "daemon.checkpoint.jsonl"), submit=self._write_checkpoint)
+        self.engine = None
+        self.minutes, self.tag = 0, ""
+        self.watchers = set()
+        # 并行计时器共用一个截止时间堆，整个守护进程只预约一次最近的唤醒
+        self.scheduler = TimerScheduler(after=lambda ms, fn: asyncio.get_running_loop().call_later(ms / 1000, fn),
+                                        after_cancel=lambda handle: handle.cancel(),
+                                        history=self.services, on_finish=self._on_timer_finish)
+        self._wakeup = None
+        self._started = time.monotonic()
+        self.commands = {
+            "start": self.cmd_start, "pause": self.cmd_pause, "reset": self.cmd_reset, "stop": self.cmd_stop,
+            "status": self.cmd_status, "stats": self.cmd_stats, "info": self.cmd_info,
+            "tasks": self.cmd_tasks, "task-add": self.cmd_task_add, "task-toggle": self.cmd_task_toggle,
+            "task-del": self.cmd_task_del, "timers": self.cmd_timers, "timer-add": self.cmd_timer_add,
+            "timer-pause": self.cmd_timer_pause, "timer-reset": self.cmd_timer_reset, "timer-stop": self.cmd_timer_stop,
+            "profile": self.cmd_profile,
+        }
+
+    # ---------- 连接 ----------
+    async def serve(self, path):
+        if os.path.exists(path): os.remove(path)  # 上次异常退出遗留的套接字文件
+        self.recover_session()
+        server = await asyncio.start_unix_server(self._handle_client, path=path)
+        loop, watcher = asyncio.get_running_loop(), None
+        if config_manager.get("CONFIG_WATCH", True):
+            # config.json 变化时在事件循环线程里重载 (如新的默认标签)
+            watcher = ConfigWatcher(config_manager.CONFIG_FILE, lambda: loop.call_soon_threadsafe(config_manager.reload),
+                                    config_manager.get("CONFIG_WATCH_INTERVAL", 1.0)).start()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if watcher is not None: watcher.stop()
+            if os.path.exists(path): os.remove(path)
+
+    async def _handle_client(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line: break
+                if line.strip() == b"watch":
+                    self.watchers.add(writer)
+                    writer.write(_encode(dict(ok=True, **self.status())))
+                else:
+                    writer.write(_encode(await self.execute(line.decode("utf-8", "replace"))))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.watchers.discard(writer)
+            writer.close()
+
+    async def execute(self, line):
+        try:
+            args = shlex.split(line)
+        except ValueError as e:
+            return {"ok": False, "error": str(e)}
+        if not args: return {"ok": False, "error": "empty command"}
+        handler = self.commands.get(args[0])
+        if handler is None: return {"ok": False, "error": f"unknown command: {args[0]}"}
+        try:
+            result = handler(*args[1:])
+            if asyncio.iscoroutine(result): result = await result
+            await self._checkpoint_durable()
+            return dict(ok=True, **result)
+        except (TypeError, ValueError) as e:
+            return {"ok": False, "error": str(e)}
+        except KeyError as e:
+            return {"ok": False, "error": f"no such timer: {e.args[0]}"}
+
+    def _write_checkpoint(self, fn, *args):
+        self._checkpoint_io = self.services.executor.write(fn, *args)  # 写线程按序执行，记下最后一次即可
+
+    async def _checkpoint_durable(self):
+        io, self._checkpoint_io = self._checkpoint_io, None
+        if io is not None: await asyncio.wrap_future(io)
+
+    def _broadcast(self, event, payload=None):
+        if not self.watchers: return
+        data = _encode(dict(payload if payload is not None else self.status(), event=event))
+        for w in list(self.watchers):
+            if w.is_closing(): self.watchers.discard(w)
+            else: w.write(data)
+
+    # ---------- 计时 ----------
+    def _schedule(self):
+        """在预计完成时刻 (最多 MAX_SLEEP 秒后) 唤醒一次"""
+        if self._wakeup is not None: self._wakeup.cancel(); self._wakeup = None
+        e = self.engine
+        if e is None or not e.is_running or e.is_paused: return
+        delay = min(e.remaining_seconds(), self.MAX_SLEEP)
+        self._wakeup = asyncio.get_running_loop().call_later(delay, self._on_wakeup)
+
+    def _on_wakeup(self):
+        self._wakeup = None
+        if not self._check():
+            self.checkpoint.heartbeat()
+            self._schedule()
+
+    def recover_session(self):
+        """启动时处理上次中断的会话 (只读检查点文件，与历史规模无关)；返回 recover 的结果"""
+        result = self.checkpoint.recover(self.services)
+        if result is not None and result["action"] == "resume":
+            self.minutes, self.tag = result["minutes"], result["tag"]
+            self.engine = self.engine_factory(self.minutes)
+            restore = (result["remaining"], result["paused"], result["carried"], result["interruptions"])
+            self.engine.restore(*restore)
+            self.checkpoint.start(self.minutes, self.tag, *restore)
+            self._schedule()
+        return result
+
+    def _check(self):
+        """对时一次；到点时转入完成流程，返回是否已完成"""
+        e = self.engine
+        if e is None or not e.is_running or e.is_paused: return False
+        finished, _ = e.tick()
+        if finished:
+            if self._wakeup is not None: self._wakeup.cancel(); self._wakeup = None
+            asyncio.ensure_future(self._finish(e))
+        return finished
+
+    async def _finish(self, engine):
+        minutes, tag, session = self.minutes, self.tag, engine.summary()
+        self._broadcast("finished")
+        if self.engine is engine: self.engine = None
+        self.checkpoint.clear()
+        await asyncio.wrap_future(self.services.record_focus(minutes, tag, session=session))
+
+    def _record_stopped(self, engine, minutes, tag):
+        """提前停止的会话按实际专注时长记录 (已完成的由 _finish 记录；太短的视为误触，不记)"""
+        session = engine.summary()
+        if session["completed"] or session["focused"] < engine.MIN_RECORD_SECONDS: return
+        self.services.record_focus(minutes, tag, session=session)
+
+    def status(self):
+        e = self.engine
+        if e is None: return {"state": "idle", "minutes": self.minutes, "tag": self.tag}
+        self._check()  # 即时对时
+        left = e.remaining_seconds()
+        m, s = divmod(math.ceil(left), 60)
+        state = "finished" if not e.is_running else ("paused" if e.is_paused else "running")
+        return {"state": state, "minutes": self.minutes, "tag": self.tag,
+                "remaining": round(left, 3), "time": f"{m:02d}:{s:02d}",
+                "progress": round(1 - left / e.total_seconds if e.total_seconds else 1.0, 4)}
+
+    def _on_timer_finish(self, timer_id, timer):
+        self._broadcast("timer-finished", {"id": timer_id, "tag": timer["tag"], "minutes": timer["minutes"]})
+
+    # ---------- 命令 ----------
+    def cmd_start(self, minutes=None, tag=None):
+        if self.engine is not None: raise ValueError("session already running")
+        self.minutes = int(minutes) if minutes is not None else self.minutes or 25
+        if self.minutes <= 0: raise ValueError("minutes must be positive")
+        self.tag = tag or self.tag or config_manager.get("FOCUS_TAGS")[0]
+        self.engine = self.engine_factory(self.minutes)
+        self.engine.start()
+        self.checkpoint.start(self.minutes, self.tag)
+        self._schedule()
+        self._broadcast("started")
+        return self.status()
+
+    def _require_engine(self):
+        if self.engine is None: raise ValueError("no active session")
+        return self.engine
+
+    def cmd_pause(self):
+        e = self._require_engine()
+        e.pause_toggle()
+        if e.is_paused: self.checkpoint.pause()
+        else: self.checkpoint.resume(e.remaining_seconds())
+        self._schedule()
+        self._broadcast("paused" if e.is_paused else "resumed")
+        return self.status()
+
+    def cmd_reset(self):
+        self._require_engine().reset()
+        self.checkpoint.reset()
+        self._schedule()
+        self._broadcast("reset")
+        return self.status()
+
+    def cmd_stop(self):
+        e = self._require_engine()
+        e.stop()
+        self._record_stopped(e, self.minutes, self.tag)
+        self.engine = None
+        self.checkpoint.clear()
+        self._schedule()
+        self._broadcast("stopped")
+        return self.status()
+
+    def cmd_status(self):
+        return self.status()
+
+    def cmd_info(self):
+        return {"pid": os.getpid(), "uptime": round(time.monotonic() - self._started, 3),
+                "cpu": round(time.process_time(), 4), "clients_watching": len(self.watchers)}
+
+    def cmd_profile(self, action=None, path=None):
+        if action not in (None, "export"): raise ValueError(f"unknown profile action: {action}")
+        result = dict(enabled=profiler.enabled, **profiler.summary())
+        if action == "export": result["trace_file"] = profiler.export(path)
+        return result
+
+    async def cmd_stats(self):
+        snapshot = await asyncio.wrap_future(self.services.get_snapshot(recent_n=0))
+        return {"stats": snapshot["stats"], "trend": [(t["full_date"], t["minutes"]) for t in snapshot["trend"]]}
+
+    async def cmd_tasks(self):
+        return {"tasks": await asyncio.wrap_future(self.services.get_tasks())}
+
+    async def cmd_task_add(self, title, due_date=""):
+        await asyncio.wrap_future(self.services.add_task(title, due_date))
+        return {}
+
+    async def cmd_task_toggle(self, task_id):
+        await asyncio.wrap_future(self.services.toggle_task(task_id))
+        return {}
+
+    async def cmd_task_del(self, task_id):
+        await asyncio.wrap_future(self.services.delete_task(task_id))
+        return {}
+
+    def cmd_timers(self):
+        self.scheduler.poll()  # 顺带处理已到期的计时器
+        return {"timers": [self.scheduler.status(tid) for tid in self.scheduler.timers]}
+
+    def cmd_timer_add(self, minutes, tag=None):
+        if int(minutes) <= 0: raise ValueError("minutes must be positive")
+        timer_id = self.scheduler.add(int(minutes), tag or config_manager.get("FOCUS_TAGS")[0])
+        return self.scheduler.status(timer_id)
+
+    def cmd_timer_pause(self, timer_id):
+        self.scheduler.pause_toggle(timer_id)
+        return self.scheduler.status(timer_id)
+
+    def cmd_timer_reset(self, timer_id):
+        self.scheduler.reset(timer_id)
+        return self.scheduler.status(timer_id)
+
+    def cmd_timer_stop(self, timer_id):
+        t = self.scheduler.remove(timer_id)
+        if t is None: raise KeyError(timer_id)
+        self._record_stopped(t["engine"], t["minutes"], t["tag"])
+        return {"id": timer_id}
+
+
+class DaemonClient:
+    """同步客户端 (命令行与脚本使用)：每条命令一行请求、一行响应，连接可复用"""
+
+    def __init__(self, path=None, timeout=5.0):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout)
+        self.sock.connect(path or default_socket_path())
+        self.reader = self.sock.makefile("rb")
+
+    def call(self, *args):
+        self.sock.sendall((" ".join(shlex.quote(str(a)) for a in args) + "\n").encode("utf-8"))
+        return self.read_message()
+
+    def read_message(self):
+        line = self.reader.readline()
+        if not line: raise ConnectionError("daemon closed the connection")
+        return json.loads(line)
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+
+def main(argv):
+    if not argv or argv[0] == "serve":
+        path = argv[1] if len(argv) > 1 else default_socket_path()
+        print(f"ZenPomo daemon listening on {path}")
+        try:
+            asyncio.run(TimerDaemon().serve(path))
+        except KeyboardInterrupt:
+            pass
+        return 0
+    client = DaemonClient()
+    try:
+        reply = client.call(*argv)
+        print(json.dumps(reply, ensure_ascii=False))
+        if argv[0] == "watch":
+            client.sock.settimeout(None)
+            while True: print(json.dumps(client.read_message(), ensure_ascii=False))
+    finally:
+        client.close()
+    return 0 if reply.get("ok", True) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
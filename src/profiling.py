@@ -0,0 +1,196 @@
+# src/profiling.py
+"""
+轻量内置性能埋点：计时区间 (span)、计数器与直方图，可导出为 Chrome Trace JSON
+(chrome://tracing 或 ui.perfetto.dev 直接打开)。
+
+由配置 PROFILING 开启，PROFILE_TRACE_FILE 指定进程退出时自动导出的文件。
+关闭时每个埋点只多一次属性判断：@traced 直接调用原函数，span() 返回共享的空上下文。
+    @traced("repo.json.load")          整个函数计时
+    with profiler.span("ui.stats.render", rows=n): ...
+    profiler.count("repo.cache_hit")   profiler.observe("lock.wait_ms", 1.5)
+"""
+import os
+import json
+import time
+import atexit
+import bisect
+import functools
+import threading
+from collections import deque
+
+from .config import config_manager
+
+
+class Histogram:
+    """固定桶直方图 (单位毫秒)，分位数按桶上界估计"""
+    BOUNDS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+    def __init__(self):
+        self.buckets = [0] * (len(self.BOUNDS) + 1)
+        self.count, self.total, self.min, self.max = 0, 0.0, float("inf"), 0.0
+
+    def add(self, value):
+        self.buckets[bisect.bisect_left(self.BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value < self.min: self.min = value
+        if value > self.max: self.max = value
+
+    def percentile(self, p):
+        if not self.count: return 0.0
+        rank, seen = p * self.count, 0
+        for i, n in enumerate(self.buckets):
+            seen += n
+            if seen >= rank: return min(self.BOUNDS[i], self.max) if i < len(self.BOUNDS) else self.max
+        return self.max
+
+    def summary(self):
+        if not self.count: return {"count": 0}
+        return {"count": self.count, "total": round(self.total, 3), "avg": round(self.total / self.count, 3),
+                "min": round(self.min, 3), "p50": round(self.percentile(0.5), 3), "p99": round(self.percentile(0.99), 3),
+                "max": round(self.max, 3)}
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self): return self
+
+    def __exit__(self, *exc): return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "args", "start")
+
+    def __init__(self, profiler, name, args):
+        self.profiler, self.name, self.args = profiler, name, args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+
+class Profiler:
+    MAX_EVENTS = 200_000  # 追踪事件环形缓冲上限，长时间运行只保留最近的事件
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_file = None
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter_ns()
+        self._threads = {}  # tid → 线程名 (导出为 Chrome Trace 元数据)
+        self.reset()
+
+    def configure(self, enabled, trace_file=None):
+        self.enabled = bool(enabled)
+        self.trace_file = trace_file or None
+
+    def reset(self):
+        with self._lock:
+            self.counters, self.histograms = {}, {}
+            self.events = deque(maxlen=self.MAX_EVENTS)
+
+    # ---------- 埋点 ----------
+    def span(self, name, **args):
+        if not self.enabled: return _NULL_SPAN
+        return _Span(self, name, args)
+
+    def count(self, name, n=1):
+        if not self.enabled: return
+        now = time.perf_counter_ns()
+        with self._lock:
+            value = self.counters[name] = self.counters.get(name, 0) + n
+            self.events.append(("C", name, now, value, threading.get_ident()))
+
+    def observe(self, name, value):
+        if not self.enabled: return
+        with self._lock:
+            h = self.histograms.get(name)
+            if h is None: h = self.histograms[name] = Histogram()
+            h.add(value)
+
+    def record(self, name, start_ns, end_ns, args=None):
+        """登记一个已结束的区间：进直方图 (毫秒) 并作为追踪事件保留"""
+        thread = threading.current_thread()
+        with self._lock:
+            h = self.histograms.get(name)
+            if h is None: h = self.histograms[name] = Histogram()
+            h.add((end_ns - start_ns) / 1e6)
+            self.events.append(("X", name, start_ns, end_ns - start_ns, thread.ident, args))
+            if thread.ident not in self._threads: self._threads[thread.ident] = thread.name
+
+    # ---------- 输出 ----------
+    def summary(self):
+        with self._lock:
+            return {"counters": dict(self.counters),
+                    "histograms": {k: h.summary() for k, h in sorted(self.histograms.items())}}
+
+    def report(self):
+        s = self.summary()
+        lines = [f"{'span / histogram (ms)':<32}{'count':>8}{'avg':>10}{'p50':>10}{'p99':>10}{'max':>10}"]
+        for name, h in s["histograms"].items():
+            if h["count"]: lines.append(f"{name:<32}{h['count']:>8}{h['avg']:>10.3f}{h['p50']:>10.3f}{h['p99']:>10.3f}{h['max']:>10.3f}")
+        lines += [f"{name:<32}{value:>8}" for name, value in sorted(s["counters"].items())]
+        return "\n".join(lines)
+
+    def trace_events(self):
+        """转换为 Chrome Trace 事件 (时间单位微秒，以 Profiler 创建时刻为零点)"""
+        pid, origin = os.getpid(), self._origin
+        with self._lock:
+            events, threads = list(self.events), dict(self._threads)
+        out = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+               for tid, name in threads.items()]
+        for e in events:
+            if e[0] == "X":
+                _, name, start, dur, tid, args = e
+                out.append({"name": name, "cat": name.split(".", 1)[0], "ph": "X", "pid": pid, "tid": tid,
+                            "ts": (start - origin) / 1000, "dur": dur / 1000, "args": args or {}})
+            else:
+                _, name, ts, value, tid = e
+                out.append({"name": name, "ph": "C", "pid": pid, "tid": tid,
+                            "ts": (ts - origin) / 1000, "args": {"value": value}})
+        return out
+
+    def export(self, path=None):
+        """写出 Chrome Trace JSON (统计汇总放在 otherData)，返回文件路径"""
+        path = path or self.trace_file or "zenpomo.trace.json"
+        doc = {"traceEvents": self.trace_events(), "displayTimeUnit": "ms", "otherData": self.summary()}
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(doc, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        return path
+
+    def _export_at_exit(self):
+        if not self.enabled or not self.trace_file: return
+        try:
+            self.export()
+        except Exception as e:
+            print(f"Profile export error: {e}")
+
+
+profiler = Profiler()
+profiler.configure(config_manager.get("PROFILING", False), config_manager.get("PROFILE_TRACE_FILE"))
+atexit.register(profiler._export_at_exit)
+
+
+def traced(name):
+    """函数计时装饰器；关闭时只多一次 enabled 判断"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled: return fn(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profiler.record(name, start, time.perf_counter_ns())
+        return wrapper
+    return decorate
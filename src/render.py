@@ -0,0 +1,69 @@
+# src/render.py
+"""
+合并渲染调度器：界面状态先写进调度器，只有与上次推给 Tk 的值不同的项才标记为脏；
+同一轮事件处理中的多次修改合并到一次 after_idle 刷新里，一帧内统一下发到主窗口与迷你窗口。
+每次刷新记录耗时，用于观察计时器空转时的渲染开销。
+"""
+import time
+
+from .profiling import traced
+
+_MISSING = object()
+
+
+class RenderScheduler:
+    FRAME_BUDGET_MS = 8.0  # 单次刷新的时间预算，超出后剩余项顺延到下一轮空闲
+
+    def __init__(self, root, clock=time.perf_counter):
+        self.root = root
+        self.clock = clock
+        self._applied = {}  # key → 已下发给 Tk 的值
+        self._dirty = {}    # key → (value, apply)，按首次标记顺序下发
+        self._scheduled = False
+        self.flushes, self.applied, self.skipped = 0, 0, 0
+        self.total_ms, self.max_ms, self.last_ms = 0.0, 0.0, 0.0
+
+    def set(self, key, value, apply):
+        """登记一项界面状态；值未变化时不产生任何 Tk 调用"""
+        if self._applied.get(key, _MISSING) == value:
+            self._dirty.pop(key, None)  # 同一轮内先改后改回
+            self.skipped += 1
+            return
+        self._dirty[key] = (value, apply)
+        if not self._scheduled:
+            self._scheduled = True
+            self.root.after_idle(self.flush)
+
+    def forget(self, prefix):
+        """控件销毁 / 重建后丢弃其缓存值，下次 set 时重新下发"""
+        for d in (self._applied, self._dirty):
+            for key in [k for k in d if k.startswith(prefix)]: del d[key]
+
+    @traced("ui.render.flush")
+    def flush(self):
+        self._scheduled = False
+        if not self._dirty: return
+        start = self.clock()
+        budget = start + self.FRAME_BUDGET_MS / 1000
+        while self._dirty:
+            key = next(iter(self._dirty))
+            value, apply = self._dirty.pop(key)
+            try:
+                apply(value)
+                self._applied[key] = value
+            except Exception as e:
+                print(f"Render error: {e}")
+            self.applied += 1
+            if self._dirty and self.clock() > budget:
+                self._scheduled = True
+                self.root.after(1, self.flush)
+                break
+        self.last_ms = (self.clock() - start) * 1000
+        self.total_ms += self.last_ms
+        self.max_ms = max(self.max_ms, self.last_ms)
+        self.flushes += 1
+
+    def report(self):
+        avg = self.total_ms / self.flushes if self.flushes else 0.0
+        return (f"render: {self.flushes} flushes, {self.applied} updates, {self.skipped} skipped, "
+                f"avg {avg:.3f} ms, max {self.max_ms:.3f} ms")
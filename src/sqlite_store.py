@@ -0,0 +1,237 @@
+# src/sqlite_store.py
+"""
+SQLite 存储后端 (标准库 sqlite3，WAL 模式)。
+历史与任务存放在同一个数据库文件的两张表中，过滤、聚合、排序与 Top-N 都在 SQL 中完成。
+在 config.json 中设置 "STORAGE_BACKEND": "sqlite" 启用；首次创建数据库时自动导入现有 JSON 数据，
+也可以手动执行：python -m src.sqlite_store [数据库文件]
+"""
+import os
+import sys
+import json
+import sqlite3
+import threading
+
+from .core import IHistoryQueryRepository, ITaskQueryRepository, JsonRepository, JsonLinesRepository
+from .profiling import traced
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id        INTEGER PRIMARY KEY,
+    timestamp REAL    NOT NULL,
+    date      TEXT    NOT NULL,
+    duration  NUMERIC NOT NULL,
+    tag       TEXT,
+    extra     TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history(timestamp);
+CREATE INDEX IF NOT EXISTS idx_history_date ON history(date);
+CREATE INDEX IF NOT EXISTS idx_history_tag ON history(tag);
+
+CREATE TABLE IF NOT EXISTS tasks (
+    id         TEXT    PRIMARY KEY,
+    title      TEXT    NOT NULL,
+    due_date   TEXT    NOT NULL DEFAULT '',
+    completed  INTEGER NOT NULL DEFAULT 0,
+    created_at REAL    NOT NULL DEFAULT 0,
+    updated_at REAL    NOT NULL DEFAULT 0,
+    extra      TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_order ON tasks(completed, due_date);
+"""
+
+HISTORY_FIELDS = ("date", "timestamp", "duration", "tag")
+TASK_FIELDS = ("id", "title", "due_date", "completed", "created_at", "updated_at")
+
+# 与 TaskStore.sort_key 一致：未完成在前 → 有截止日期在前 → 截止日期升序 → 创建时间倒序
+TASK_ORDER = "completed, due_date = '', due_date, created_at DESC"
+
+
+def _extra(record, known_fields):
+    """不属于固定列的字段打包为 JSON，保证读写往返不丢字段"""
+    rest = {k: v for k, v in record.items() if k not in known_fields}
+    return json.dumps(rest, ensure_ascii=False) if rest else None
+
+
+class SqliteDatabase:
+    """共享连接：WAL 模式 + 进程内互斥锁，允许 UI 线程与后台线程共用"""
+
+    def __init__(self, filename):
+        self.file_path = os.path.join(os.getcwd(), filename)
+        self.is_new = not os.path.exists(self.file_path)
+        self.conn = sqlite3.connect(self.file_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.RLock()
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SCHEMA)
+
+    @traced("repo.sqlite.query")
+    def query(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    @traced("repo.sqlite.execute")
+    def execute(self, sql, params=()):
+        with self.lock, self.conn:
+            return self.conn.execute(sql, params)
+
+    @traced("repo.sqlite.executemany")
+    def executemany(self, sql, rows):
+        with self.lock, self.conn:
+            self.conn.executemany(sql, rows)
+
+    def iterate(self, sql, params=(), batch=5000):
+        """分批取回查询结果 (导出大表)，每批之间释放进程内锁"""
+        cursor = self.conn.cursor()
+        with self.lock:
+            cursor.execute(sql, params)
+        while True:
+            with self.lock:
+                rows = cursor.fetchmany(batch)
+            if not rows: return
+            yield from rows
+
+
+class SqliteHistoryRepository(IHistoryQueryRepository):
+    def __init__(self, db: SqliteDatabase):
+        self.db = db
+        self.file_path = db.file_path
+
+    @staticmethod
+    def _to_row(rec):
+        return (rec.get("timestamp", 0), rec.get("date", ""), rec.get("duration", 0), rec.get("tag"),
+                _extra(rec, HISTORY_FIELDS))
+
+    @staticmethod
+    def _to_record(row):
+        rec = {"date": row["date"], "timestamp": row["timestamp"], "duration": row["duration"]}
+        if row["tag"] is not None: rec["tag"] = row["tag"]
+        if row["extra"]: rec.update(json.loads(row["extra"]))
+        return rec
+
+    def load_all(self):
+        return [self._to_record(r) for r in self.db.query("SELECT * FROM history ORDER BY id")]
+
+    def save_all(self, data):
+        with self.db.lock, self.db.conn:
+            self.db.conn.execute("DELETE FROM history")
+            self.db.conn.executemany("INSERT INTO history (timestamp, date, duration, tag, extra) VALUES (?, ?, ?, ?, ?)",
+                                     (self._to_row(rec) for rec in data))
+
+    def append(self, record):
+        self.db.execute("INSERT INTO history (timestamp, date, duration, tag, extra) VALUES (?, ?, ?, ?, ?)",
+                        self._to_row(record))
+
+    def append_many(self, records):
+        self.db.executemany("INSERT INTO history (timestamp, date, duration, tag, extra) VALUES (?, ?, ?, ?, ?)",
+                            [self._to_row(rec) for rec in records])
+
+    def iter_all(self):
+        return (self._to_record(r) for r in self.db.iterate("SELECT * FROM history ORDER BY id"))
+
+    def existing_timestamps(self, timestamps):
+        """timestamps 中已有记录的时间戳 (导入去重)：走 timestamp 索引，每次查询最多 500 个参数"""
+        found, keys = set(), list(timestamps)
+        for i in range(0, len(keys), 500):
+            part = keys[i:i + 500]
+            found.update(r[0] for r in self.db.query(
+                f"SELECT DISTINCT timestamp FROM history WHERE timestamp IN ({','.join('?' * len(part))})", part))
+        return found
+
+    def sum_duration(self, start_ts=None, end_ts=None):
+        clauses, params = [], []
+        if start_ts is not None: clauses.append("timestamp >= ?"); params.append(start_ts)
+        if end_ts is not None: clauses.append("timestamp < ?"); params.append(end_ts)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return self.db.query(f"SELECT COALESCE(SUM(duration), 0) FROM history{where}", params)[0][0]
+
+    def tag_totals(self, start_ts):
+        rows = self.db.query("SELECT COALESCE(tag, '未分类') AS tag, SUM(duration) FROM history "
+                             "WHERE timestamp >= ? GROUP BY 1", (start_ts,))
+        return {r[0]: r[1] for r in rows}
+
+    def session_counts(self, start_ts, end_ts):
+        # 打断次数在 extra 的 JSON 中 (旧记录没有，按 0 计)
+        row = self.db.query("SELECT COUNT(*), COALESCE(SUM(json_extract(extra, '$.interruptions')), 0) FROM history "
+                            "WHERE timestamp >= ? AND timestamp < ?", (start_ts, end_ts))[0]
+        return row[0], row[1]
+
+    def recent(self, n):
+        # 时间戳相同时先写入的排前面，与 JSON 后端的稳定排序一致
+        rows = self.db.query("SELECT * FROM history ORDER BY timestamp DESC, id ASC LIMIT ?", (n,))
+        return [self._to_record(r) for r in rows]
+
+    def scan_range(self, start_ts, end_ts):
+        return [tuple(r) for r in self.db.query(
+            "SELECT timestamp, duration, COALESCE(tag, '未分类') FROM history "
+            "WHERE timestamp >= ? AND timestamp < ? ORDER BY timestamp, id", (start_ts, end_ts))]
+
+
+class SqliteTaskRepository(ITaskQueryRepository):
+    def __init__(self, db: SqliteDatabase):
+        self.db = db
+        self.file_path = db.file_path
+
+    @staticmethod
+    def _to_row(t):
+        return (t["id"], t.get("title", ""), t.get("due_date") or "", 1 if t.get("completed") else 0,
+                t.get("created_at", 0), t.get("updated_at", 0), _extra(t, TASK_FIELDS))
+
+    @staticmethod
+    def _to_task(row):
+        task = {k: row[k] for k in TASK_FIELDS}
+        task["completed"] = bool(task["completed"])
+        if row["extra"]: task.update(json.loads(row["extra"]))
+        return task
+
+    def load_all(self):
+        return [self._to_task(r) for r in self.db.query("SELECT * FROM tasks")]
+
+    def save_all(self, data):
+        with self.db.lock, self.db.conn:
+            self.db.conn.execute("DELETE FROM tasks")
+            self.db.conn.executemany("INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                     (self._to_row(t) for t in data))
+
+    def append_many(self, tasks):
+        self.db.executemany("INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?)", [self._to_row(t) for t in tasks])
+
+    def iter_all(self):
+        return (self._to_task(r) for r in self.db.iterate("SELECT * FROM tasks"))
+
+    def sorted_tasks(self):
+        return [self._to_task(r) for r in self.db.query(f"SELECT * FROM tasks ORDER BY {TASK_ORDER}")]
+
+    def insert_task(self, task):
+        self.db.execute("INSERT OR REPLACE INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?)", self._to_row(task))
+
+    def toggle_task(self, task_id, updated_at):
+        self.db.execute("UPDATE tasks SET completed = 1 - completed, updated_at = ? WHERE id = ?",
+                        (updated_at, task_id))
+
+    def delete_task(self, task_id):
+        self.db.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+
+
+def import_from_json(db: SqliteDatabase, tasks_file="tasks.json", history_file="focus_history.jsonl",
+                     legacy_history_file="focus_history.json"):
+    """把现有 JSON 数据整体导入数据库 (覆盖同名表内容)，返回 (任务数, 历史记录数)"""
+    tasks = JsonRepository(tasks_file).load_all()
+    history = JsonLinesRepository(history_file, legacy_filename=legacy_history_file).load_all()
+    SqliteTaskRepository(db).save_all(tasks)
+    SqliteHistoryRepository(db).save_all(history)
+    return len(tasks), len(history)
+
+
+def open_sqlite_repositories(filename):
+    """打开 (必要时创建) 数据库，返回 (任务仓储, 历史仓储)；新建数据库时自动导入 JSON 数据"""
+    db = SqliteDatabase(filename)
+    if db.is_new: import_from_json(db)
+    return SqliteTaskRepository(db), SqliteHistoryRepository(db)
+
+
+if __name__ == "__main__":
+    database = SqliteDatabase(sys.argv[1] if len(sys.argv) > 1 else "zenpomo.db")
+    n_tasks, n_history = import_from_json(database)
+    print(f"已导入 {n_tasks} 个任务、{n_history} 条专注记录 → {database.file_path}")
@@ -0,0 +1,63 @@
+# src/theme.py
+"""
+样式绑定表：记录 "控件的哪个选项取自哪个配置键"，配置变更时只对绑定了变更键的控件调用 configure，
+不重建页面、不影响正在进行的计时。
+    theme.make(ctk.CTkLabel, parent, {"font": "GREETING_FONT", "text_color": "COLOR_TEXT_MAIN"}, text="...")
+控件以弱引用登记，销毁后的绑定在下次通知或登记时清理。
+"""
+import weakref
+
+from .config import config_manager
+
+
+class ThemeBinder:
+    def __init__(self, manager=config_manager):
+        self.manager = manager
+        self._bindings = {}  # 配置键 → [(控件弱引用, 选项名)]
+        self._prune_at = {}  # 配置键 → 登记数超过该值时清理一次已销毁的控件
+        self.restyled = 0    # 累计 configure 次数 (观察重载代价)
+        manager.subscribe(self._on_config)
+
+    def options(self, style):
+        """style: {选项名: 配置键} → {选项名: 当前值}"""
+        cfg = self.manager.snapshot
+        return {option: cfg[key] for option, key in style.items()}
+
+    def bind(self, widget, style):
+        for option, key in style.items():
+            entries = self._bindings.setdefault(key, [])
+            entries.append((weakref.ref(widget), option))
+            if len(entries) > self._prune_at.get(key, 32):
+                entries[:] = [(ref, opt) for ref, opt in entries if self._alive(ref())]
+                self._prune_at[key] = 2 * len(entries) + 32
+        return widget
+
+    def make(self, cls, master, style, **kwargs):
+        """按当前配置创建控件并登记绑定"""
+        return self.bind(cls(master, **kwargs, **self.options(style)), style)
+
+    @staticmethod
+    def _alive(widget):
+        try:
+            return widget is not None and bool(widget.winfo_exists())
+        except Exception:
+            return False
+
+    def _on_config(self, cfg, changed):
+        updates = {}  # 控件 → {选项: 值}，同一控件的多个选项合并为一次 configure
+        for key in changed:
+            entries = self._bindings.get(key)
+            if not entries: continue
+            live = []
+            for ref, option in entries:
+                widget = ref()
+                if not self._alive(widget): continue
+                live.append((ref, option))
+                updates.setdefault(widget, {})[option] = cfg[key]
+            entries[:] = live
+        for widget, options in updates.items():
+            try:
+                widget.configure(**options)
+                self.restyled += 1
+            except Exception as e:
+                print(f"Restyle error: {e}")
@@ -0,0 +1,135 @@
+# src/time_buckets.py
+"""
+时区感知的时间分桶。
+记录只保存 UTC 时间戳；按日 / 周 / 月统计时，先为配置时区 (zoneinfo) 预先计算每天零点对应的时间戳，
+缓存成有序整数表，之后任意时间戳的分桶只需一次二分查找，聚合过程全是整数比较。
+夏令时切换日 (23 / 25 小时) 与零点不存在的时区都由 zoneinfo 的零点换算自然处理。
+TIMEZONE 配置为空时跟随系统时区；固定为某个时区后，跨时区出行不会改变历史统计口径。
+"""
+import time as _time
+import bisect
+from functools import lru_cache
+from datetime import datetime, date, time, timedelta
+
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+except ImportError:  # Python < 3.9
+    ZoneInfo, ZoneInfoNotFoundError = None, Exception
+
+GRANULARITIES = ("hour", "day", "week", "month")
+
+
+class BucketCalendar:
+    """
+    分桶日历：bounds[i] 为第 i 天 (days[i]) 零点的时间戳 (整数秒)，末尾多一项作为上界。
+    表按需向前 / 向后扩展 (每次至少 CHUNK_DAYS 天)，同一天只换算一次。
+    days / bounds 作为一个元组整体替换 (_table)，读者先取局部引用，其他线程扩表时也不会看到一新一旧。
+    """
+    CHUNK_DAYS = 366
+
+    def __init__(self, tz_name=""):
+        self.tz_name, self.tz = "", None
+        if tz_name and ZoneInfo is not None:
+            try:
+                self.tz, self.tz_name = ZoneInfo(tz_name), tz_name
+            except (ZoneInfoNotFoundError, ValueError) as e:
+                print(f"Timezone error: {e}")
+        self._table = ([], [])  # (days, bounds)
+
+    @property
+    def key(self):
+        """时区标识，写入持久化索引；系统时区变化 (如出差) 时也会变化，触发索引重建"""
+        if self.tz is not None: return self.tz_name
+        return f"local:{_time.tzname[0]}/{_time.tzname[1]}/{_time.timezone}"
+
+    # ---------- 换算 ----------
+    def date_of(self, ts):
+        return datetime.fromtimestamp(ts, self.tz).date()
+
+    def local_time(self, ts):
+        """时间戳 → 本日历时区的 datetime (用于显示)"""
+        return datetime.fromtimestamp(ts, self.tz)
+
+    def day_start(self, d):
+        """某天零点的时间戳；零点不存在 (夏令时从零点起跳) 时为跳变时刻"""
+        return int(datetime.combine(d, time(), tzinfo=self.tz).timestamp())
+
+    def to_timestamp(self, value):
+        """datetime (无时区信息时按本日历时区解释) / date / 时间戳 → 时间戳"""
+        if isinstance(value, datetime):
+            if value.tzinfo is None and self.tz is not None: value = value.replace(tzinfo=self.tz)
+            return value.timestamp()
+        if isinstance(value, date): return self.day_start(value)
+        return float(value)
+
+    # ---------- 日历表 ----------
+    def _ensure(self, ts):
+        """返回覆盖 ts 的 (days, bounds)；需要扩表时先建好两张新表，再一次赋值发布"""
+        table = self._table
+        days, bounds = table
+        if bounds and bounds[0] <= ts < bounds[-1]: return table
+        d = self.date_of(ts)
+        first = d if not days else min(days[0], d)
+        last = d if not days else max(days[-1], d)
+        if days:
+            # 向缺失的一侧多扩展一段，避免逐天扩展
+            if d < days[0]: first = d - timedelta(days=self.CHUNK_DAYS)
+            else: last = d + timedelta(days=self.CHUNK_DAYS)
+        days = [first + timedelta(days=i) for i in range((last - first).days + 1)]
+        bounds = [self.day_start(x) for x in days] + [self.day_start(last + timedelta(days=1))]
+        self._table = table = (days, bounds)
+        return table
+
+    def day_of(self, ts):
+        """查表得到时间戳所在的本地日期 (与 date_of 结果相同，但不构造 datetime)"""
+        days, bounds = self._ensure(ts)
+        return days[bisect.bisect_right(bounds, ts) - 1]
+
+    # ---------- 分桶 ----------
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def label_of_day(d, granularity):
+        if granularity == "day": return d.strftime("%Y-%m-%d")
+        if granularity == "week":
+            year, week, _ = d.isocalendar()
+            return f"{year}-W{week:02d}"
+        if granularity == "month": return d.strftime("%Y-%m")
+        raise ValueError(f"Unknown granularity: {granularity}")
+
+    def label(self, ts, granularity="day"):
+        if granularity == "hour":
+            return datetime.fromtimestamp(ts, self.tz).strftime("%Y-%m-%d %H:00")
+        return self.label_of_day(self.day_of(ts), granularity)
+
+    def period_start(self, ts, granularity):
+        """时间戳所在桶的起始时间戳"""
+        if granularity == "hour":
+            return int(datetime.fromtimestamp(ts, self.tz).replace(minute=0, second=0, microsecond=0).timestamp())
+        d = self.date_of(ts)
+        if granularity == "week": d -= timedelta(days=d.weekday())
+        elif granularity == "month": d = d.replace(day=1)
+        elif granularity != "day": raise ValueError(f"Unknown granularity: {granularity}")
+        return self.day_start(d)
+
+    def bucket_bounds(self, start_ts, end_ts, granularity):
+        """覆盖 [start_ts, end_ts) 的桶：返回 (边界时间戳[桶数 + 1], 桶标签)，首个桶起点对齐到粒度边界"""
+        if granularity not in GRANULARITIES: raise ValueError(f"Unknown granularity: {granularity}")
+        cur = self.period_start(start_ts, granularity)
+        bounds, labels = [cur], []
+        if granularity == "hour":
+            # 按绝对小时步进：夏令时回拨当天会出现 25 个小时桶
+            while cur < end_ts:
+                labels.append(self.label(cur, "hour"))
+                cur += 3600
+                bounds.append(cur)
+            return bounds, labels
+
+        d = self.date_of(cur)
+        while cur < end_ts:
+            labels.append(self.label_of_day(d, granularity))
+            if granularity == "day": d += timedelta(days=1)
+            elif granularity == "week": d += timedelta(days=7)
+            else: d = d.replace(year=d.year + d.month // 12, month=d.month % 12 + 1)
+            cur = self.day_start(d)
+            bounds.append(cur)
+        return bounds, labels
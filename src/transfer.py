@@ -0,0 +1,296 @@
+# src/transfer.py
+"""
+历史与任务的批量导入 / 导出。
+格式按扩展名推断 (.csv / .jsonl / .json)，也可用 --format 指定；json 即 tasks.json 使用的原生数组格式。
+读写都是流式的：按 CHUNK 条分块解析、去重、写入，内存占用与文件大小无关。
+导入按任务 id / 历史 timestamp 去重 (与现有数据比较，也与文件内先出现的记录比较)，
+每块调用一次当前存储后端 (STORAGE_BACKEND) 的 append_many 批量写入。
+能按时间戳查重的历史后端 (existing_timestamps：二进制、SQLite) 逐块向存储端查重，
+记录先经过容量为 REORDER 的重排窗口按时间排序再写入 (基本有序的文件整块追加到文件尾)，不保存全部键；
+其余后端 (JSON Lines) 把现有与已导入的 timestamp 放进 KeySet (每条约 8 字节)。
+
+用法：python -m src.transfer import|export history|tasks 文件 [--format csv|jsonl|json]
+"""
+import os
+import sys
+import csv
+import json
+import math
+import time
+import heapq
+import bisect
+import argparse
+from array import array
+from itertools import islice
+
+from .core import atomic_write, iter_json_array, create_services
+
+CHUNK = 5000
+REORDER = 4 * CHUNK  # 重排窗口容量：乱序距离在此之内的记录按时间顺序写出
+FORMATS = ("csv", "jsonl", "json")
+
+# CSV 列 (其余字段在 CSV 中不保留) 与读入时的类型转换
+FIELDS = {
+    "history": {"date": str, "timestamp": float, "duration": int, "tag": str, "planned": int, "focused": float,
+                "interruptions": int, "completed": bool},
+    "tasks": {"id": str, "title": str, "due_date": str, "completed": bool, "created_at": float, "updated_at": float},
+}
+KEY = {"history": "timestamp", "tasks": "id"}
+
+
+class KeySet:
+    """
+    历史 timestamp 去重集合：有序 array('d') + 待归并的小集合，每个键约 8 字节 (百万条约 8 MB)。
+    待归并集合超过有序部分的 1/4 (至少 MERGE_AT) 时整体归并，归并次数随总量对数增长。
+    """
+    MERGE_AT = 50_000
+
+    def __init__(self):
+        self._sorted = array('d')
+        self._pending = set()
+
+    def __len__(self):
+        return len(self._sorted) + len(self._pending)
+
+    def __contains__(self, key):
+        if key in self._pending: return True
+        i = bisect.bisect_left(self._sorted, key)
+        return i < len(self._sorted) and self._sorted[i] == key
+
+    def add(self, key):
+        self._pending.add(key)
+        if len(self._pending) >= max(self.MERGE_AT, len(self._sorted) // 4): self._merge()
+
+    def _merge(self):
+        self._sorted = array('d', heapq.merge(self._sorted, sorted(self._pending)))
+        self._pending = set()
+
+
+class TransferStats:
+    def __init__(self, action, kind, path):
+        self.action, self.kind, self.path = action, kind, path
+        self.read = self.written = self.duplicates = self.invalid = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+        return self
+
+    def report(self):
+        rate = self.read / self.elapsed if self.elapsed else 0.0
+        try:
+            mb = os.path.getsize(self.path) / 1e6
+        except OSError:
+            mb = 0.0
+        line = (f"{self.action} {self.kind}: {self.written:,} written of {self.read:,} read "
+                f"in {self.elapsed:.2f} s ({rate:,.0f} records/s, {mb / self.elapsed if self.elapsed else 0:.1f} MB/s)")
+        if self.action == "import": line += f", {self.duplicates:,} duplicates, {self.invalid:,} invalid"
+        return line
+
+
+def detect_format(path, fmt=None):
+    fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+    if fmt not in FORMATS: raise ValueError(f"unknown format: {fmt or path} (use --format {'/'.join(FORMATS)})")
+    return fmt
+
+
+# ---------- 读取 ----------
+def _parse_bool(text):
+    return text.strip().lower() in ("1", "true", "yes", "y")
+
+
+def _from_csv_row(row, fields):
+    """按列类型转换；空单元格视为缺省字段，未知列按字符串保留"""
+    rec = {}
+    for name, text in row.items():
+        if name is None or text is None or text == "": continue
+        kind = fields.get(name, str)
+        if kind is bool: rec[name] = _parse_bool(text)
+        elif kind is int:
+            value = float(text)
+            rec[name] = int(value) if value.is_integer() else value
+        else: rec[name] = kind(text)
+    return rec
+
+
+def read_records(f, fmt, kind):
+    """从已打开的文本文件流式产出记录字典；无法解析的行产出 None (计为无效)"""
+    if fmt == "json":
+        yield from iter_json_array(f)
+    elif fmt == "jsonl":
+        for line in f:
+            line = line.strip()
+            if not line: continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield None
+    else:
+        fields = FIELDS[kind]
+        for row in csv.DictReader(f):
+            try:
+                yield _from_csv_row(row, fields)
+            except ValueError:
+                yield None
+
+
+def _normalize(rec, kind, calendar):
+    """校验并补全单条记录，无效时返回 None"""
+    if not isinstance(rec, dict): return None
+    if kind == "tasks":
+        if not rec.get("id") or "title" not in rec: return None
+        rec["id"] = str(rec["id"])
+        rec.setdefault("due_date", "")  # CSV 中的空单元格
+        return rec
+    try:
+        rec["timestamp"] = float(rec["timestamp"])
+        float(rec["duration"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not rec.get("date"): rec["date"] = calendar.label(rec["timestamp"])
+    return rec
+
+
+# ---------- 写出 ----------
+def write_records(f, fmt, kind, records):
+    """把记录流写入已打开的文本文件，返回写出条数"""
+    n = 0
+    if fmt == "csv":
+        fields = list(FIELDS[kind])
+        f.write("\ufeff")  # BOM：Excel 直接打开时中文标签不乱码
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore", lineterminator="\n")
+        writer.writeheader()
+        for chunk in _chunks(records):
+            writer.writerows(chunk)
+            n += len(chunk)
+    elif fmt == "jsonl":
+        for chunk in _chunks(records):
+            f.write("".join(json.dumps(rec, ensure_ascii=False, separators=(',', ':')) + "\n" for rec in chunk))
+            n += len(chunk)
+    else:
+        f.write("[")
+        for chunk in _chunks(records):
+            f.write(("," if n else "") + ",".join("\n    " + json.dumps(rec, ensure_ascii=False) for rec in chunk))
+            n += len(chunk)
+        f.write("\n]\n")
+    return n
+
+
+def _chunks(iterable, size=CHUNK):
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk: return
+        yield chunk
+
+
+# ---------- 管道 ----------
+def _service(kind, services=None):
+    task_service, history_service = services or create_services()
+    return task_service if kind == "tasks" else history_service
+
+
+def export_records(kind, path, fmt=None, services=None):
+    """把当前存储后端中的全部任务 / 历史流式写到 path (原子替换)，返回 TransferStats"""
+    fmt = detect_format(path, fmt)
+    repo, stats = _service(kind, services).repo, TransferStats("export", kind, path)
+
+    def write(f):
+        stats.read = stats.written = write_records(f, fmt, kind, repo.iter_all())
+
+    atomic_write(path, write)
+    return stats.finish()
+
+
+def import_records(kind, path, fmt=None, services=None):
+    """从 path 流式导入到当前存储后端，按 id / timestamp 跳过重复，返回 TransferStats"""
+    fmt = detect_format(path, fmt)
+    service, stats = _service(kind, services), TransferStats("import", kind, path)
+    repo, calendar = service.repo, getattr(service, "calendar", None)  # 缺少 date 的历史记录按配置时区补全
+    key = KEY[kind]
+    if kind == "history" and hasattr(repo, "existing_timestamps"):
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            _import_sorted(repo, (_normalize(rec, kind, calendar) for rec in read_records(f, fmt, kind)), stats)
+        return stats.finish()
+    seen = set() if kind == "tasks" else KeySet()  # 任务量小，直接用集合
+    for rec in repo.iter_all():
+        if key in rec: seen.add(str(rec[key]) if kind == "tasks" else float(rec[key]))
+
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        for chunk in _chunks(read_records(f, fmt, kind)):
+            fresh = []
+            for rec in chunk:
+                stats.read += 1
+                rec = _normalize(rec, kind, calendar)
+                if rec is None: stats.invalid += 1; continue
+                if rec[key] in seen: stats.duplicates += 1; continue
+                seen.add(rec[key])
+                fresh.append(rec)
+            if fresh: repo.append_many(fresh)
+            stats.written += len(fresh)
+    if hasattr(repo, "flush"): repo.flush()  # 写回缓冲仓储 (任务) 立即落盘
+    return stats.finish()
+
+
+def _import_sorted(repo, records, stats):
+    """
+    历史导入 (存储端可查重)：重排窗口 (按 timestamp 的小顶堆) 满后弹出最早的记录，凑满 CHUNK 条向存储端查重并写入。
+    比已写入记录更早的 (乱序超出窗口) 另存一批，攒满 CHUNK 条或导入结束时再写，有序后端只为它们归并重写一次。
+    尚未写入的记录 (窗口内与待写批次) 的键放在 buffered 中识别重复，已写入的重复由 existing_timestamps 查出；
+    内存只与 REORDER + 2 * CHUNK 有关。
+    """
+    heap, buffered, seq = [], set(), 0
+    out, late, high = [], [], -math.inf  # high：已写入的最大 timestamp
+
+    def write(batch):
+        present = repo.existing_timestamps(rec["timestamp"] for rec in batch)
+        fresh = [rec for rec in batch if rec["timestamp"] not in present]
+        if fresh: repo.append_many(fresh)
+        stats.written += len(fresh)
+        stats.duplicates += len(batch) - len(fresh)
+        buffered.difference_update(rec["timestamp"] for rec in batch)
+        batch.clear()
+        return max((rec["timestamp"] for rec in fresh), default=-math.inf)
+
+    def emit(rec):
+        nonlocal high
+        if rec["timestamp"] < high:
+            late.append(rec)
+            if len(late) >= CHUNK: write(late)
+            return
+        out.append(rec)
+        if len(out) >= CHUNK: high = max(high, write(out))
+
+    for rec in records:
+        stats.read += 1
+        if rec is None: stats.invalid += 1; continue
+        ts = rec["timestamp"]
+        if ts in buffered: stats.duplicates += 1; continue
+        heapq.heappush(heap, (ts, seq, rec)); seq += 1
+        buffered.add(ts)
+        if len(heap) > REORDER: emit(heapq.heappop(heap)[2])
+    while heap: emit(heapq.heappop(heap)[2])
+    if out: write(out)
+    if late: write(late)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.transfer", description="导入 / 导出专注历史与任务")
+    parser.add_argument("action", choices=("import", "export"))
+    parser.add_argument("kind", choices=("history", "tasks"))
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=FORMATS)
+    args = parser.parse_args(argv)
+    run = import_records if args.action == "import" else export_records
+    try:
+        stats = run(args.kind, args.path, args.format)
+    except (OSError, ValueError) as e:
+        print(f"{args.action.capitalize()} error: {e}")
+        return 1
+    print(stats.report())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,19 @@
 # src/ui.py
 import customtkinter as ctk
 from .config import config_manager
-from .core import ResourceManager, SoundManager, TimerEngine, history_service
+from .core import ResourceManager, SoundManager, MonotonicTimerEngine, SessionCheckpoint
+from .workers import TkDispatcher, ServiceExecutor, AsyncServices
+from .render import RenderScheduler
+from .profiling import traced
+from .theme import ThemeBinder
+from .config_watch import ConfigWatcher
 from .ui_components import MiniFloatWindow, TaskFrame, StatsFrame
 
 class PomodoroApp:
+    # 无法用控件选项绑定表达的配置项，由 _on_config 逐项处理
+    CONFIG_KEYS = {"ZEN_MESSAGES", "TITLE", "GLASS_ALPHA", "FOCUS_TAGS", "COLOR_BTN_SELECTED",
+                   "COLOR_PRIMARY", "COLOR_PAUSE", "TIMEZONE"}
+
     def __init__(self):
         ctk.set_appearance_mode("Light")
         ctk.set_default_color_theme("green")
@@ -19,6 +28,9 @@ class PomodoroApp:
         self.root.after(10, lambda: self.root.attributes('-topmost', False))
         self.root.focus_force()
         self.root.minsize(900, 600)
+        # 颜色 / 字体经 theme 绑定到配置键，config.json 变化时只重设相关控件
+        self.theme = ThemeBinder()
+        self.theme.bind(self.root, {"fg_color": "COLOR_BG"})
         self.root.configure(fg_color=config_manager.get("COLOR_BG"))
 
         try:
@@ -27,6 +39,7 @@ class PomodoroApp:
 
         # === 核心状态 ===
         self.timer_engine = None
+        self.progress = 0.0
         self.in_focus_mode = False
         self.current_duration = 25
         self.current_tag = config_manager.get("FOCUS_TAGS")[0]
@@ -35,11 +48,32 @@ class PomodoroApp:
         self.greeting_var = ctk.StringVar(value="准备好进入心流状态了吗？🌱")
         self.stat_vars = {"day": ctk.StringVar(value="0"), "week": ctk.StringVar(value="0"), "month": ctk.StringVar(value="0")}
         self.mini_window = None
+        self.current_frame = None
+        self.zen_msgs = config_manager.snapshot.ZEN_MESSAGES
+        # 配置变更由订阅推送，计时过程中不再逐次查询
+        config_manager.subscribe(self._on_config, self.CONFIG_KEYS)
+        # 计时相关的界面更新都经过渲染调度器：只下发变化的值，一帧合并一次
+        self.renderer = RenderScheduler(self.root)
+        # 所有仓储读写都在后台线程执行，结果经 dispatcher 回到主线程
+        self.dispatcher = TkDispatcher(self.root)
+        self.services = AsyncServices(ServiceExecutor(self.dispatcher.post))
+        # config.json 被外部修改时在主线程重载 (订阅回调因此也都在主线程执行)
+        self.config_watcher = None
+        if config_manager.get("CONFIG_WATCH", True):
+            self.config_watcher = ConfigWatcher(config_manager.CONFIG_FILE,
+                                                lambda: self.dispatcher.post(config_manager.reload),
+                                                config_manager.get("CONFIG_WATCH_INTERVAL", 1.0)).start()
+
+        # 检查点的写入与 fsync 交给写线程，按提交顺序执行
+        self.checkpoint = SessionCheckpoint(config_manager.get("SESSION_CHECKPOINT_FILE", "session.checkpoint.jsonl"),
+                                            submit=self.services.executor.write)
 
         self._setup_ui()
-        self._refresh_all_data()
         self.select_frame("timer")
         self._bring_to_front()
+        # 首帧绘制之后再在后台恢复中断的会话、预读历史 (预读排在恢复的补记之后)
+        self.root.after(100, self._recover_session)
+        self.root.after(100, self._preload_history)
 
     def _bring_to_front(self):
         self.root.deiconify()
@@ -62,12 +96,12 @@ class PomodoroApp:
         self.root.grid_rowconfigure(0, weight=1)
 
         # 侧边栏
-        self.sidebar_frame = ctk.CTkFrame(self.root, width=220, corner_radius=0,
-                                          fg_color=config_manager.get("COLOR_SIDEBAR"))
+        t = self.theme
+        self.sidebar_frame = t.make(ctk.CTkFrame, self.root, {"fg_color": "COLOR_SIDEBAR"}, width=220, corner_radius=0)
         self.sidebar_frame.grid(row=0, column=0, sticky="nsew")
 
-        ctk.CTkLabel(self.sidebar_frame, text="专注·极简", font=config_manager.get("SIDEBAR_TITLE_FONT"),
-                     text_color=config_manager.get("COLOR_PRIMARY")).pack(pady=(50, 40))
+        t.make(ctk.CTkLabel, self.sidebar_frame, {"font": "SIDEBAR_TITLE_FONT", "text_color": "COLOR_PRIMARY"},
+               text="专注·极简").pack(pady=(50, 40))
 
         self.btn_nav_timer = self._create_nav_btn("⏱  专注计时", lambda: self.select_frame("timer"))
         self.btn_nav_timer.pack(pady=8, padx=20, fill="x")
@@ -84,75 +118,113 @@ class PomodoroApp:
 
         self.frame_timer = ctk.CTkFrame(self.content_frame, fg_color="transparent")
         self._setup_timer_frame()
-        self.frame_tasks = TaskFrame(self.content_frame)
-        self.frame_stats = StatsFrame(self.content_frame, self.stat_vars)
+        # 待办与统计页在第一次切换过去时才创建 (见 _get_frame)
+        self.frame_tasks = None
+        self.frame_stats = None
 
     def _setup_timer_frame(self):
-        card = ctk.CTkFrame(self.frame_timer, fg_color=config_manager.get("COLOR_CARD_BG"),
-                            corner_radius=20, border_width=1, border_color=config_manager.get("COLOR_BORDER"))
+        t = self.theme
+        card = t.make(ctk.CTkFrame, self.frame_timer, {"fg_color": "COLOR_CARD_BG", "border_color": "COLOR_BORDER"},
+                      corner_radius=20, border_width=1)
         card.place(relx=0.5, rely=0.5, anchor="center", relwidth=0.7, relheight=0.85)
 
-        ctk.CTkLabel(card, textvariable=self.greeting_var, font=config_manager.get("GREETING_FONT"),
-                     text_color=config_manager.get("COLOR_TEXT_MAIN")).pack(pady=(30, 5))
+        t.make(ctk.CTkLabel, card, {"font": "GREETING_FONT", "text_color": "COLOR_TEXT_MAIN"},
+               textvariable=self.greeting_var).pack(pady=(30, 5))
 
-        ctk.CTkLabel(card, textvariable=self.time_str_var, font=config_manager.get("DISPLAY_TIME_FONT"),
-                     text_color=config_manager.get("COLOR_PRIMARY")).pack(pady=5)
+        t.make(ctk.CTkLabel, card, {"font": "DISPLAY_TIME_FONT", "text_color": "COLOR_PRIMARY"},
+               textvariable=self.time_str_var).pack(pady=5)
 
         control_panel = ctk.CTkFrame(card, fg_color="transparent")
         control_panel.pack(pady=5)
 
-        self.seg_button = ctk.CTkSegmentedButton(
-            control_panel, values=["15 分钟", "25 分钟", "45 分钟", "60 分钟"],
-            command=self.on_preset_click, font=config_manager.get("PRESET_FONT"),
-            height=config_manager.get("PRESET_HEIGHT"),
-            fg_color=config_manager.get("COLOR_SIDEBAR"), selected_color=config_manager.get("COLOR_PRIMARY"),
-            selected_hover_color=config_manager.get("COLOR_PRIMARY_HOVER"), corner_radius=20
+        self.seg_button = t.make(
+            ctk.CTkSegmentedButton, control_panel,
+            {"font": "PRESET_FONT", "fg_color": "COLOR_SIDEBAR", "selected_color": "COLOR_PRIMARY",
+             "selected_hover_color": "COLOR_PRIMARY_HOVER"},
+            values=["15 分钟", "25 分钟", "45 分钟", "60 分钟"], command=self.on_preset_click,
+            height=config_manager.get("PRESET_HEIGHT"), corner_radius=20
         )
         self.seg_button.set("25 分钟")
         self.seg_button.pack(pady=10)
 
-        self.slider = ctk.CTkSlider(control_panel, from_=5, to=120, number_of_steps=115, command=self.on_slider_drag,
-                                    width=260, height=18, progress_color=config_manager.get("COLOR_PRIMARY"),
-                                    button_color=config_manager.get("COLOR_PRIMARY"), button_hover_color=config_manager.get("COLOR_PRIMARY_HOVER"))
+        self.slider = t.make(ctk.CTkSlider, control_panel,
+                             {"progress_color": "COLOR_PRIMARY", "button_color": "COLOR_PRIMARY",
+                              "button_hover_color": "COLOR_PRIMARY_HOVER"},
+                             from_=5, to=120, number_of_steps=115, command=self.on_slider_drag, width=260, height=18)
         self.slider.set(25)
         self.slider.pack(pady=10)
 
         tag_box = ctk.CTkFrame(control_panel, fg_color="transparent")
         tag_box.pack(pady=(5, 0))
-        self.tag_seg = ctk.CTkSegmentedButton(tag_box, values=config_manager.get("FOCUS_TAGS"), command=self.on_tag_change,
-                                              font=config_manager.get("TAG_FONT"), height=config_manager.get("TAG_HEIGHT"),
-                                              fg_color=config_manager.get("COLOR_SIDEBAR"), selected_color=config_manager.get("COLOR_TAG_SELECTED"))
+        self.tag_seg = t.make(ctk.CTkSegmentedButton, tag_box,
+                              {"font": "TAG_FONT", "fg_color": "COLOR_SIDEBAR", "selected_color": "COLOR_TAG_SELECTED"},
+                              values=list(config_manager.get("FOCUS_TAGS")), command=self.on_tag_change,
+                              height=config_manager.get("TAG_HEIGHT"))
         self.tag_seg.set(config_manager.get("FOCUS_TAGS")[0])
         self.tag_seg.pack()
 
-        ctk.CTkButton(card, text="开始专注", command=self.start_focus, width=220,
-                      height=config_manager.get("BTN_START_HEIGHT"), corner_radius=config_manager.get("BTN_CORNER_RADIUS"),
-                      font=config_manager.get("BTN_START_FONT"), fg_color=config_manager.get("COLOR_PRIMARY"),
-                      hover_color=config_manager.get("COLOR_PRIMARY_HOVER")).pack(side="bottom", pady=40)
+        t.make(ctk.CTkButton, card, {"font": "BTN_START_FONT", "fg_color": "COLOR_PRIMARY", "hover_color": "COLOR_PRIMARY_HOVER"},
+               text="开始专注", command=self.start_focus, width=220, height=config_manager.get("BTN_START_HEIGHT"),
+               corner_radius=config_manager.get("BTN_CORNER_RADIUS")).pack(side="bottom", pady=40)
 
     def _create_nav_btn(self, text, command):
         # 修复：使用 get() 并提供默认值 45
-        return ctk.CTkButton(
-            self.sidebar_frame, text=text, command=command, fg_color="transparent",
-            text_color=config_manager.get("COLOR_TEXT_MAIN"), hover_color="#FFFFFF", anchor="w", corner_radius=10,
-            font=config_manager.get("SIDEBAR_BTN_FONT"),
+        return self.theme.make(
+            ctk.CTkButton, self.sidebar_frame, {"text_color": "COLOR_TEXT_MAIN", "font": "SIDEBAR_BTN_FONT"},
+            text=text, command=command, fg_color="transparent", hover_color="#FFFFFF", anchor="w", corner_radius=10,
             height=config_manager.get("SIDEBAR_BTN_HEIGHT", 45)
         )
 
+    def _get_frame(self, name):
+        """懒加载页面：首次访问时创建 (TaskFrame 创建时会自行加载任务列表)"""
+        if name == "tasks" and self.frame_tasks is None:
+            self.frame_tasks = TaskFrame(self.content_frame, self.services, self.theme)
+        elif name == "stats" and self.frame_stats is None:
+            self.frame_stats = StatsFrame(self.content_frame, self.stat_vars, self.services, self.theme)
+        return {"timer": self.frame_timer, "tasks": self.frame_tasks, "stats": self.frame_stats}[name]
+
     def select_frame(self, name):
-        self.frame_timer.pack_forget()
-        self.frame_tasks.pack_forget()
-        self.frame_stats.pack_forget()
+        for frame in (self.frame_timer, self.frame_tasks, self.frame_stats):
+            if frame is not None: frame.pack_forget()
         self.btn_nav_timer.configure(fg_color="transparent")
         self.btn_nav_tasks.configure(fg_color="transparent")
         self.btn_nav_stats.configure(fg_color="transparent")
 
-        btn_color = config_manager.get("COLOR_BTN_SELECTED")
-        if name == "timer": self.frame_timer.pack(fill="both", expand=True); self.btn_nav_timer.configure(fg_color=btn_color)
-        elif name == "tasks": self.frame_tasks.pack(fill="both", expand=True); self.btn_nav_tasks.configure(fg_color=btn_color); self.frame_tasks.refresh_list()
-        elif name == "stats": self.frame_stats.pack(fill="both", expand=True); self.btn_nav_stats.configure(fg_color=btn_color); self.frame_stats.refresh_data()
-
-    def _refresh_all_data(self): self.frame_stats.refresh_data()
+        frame = self._get_frame(name)
+        frame.pack(fill="both", expand=True)
+        self.current_frame = name
+        self._highlight_nav()
+        if name == "tasks": frame.refresh_list()
+        elif name == "stats": frame.refresh_data()
+
+    def _highlight_nav(self):
+        btn = {"timer": self.btn_nav_timer, "tasks": self.btn_nav_tasks, "stats": self.btn_nav_stats}[self.current_frame]
+        btn.configure(fg_color=config_manager.snapshot.COLOR_BTN_SELECTED)
+
+    def _on_config(self, cfg, changed):
+        """配置重载：逐项处理变化的键，进行中的专注不受影响"""
+        if "ZEN_MESSAGES" in changed: self.zen_msgs = cfg.ZEN_MESSAGES
+        if "TITLE" in changed: self.root.title(cfg.TITLE)
+        if "GLASS_ALPHA" in changed: self.root.attributes('-alpha', cfg.GLASS_ALPHA)
+        if "TIMEZONE" in changed: self.services.set_timezone(cfg.TIMEZONE, callback=lambda _: self._refresh_all_data())
+        if "COLOR_BTN_SELECTED" in changed and self.current_frame: self._highlight_nav()
+        if "FOCUS_TAGS" in changed:
+            tags = list(cfg.FOCUS_TAGS)
+            self.tag_seg.configure(values=tags)
+            # 专注进行中保留本次标签，结束后再切到新列表
+            if self.current_tag not in tags and not self.in_focus_mode: self.current_tag = tags[0] if tags else ""
+            self.tag_seg.set(self.current_tag if self.current_tag in tags else "")
+        if self.mini_window and self.timer_engine:
+            # 迷你窗口的状态色与进度条色由渲染器下发：清掉已下发的缓存值后按新配置重绘
+            self.renderer.forget("mini.")
+            self._render_session(self.progress)
+
+    def _preload_history(self):
+        """后台预读历史 (填充仓储缓存与聚合索引)，之后打开统计页无需等待解析"""
+        self.services.get_snapshot()
+
+    def _refresh_all_data(self):
+        if self.frame_stats is not None: self.frame_stats.refresh_data()
 
     # --- 专注逻辑 ---
     def on_preset_click(self, value):
@@ -171,59 +243,111 @@ class PomodoroApp:
         self.update_display_time(mins)
 
     def on_tag_change(self, value): self.current_tag = value
-    def update_display_time(self, mins): self.time_str_var.set(f"{mins:02d}:00")
+    def update_display_time(self, mins): self._render_time(f"{mins:02d}:00")
+
+    def _render_time(self, text): self.renderer.set("time", text, self.time_str_var.set)
+
+    def _render_session(self, progress):
+        """把计时器当前状态登记到渲染调度器 (未变化的项不会触发 Tk 调用)"""
+        engine, mw = self.timer_engine, self.mini_window
+        self._render_time(engine.get_time_str())
+        if not mw: return
+        msgs = self.zen_msgs
+        paused = engine.is_paused
+        message = "⏸ 暂停" if paused else (msgs['start'] if progress < 0.1 else (msgs['end'] if progress > 0.9 else msgs['focus']))
+        self.renderer.set("mini.paused", paused, mw.update_state)
+        self.renderer.set("mini.progress", round(progress * mw.PROGRESS_STEPS) / mw.PROGRESS_STEPS, mw.set_progress)
+        self.renderer.set("mini.bar_color", mw.bar_color(progress, paused), mw.set_bar_color)
+        self.renderer.set("mini.message", message, mw.set_message)
+
+    def _close_mini_window(self):
+        if self.mini_window: self.mini_window.destroy(); self.mini_window = None
+        self.renderer.forget("mini.")
+        if config_manager.get("RENDER_STATS"): print(self.renderer.report())
+
+    def _recover_session(self):
+        """上次异常退出时留下的会话：短暂中断直接接着计时，否则按实际专注时长补记 (读检查点在写线程完成)"""
+        self.services.recover_session(self.checkpoint, callback=self._apply_recovery)
+
+    def _apply_recovery(self, result):
+        if result is None: return
+        if result["action"] == "resume" and self.in_focus_mode:
+            # 恢复结果到达前已开始新的专注 (检查点已被新会话覆盖)：上次的会话不再接续，按已专注时长补记
+            focused = result["minutes"] * 60 - result["remaining"] + result["carried"]
+            if focused >= MonotonicTimerEngine.MIN_RECORD_SECONDS:
+                self.services.record_focus(result["minutes"], result["tag"], session={
+                    "focused": round(focused, 1), "interruptions": result["interruptions"] + 1, "completed": False})
+                self._refresh_all_data()
+            return
+        self.current_duration, self.current_tag = result["minutes"], result["tag"]
+        if result["action"] == "resume":
+            self.start_focus(restore=(result["remaining"], result["paused"], result["carried"], result["interruptions"]))
+        else:
+            self._refresh_all_data()
+            self.greeting_var.set(f"上次中断的 [{result['tag']}] 已记录 {result['focused_minutes']} 分钟")
 
-    def start_focus(self):
+    def start_focus(self, restore=None):
+        """restore: (剩余秒数, 是否暂停, 重置前已专注秒数, 打断次数)，从检查点恢复时传入"""
         if self.in_focus_mode: return
         try:
             mins = self.current_duration
             if mins <= 0: return
         except: return
 
-        self.timer_engine = TimerEngine(mins)
-        self.timer_engine.start()
+        self.timer_engine = MonotonicTimerEngine(mins)
+        if restore is None:
+            self.timer_engine.start()
+            self.checkpoint.start(mins, self.current_tag)
+        else:
+            self.timer_engine.restore(*restore)
+            self.checkpoint.start(mins, self.current_tag, *restore)
         self.in_focus_mode = True
         self.greeting_var.set(f"正在进行 [{self.current_tag}]，保持专注...")
         self.root.withdraw()
 
         callbacks = {'toggle': self.toggle_pause, 'reset': self.reset_timer, 'stop': self.stop_focus}
-        self.mini_window = MiniFloatWindow(self.root, self.time_str_var, self.current_tag, callbacks)
+        self.mini_window = MiniFloatWindow(self.root, self.time_str_var, self.current_tag, callbacks, self.theme)
+        self.renderer.forget("mini.")
         self._on_timer_tick()
 
+    @traced("ui.timer_tick")
     def _on_timer_tick(self):
         if not self.in_focus_mode or not self.timer_engine: return
-        is_finished, progress = self.timer_engine.tick()
-        self.time_str_var.set(self.timer_engine.get_time_str())
-
-        if self.mini_window:
-            zen_msgs = config_manager.get("ZEN_MESSAGES")
-            msg = zen_msgs['start'] if progress < 0.1 else (zen_msgs['end'] if progress > 0.9 else zen_msgs['focus'])
-            self.mini_window.update_progress(progress, msg)
-            self.mini_window.update_state(self.timer_engine.is_paused)
+        is_finished, self.progress = self.timer_engine.tick()
+        self._render_session(self.progress)
+        if not self.timer_engine.is_paused: self.checkpoint.heartbeat()
 
         if is_finished:
-            self.mini_window.update_progress(1.0, "✨ 已完成")
             self._handle_finish()
         else:
-            self.root.after(1000, self._on_timer_tick)
+            self.root.after(self.timer_engine.next_tick_delay_ms(), self._on_timer_tick)
 
     def toggle_pause(self):
         if self.timer_engine:
             self.timer_engine.pause_toggle()
-            if self.mini_window: self.mini_window.update_state(self.timer_engine.is_paused)
+            if self.timer_engine.is_paused: self.checkpoint.pause()
+            else: self.checkpoint.resume(self.timer_engine.remaining_seconds())
+            self._render_session(self.progress)
 
     def reset_timer(self):
         if self.timer_engine:
             self.timer_engine.reset()
-            self.time_str_var.set(self.timer_engine.get_time_str())
-            if self.mini_window:
-                self.mini_window.update_progress(0, config_manager.get("ZEN_MESSAGES")['start'])
-                self.mini_window.update_state(True)
+            self.checkpoint.reset()
+            self.progress = 0.0
+            self._render_session(self.progress)
 
     def stop_focus(self):
         self.in_focus_mode = False
-        if self.timer_engine: self.timer_engine.stop(); self.timer_engine = None
-        if self.mini_window: self.mini_window.destroy(); self.mini_window = None
+        self.checkpoint.clear()
+        if self.timer_engine:
+            # 提前停止也按实际专注时长记账 (太短的视为误触)
+            self.timer_engine.stop()
+            session = self.timer_engine.summary()
+            if session["focused"] >= self.timer_engine.MIN_RECORD_SECONDS:
+                self.services.record_focus(self.current_duration, self.current_tag, session=session)
+                self._refresh_all_data()
+            self.timer_engine = None
+        self._close_mini_window()
         self.root.deiconify()
         self.greeting_var.set("欢迎回来，休息一下吧。")
         self.update_display_time(self.current_duration)
@@ -232,10 +356,12 @@ class PomodoroApp:
     def _handle_finish(self):
         self.in_focus_mode = False
         SoundManager.play_finish()
-        history_service.record_focus(self.current_duration, self.current_tag)
-        if self.mini_window: self.mini_window.destroy(); self.mini_window = None
+        # 写入排队后立即刷新：读操作会等这次写入完成再执行
+        self.checkpoint.clear()
+        self.services.record_focus(self.current_duration, self.current_tag, session=self.timer_engine.summary())
+        self._close_mini_window()
         self.root.deiconify()
-        self.frame_stats.refresh_data()
+        self._refresh_all_data()
         self.greeting_var.set(f"🎉 恭喜！本次 [{self.current_tag}] 已完成！")
         self.update_display_time(self.current_duration)
         self._bring_to_front()
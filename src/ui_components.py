@@ -1,13 +1,18 @@
 # src/ui_components.py
 import customtkinter as ctk
 import sys
-from datetime import datetime
+import math
 from .config import config_manager
-from .core import task_service, history_service
+from .workers import AsyncServices
+from .profiling import traced
+from .theme import ThemeBinder
 
 
 class MiniFloatWindow(ctk.CTkToplevel):
-    def __init__(self, master, time_var, current_tag, callbacks):
+    PROGRESS_STEPS = 300  # 进度条宽度 (像素)：小于一个像素的进度变化不重绘
+    NEAR_END_COLOR = "#00cec9"  # 进度超过 90% 时进度条的颜色
+
+    def __init__(self, master, time_var, current_tag, callbacks, theme: ThemeBinder):
         super().__init__(master)
         self.callbacks = callbacks
         self.overrideredirect(True)
@@ -21,13 +26,14 @@ class MiniFloatWindow(ctk.CTkToplevel):
             self.configure(fg_color='systemTransparent')
         else:
             self.attributes('-alpha', 0.9)
-            self.configure(fg_color=bg_color)
+            theme.bind(self, {"fg_color": "COLOR_BG_MINI"}).configure(fg_color=bg_color)
 
         sw, w, h = self.winfo_screenwidth(), 360, 110
         self.geometry(f"{w}x{h}+{sw - w - 30}+{30}")
 
-        self.main_frame = ctk.CTkFrame(self, fg_color=bg_color, border_width=2,
-                                       border_color=primary_color, corner_radius=18)
+        # 边框 / 时间颜色由 update_state、进度条颜色由 set_bar_color 设置；其余静态样式绑定配置键
+        self.main_frame = theme.make(ctk.CTkFrame, self, {"fg_color": "COLOR_BG_MINI"}, border_width=2,
+                                     border_color=primary_color, corner_radius=18)
         self.main_frame.pack(fill="both", expand=True)
 
         self._bind_drag(self.main_frame)
@@ -36,16 +42,16 @@ class MiniFloatWindow(ctk.CTkToplevel):
         content_box.pack(fill="x", padx=25, pady=(15, 5))
         self._bind_drag(content_box)
 
-        self.lbl_time = ctk.CTkLabel(content_box, textvariable=time_var, width=125, anchor="w",
-                                     font=config_manager.get("MINI_TIME_FONT"), text_color=primary_color)
+        self.lbl_time = theme.make(ctk.CTkLabel, content_box, {"font": "MINI_TIME_FONT"}, textvariable=time_var,
+                                   width=125, anchor="w", text_color=primary_color)
         self.lbl_time.pack(side="left")
         self._bind_drag(self.lbl_time)
 
         right_frame = ctk.CTkFrame(content_box, fg_color="transparent")
         right_frame.pack(side="right")
-        ctk.CTkLabel(right_frame, text=f" {current_tag} ", font=("SF Pro Text", 12, "bold"),
-                     text_color="white", fg_color=config_manager.get("COLOR_TAG_SELECTED"), corner_radius=6,
-                     height=22, width=120, anchor="center").pack(anchor="center", pady=(0, 8))
+        theme.make(ctk.CTkLabel, right_frame, {"fg_color": "COLOR_TAG_SELECTED"}, text=f" {current_tag} ",
+                   font=("SF Pro Text", 12, "bold"), text_color="white", corner_radius=6,
+                   height=22, width=120, anchor="center").pack(anchor="center", pady=(0, 8))
 
         btn_box = ctk.CTkFrame(right_frame, fg_color="transparent")
         btn_box.pack(anchor="center")
@@ -58,8 +64,8 @@ class MiniFloatWindow(ctk.CTkToplevel):
         ctk.CTkButton(btn_box, text="⏹", width=32, height=32, font=("Arial", 12), fg_color="#ff7675",
                       corner_radius=16, command=self.callbacks['stop']).pack(side="left", padx=4)
 
-        self.lbl_status = ctk.CTkLabel(self.main_frame, text="准备...", font=config_manager.get("MINI_TEXT_FONT"),
-                                       text_color=config_manager.get("COLOR_TEXT_SUB"), height=15)
+        self.lbl_status = theme.make(ctk.CTkLabel, self.main_frame, {"font": "MINI_TEXT_FONT", "text_color": "COLOR_TEXT_SUB"},
+                                     text="准备...", height=15)
         self.lbl_status.pack(anchor="w", padx=28, pady=(0, 2))
         self.progress_bar = ctk.CTkProgressBar(self.main_frame, height=4, corner_radius=2,
                                                progress_color=primary_color, fg_color="#F0F2F5", width=300)
@@ -70,24 +76,31 @@ class MiniFloatWindow(ctk.CTkToplevel):
         widget.bind("<Button-1>", self.start_move)
         widget.bind("<B1-Motion>", self.do_move)
 
-    def update_progress(self, percent, message):
+    def set_progress(self, percent):
         self.progress_bar.set(percent)
+
+    def set_bar_color(self, color):
+        self.progress_bar.configure(progress_color=color)
+
+    def bar_color(self, progress, is_paused):
+        """进度条颜色：暂停色 / 临近结束色 / 主色"""
+        cfg = config_manager.snapshot
+        if is_paused: return cfg.COLOR_PAUSE
+        return self.NEAR_END_COLOR if progress > 0.9 else cfg.COLOR_PRIMARY
+
+    def set_message(self, message):
         self.lbl_status.configure(text=message)
-        self.progress_bar.configure(progress_color="#00cec9" if percent > 0.9 else config_manager.get("COLOR_PRIMARY"))
 
     def update_state(self, is_paused):
-        pause_col = config_manager.get("COLOR_PAUSE")
-        prim_col = config_manager.get("COLOR_PRIMARY")
+        cfg = config_manager.snapshot
+        pause_col, prim_col = cfg.COLOR_PAUSE, cfg.COLOR_PRIMARY
         if is_paused:
             self.main_frame.configure(border_color=pause_col)
             self.lbl_time.configure(text_color=pause_col)
-            self.progress_bar.configure(progress_color=pause_col)
-            self.lbl_status.configure(text="⏸ 暂停")
             self.btn_toggle.configure(text="▶", fg_color=prim_col)
         else:
             self.main_frame.configure(border_color=prim_col)
             self.lbl_time.configure(text_color=prim_col)
-            self.progress_bar.configure(progress_color=prim_col)
             self.btn_toggle.configure(text="⏸", fg_color=pause_col)
 
     def start_move(self, event):
@@ -97,24 +110,177 @@ class MiniFloatWindow(ctk.CTkToplevel):
         self.geometry(f"+{self.winfo_x() + event.x - self.x}+{self.winfo_y() + event.y - self.y}")
 
 
+class TaskRow(ctk.CTkFrame):
+    """可复用的任务行控件：bind_task 只改动与上次绑定相比发生变化的属性"""
+
+    def __init__(self, master, on_toggle, on_delete):
+        super().__init__(master, fg_color="transparent")
+        self.task_id = None
+        self._state = None  # 上次绑定的 (id, title, due_date, completed)
+        self._y = None
+        cfg = config_manager.snapshot
+
+        self.chk = ctk.CTkCheckBox(self, text="", width=22, height=22, fg_color=cfg.COLOR_PRIMARY,
+                                   command=lambda: on_toggle(self.task_id))
+        self.chk.pack(side="left", padx=10)
+        self.lbl_title = ctk.CTkLabel(self, text="", font=cfg.TASK_FONT, anchor="w")
+        self.lbl_title.pack(side="left", fill="x", expand=True)
+        ctk.CTkButton(self, text="✕", width=30, fg_color="transparent", text_color="gray", hover_color="#ffeaa7",
+                      command=lambda: on_delete(self.task_id)).pack(side="right")
+        self.lbl_date = ctk.CTkLabel(self, text="", font=("SF Pro Text", 12), text_color="gray")
+        self.lbl_date.pack(side="right", padx=10)
+
+    def bind_task(self, task):
+        state = (task["id"], task["title"], task.get("due_date", ""), task["completed"])
+        if state == self._state: return
+        old = self._state or (None, None, None, None)
+        self.task_id = task["id"]
+
+        if state[1] != old[1]: self.lbl_title.configure(text=state[1])
+        if state[2] != old[2]: self.lbl_date.configure(text=state[2])
+        if state[3] != old[3]:
+            if state[3]: self.chk.select()
+            else: self.chk.deselect()
+            self.lbl_title.configure(text_color=self._title_color(config_manager.snapshot, state[3]))
+        self._state = state
+
+    @staticmethod
+    def _title_color(cfg, completed):
+        return cfg.TASK_DONE_COLOR if completed else cfg.COLOR_TEXT_MAIN
+
+    def restyle(self, cfg):
+        """配置变更后重设样式 (由 VirtualTaskList 的配置订阅调用)"""
+        self.chk.configure(fg_color=cfg.COLOR_PRIMARY)
+        self.lbl_title.configure(font=cfg.TASK_FONT,
+                                 text_color=self._title_color(cfg, bool(self._state and self._state[3])))
+
+    def show_at(self, y, height):
+        if self._y == y: return
+        self.place(x=0, y=y, relwidth=1, height=height)
+        self._y = y
+
+    def hide(self):
+        if self._y is None: return
+        self.place_forget()
+        self._y = None
+
+
+class VirtualTaskList(ctk.CTkFrame):
+    """
+    虚拟化任务列表。
+    只为可见区域创建行控件 (行控件池)，行按任务 id 复用：仍然可见的任务保留原来的行，
+    位置变化时只移动 (show_at)，内容变化时才重新绑定；移出可见区域的行交给新出现的任务。
+    """
+    ROW_HEIGHT = 40
+    STYLE_KEYS = {"COLOR_PRIMARY", "TASK_FONT", "TASK_DONE_COLOR", "COLOR_TEXT_MAIN"}
+
+    def __init__(self, master, on_toggle, on_delete, **kwargs):
+        super().__init__(master, fg_color="transparent", **kwargs)
+        self.on_toggle, self.on_delete = on_toggle, on_delete
+        self.items = []
+        self.offset = 0  # 第一个可见行对应的数据下标
+        self.rows = []  # 已创建的全部行控件
+        self._by_id = {}  # 任务 id → 当前显示该任务的行
+
+        self.scrollbar = ctk.CTkScrollbar(self, command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.body = ctk.CTkFrame(self, fg_color="transparent")
+        self.body.pack(side="left", fill="both", expand=True)
+        self.lbl_empty = ctk.CTkLabel(self.body, text="🍃 全部完成", font=("Arial", 20), text_color="gray")
+
+        self.body.bind("<Configure>", lambda e: self._render())
+        for seq in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.bind_all(seq, self._on_wheel, add="+")
+        self._unsubscribe = config_manager.subscribe(self._on_config, self.STYLE_KEYS)
+
+    def _on_config(self, cfg, changed):
+        for row in self.rows: row.restyle(cfg)
+
+    def destroy(self):
+        self._unsubscribe()
+        super().destroy()
+
+    def set_items(self, items):
+        self.items = items
+        self._render()
+
+    def _visible_count(self):
+        return max(1, math.ceil(self.body.winfo_height() / self.ROW_HEIGHT))
+
+    def _new_row(self):
+        row = TaskRow(self.body, self.on_toggle, self.on_delete)
+        self.rows.append(row)
+        return row
+
+    @traced("ui.tasks.rows")
+    def _render(self):
+        count = self._visible_count()
+        self.offset = max(0, min(self.offset, len(self.items) - count))
+        visible = self.items[self.offset:self.offset + count]
+        ids = {task["id"] for task in visible}
+        kept = {tid: row for tid, row in self._by_id.items() if tid in ids}
+        used = {id(row) for row in kept.values()}
+        free = [row for row in self.rows if id(row) not in used]
+
+        for i, task in enumerate(visible):
+            row = kept.get(task["id"])
+            if row is None:
+                row = kept[task["id"]] = free.pop() if free else self._new_row()
+            row.bind_task(task)  # 内容未变时不做 Tk 调用
+            row.show_at(i * self.ROW_HEIGHT, self.ROW_HEIGHT)
+        for row in free: row.hide()
+        self._by_id = kept
+
+        if self.items: self.lbl_empty.place_forget()
+        else: self.lbl_empty.place(relx=0.5, y=70, anchor="center")
+
+        total = len(self.items)
+        if total <= count: self.scrollbar.set(0, 1)
+        else: self.scrollbar.set(self.offset / total, (self.offset + count) / total)
+
+    def scroll_to(self, offset):
+        offset = max(0, min(offset, len(self.items) - self._visible_count()))
+        if offset != self.offset:
+            self.offset = offset
+            self._render()
+
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self.scroll_to(round(float(args[1]) * len(self.items)))
+        elif args[0] == "scroll":
+            step = int(args[1]) * (self._visible_count() if args[2] == "pages" else 1)
+            self.scroll_to(self.offset + step)
+
+    def _on_wheel(self, event):
+        # 全局绑定的滚轮事件，只处理鼠标位于本列表内的情况
+        hovered = self.winfo_containing(event.x_root, event.y_root)
+        if hovered is None or not (str(hovered) + ".").startswith(str(self) + "."): return
+        if getattr(event, "num", None) in (4, 5): step = -1 if event.num == 4 else 1
+        else: step = -1 if event.delta > 0 else 1
+        self.scroll_to(self.offset + step * 3)
+
+
 class TaskFrame(ctk.CTkFrame):
-    def __init__(self, master, **kwargs):
+    def __init__(self, master, services: AsyncServices, theme: ThemeBinder, **kwargs):
         super().__init__(master, fg_color="transparent", **kwargs)
+        self.services = services
+        self.theme = theme
         self.tasks = []
         self._setup_ui()
         self.refresh_list()
 
     def _setup_ui(self):
+        t = self.theme
         top_bar = ctk.CTkFrame(self, fg_color="transparent")
         top_bar.pack(fill="x", padx=40, pady=(30, 20))
-        ctk.CTkLabel(top_bar, text="待办清单", font=("SF Pro Display", 26, "bold"),
-                     text_color=config_manager.get("COLOR_TEXT_MAIN")).pack(side="left")
-        self.lbl_count = ctk.CTkLabel(top_bar, text="0 个待办", font=("SF Pro Text", 14),
-                                      text_color=config_manager.get("COLOR_PRIMARY"))
+        t.make(ctk.CTkLabel, top_bar, {"text_color": "COLOR_TEXT_MAIN"}, text="待办清单",
+               font=("SF Pro Display", 26, "bold")).pack(side="left")
+        self.lbl_count = t.make(ctk.CTkLabel, top_bar, {"text_color": "COLOR_PRIMARY"}, text="0 个待办",
+                                font=("SF Pro Text", 14))
         self.lbl_count.pack(side="right")
 
-        card = ctk.CTkFrame(self, fg_color=config_manager.get("COLOR_CARD_BG"), corner_radius=20, border_width=1,
-                            border_color=config_manager.get("COLOR_BORDER"))
+        card = t.make(ctk.CTkFrame, self, {"fg_color": "COLOR_CARD_BG", "border_color": "COLOR_BORDER"},
+                      corner_radius=20, border_width=1)
         card.pack(fill="both", expand=True, padx=40, pady=(0, 40))
 
         add_box = ctk.CTkFrame(card, fg_color="transparent")
@@ -127,65 +293,50 @@ class TaskFrame(ctk.CTkFrame):
                                        border_width=0, fg_color="#F0F2F5", text_color="black", corner_radius=10)
         self.entry_date.pack(side="left", padx=(0, 10))
         self.entry_date.bind("<Return>", self.add_new_task)
-        ctk.CTkButton(add_box, text="+", width=45, height=45, font=("Arial", 22),
-                      fg_color=config_manager.get("COLOR_PRIMARY"), command=self.add_new_task).pack(side="right")
+        t.make(ctk.CTkButton, add_box, {"fg_color": "COLOR_PRIMARY"}, text="+", width=45, height=45,
+               font=("Arial", 22), command=self.add_new_task).pack(side="right")
 
-        self.scroll_tasks = ctk.CTkScrollableFrame(card, fg_color="transparent")
-        self.scroll_tasks.pack(fill="both", expand=True, padx=10, pady=(0, 20))
+        self.task_list = VirtualTaskList(card, on_toggle=self.toggle_task, on_delete=self.delete_task)
+        self.task_list.pack(fill="both", expand=True, padx=10, pady=(0, 20))
 
     def refresh_list(self):
-        self.tasks = task_service.get_tasks()
+        self.services.get_tasks(self._apply_tasks)
+
+    @traced("ui.tasks.render")
+    def _apply_tasks(self, tasks):
+        if not self.winfo_exists(): return
+        self.tasks = tasks
         self.lbl_count.configure(text=f"{sum(1 for t in self.tasks if not t['completed'])} 个待办")
-        for w in self.scroll_tasks.winfo_children(): w.destroy()
-        if not self.tasks:
-            ctk.CTkLabel(self.scroll_tasks, text="🍃 全部完成", font=("Arial", 20), text_color="gray").pack(pady=50)
-            return
-        for task in self.tasks: self._render_single_task(task)
-
-    def _render_single_task(self, task):
-        row = ctk.CTkFrame(self.scroll_tasks, fg_color="transparent")
-        row.pack(fill="x", pady=2)
-        is_done = task["completed"]
-        color = config_manager.get("TASK_DONE_COLOR") if is_done else config_manager.get("COLOR_TEXT_MAIN")
-
-        chk = ctk.CTkCheckBox(row, text="", width=22, height=22, fg_color=config_manager.get("COLOR_PRIMARY"),
-                              command=lambda t=task["id"]: self.toggle_task(t))
-        if is_done: chk.select()
-        chk.pack(side="left", padx=10)
-        ctk.CTkLabel(row, text=task["title"], font=config_manager.get("TASK_FONT"), text_color=color, anchor="w").pack(
-            side="left", fill="x", expand=True)
-        if task.get("due_date"):
-            ctk.CTkLabel(row, text=task["due_date"], font=("SF Pro Text", 12), text_color="gray").pack(side="left",
-                                                                                                       padx=10)
-        ctk.CTkButton(row, text="✕", width=30, fg_color="transparent", text_color="gray", hover_color="#ffeaa7",
-                      command=lambda t=task["id"]: self.delete_task(t)).pack(side="right")
+        self.task_list.set_items(self.tasks)
 
     def add_new_task(self, event=None):
         if self.entry_task.get().strip():
-            task_service.add_task(self.entry_task.get().strip(), self.entry_date.get().strip())
+            self.services.add_task(self.entry_task.get().strip(), self.entry_date.get().strip())
             self.entry_task.delete(0, "end");
             self.entry_date.delete(0, "end");
             self.refresh_list()
 
     def toggle_task(self, tid):
-        task_service.toggle_task(tid); self.refresh_list()
+        self.services.toggle_task(tid); self.refresh_list()
 
     def delete_task(self, tid):
-        task_service.delete_task(tid); self.refresh_list()
+        self.services.delete_task(tid); self.refresh_list()
 
 
 # [请修改 src/ui_components.py 中的 StatsFrame 类]
 
 class StatsFrame(ctk.CTkFrame):
-    def __init__(self, master, stat_vars, **kwargs):
+    def __init__(self, master, stat_vars, services: AsyncServices, theme: ThemeBinder, **kwargs):
         super().__init__(master, fg_color="transparent", **kwargs)
         self.stat_vars = stat_vars  # 保留引用，虽然主要数据通过 Service 获取
+        self.services = services
+        self.theme = theme  # 图表与记录行也绑定配置键，配置变更时原地重设颜色，不重绘
         self._setup_ui()
 
     def _setup_ui(self):
         # 顶部标题
-        ctk.CTkLabel(self, text="数据看板", font=("SF Pro Display", 26, "bold"),
-                     text_color=config_manager.get("COLOR_TEXT_MAIN")).pack(pady=(30, 20), anchor="w", padx=40)
+        self.theme.make(ctk.CTkLabel, self, {"text_color": "COLOR_TEXT_MAIN"}, text="数据看板",
+                        font=("SF Pro Display", 26, "bold")).pack(pady=(30, 20), anchor="w", padx=40)
 
         # === 核心：整个页面可滚动 ===
         self.main_scroll = ctk.CTkScrollableFrame(self, fg_color="transparent")
@@ -212,34 +363,42 @@ class StatsFrame(ctk.CTkFrame):
         kpi_box = ctk.CTkFrame(self.main_scroll, fg_color="transparent")
         kpi_box.pack(fill="x", pady=(0, 20))
 
-        self.kpi_day = self._create_card(kpi_box, "今日专注", config_manager.get("COLOR_PRIMARY"))
+        self.kpi_day = self._create_card(kpi_box, "今日专注", {"text_color": "COLOR_PRIMARY"})
         self.kpi_day.pack(side="left", fill="x", expand=True, padx=(0, 10))
 
-        self.kpi_week = self._create_card(kpi_box, "本周时长", "#0984e3")
+        self.kpi_week = self._create_card(kpi_box, "本周时长", {}, text_color="#0984e3")
         self.kpi_week.pack(side="left", fill="x", expand=True, padx=(0, 10))
 
-        self.kpi_month = self._create_card(kpi_box, "本月累计", "#6c5ce7")
-        self.kpi_month.pack(side="left", fill="x", expand=True)
+        self.kpi_month = self._create_card(kpi_box, "本月累计", {}, text_color="#6c5ce7")
+        self.kpi_month.pack(side="left", fill="x", expand=True, padx=(0, 10))
+
+        # 本周平均每个会话的打断次数 (暂停 / 重置 / 提前停止)
+        self.kpi_interrupt = self._create_card(kpi_box, "每轮打断 (本周)", {}, text_color="#e17055")
+        self.kpi_interrupt.pack(side="left", fill="x", expand=True)
 
-    def _create_card(self, parent, title, color):
-        card = ctk.CTkFrame(parent, fg_color=config_manager.get("COLOR_CARD_BG"), corner_radius=16,
-                            border_width=1, border_color=config_manager.get("COLOR_BORDER"))
+    def _create_card(self, parent, title, value_style, **value_kwargs):
+        card = self._section(parent)
         ctk.CTkLabel(card, text=title, font=("SF Pro Text", 13), text_color="#b2bec3").pack(pady=(15, 5), padx=20,
                                                                                             anchor="w")
-        lbl = ctk.CTkLabel(card, text="0", font=("SF Pro Display", 32), text_color=color)
+        lbl = self.theme.make(ctk.CTkLabel, card, value_style, text="0", font=("SF Pro Display", 32), **value_kwargs)
         lbl.pack(pady=(0, 15), padx=20, anchor="w")
         card.value_label = lbl  # 绑定引用以便更新
         return card
 
+    def _section(self, parent):
+        """卡片外框 (背景与边框色绑定配置)"""
+        return self.theme.make(ctk.CTkFrame, parent, {"fg_color": "COLOR_CARD_BG", "border_color": "COLOR_BORDER"},
+                               corner_radius=16, border_width=1)
+
+    def _section_title(self, parent, text):
+        self.theme.make(ctk.CTkLabel, parent, {"text_color": "COLOR_TEXT_MAIN"}, text=text,
+                        font=("SF Pro Text", 15, "bold")).pack(pady=15, padx=20, anchor="w")
+
     def _setup_trend_section(self):
         # 外框
-        self.trend_frame = ctk.CTkFrame(self.charts_container, fg_color=config_manager.get("COLOR_CARD_BG"),
-                                        corner_radius=16, border_width=1,
-                                        border_color=config_manager.get("COLOR_BORDER"))
+        self.trend_frame = self._section(self.charts_container)
         self.trend_frame.pack(fill="x", pady=(0, 20))
-
-        ctk.CTkLabel(self.trend_frame, text="📈 近7天专注趋势", font=("SF Pro Text", 15, "bold"),
-                     text_color=config_manager.get("COLOR_TEXT_MAIN")).pack(pady=15, padx=20, anchor="w")
+        self._section_title(self.trend_frame, "📈 近7天专注趋势")
 
         # 柱状图容器
         self.bar_container = ctk.CTkFrame(self.trend_frame, fg_color="transparent")
@@ -247,29 +406,32 @@ class StatsFrame(ctk.CTkFrame):
 
     def _setup_history_section(self):
         # 外框
-        self.history_frame = ctk.CTkFrame(self.charts_container, fg_color=config_manager.get("COLOR_CARD_BG"),
-                                          corner_radius=16, border_width=1,
-                                          border_color=config_manager.get("COLOR_BORDER"))
+        self.history_frame = self._section(self.charts_container)
         self.history_frame.pack(fill="x")
-
-        ctk.CTkLabel(self.history_frame, text="📝 最近专注记录", font=("SF Pro Text", 15, "bold"),
-                     text_color=config_manager.get("COLOR_TEXT_MAIN")).pack(pady=15, padx=20, anchor="w")
+        self._section_title(self.history_frame, "📝 最近专注记录")
 
         # 列表容器
         self.list_container = ctk.CTkFrame(self.history_frame, fg_color="transparent")
         self.list_container.pack(fill="x", padx=20, pady=(0, 20))
 
     def refresh_data(self):
-        # 1. 更新 KPI (旧接口)
-        stats = history_service.get_stats()
+        # 一次读取拿到 KPI、趋势与最近记录 (后台执行，完成后回到主线程渲染)
+        self.services.get_snapshot(self._apply_snapshot, recent_n=10)
+
+    @traced("ui.stats.render")
+    def _apply_snapshot(self, snapshot):
+        if not self.winfo_exists(): return
+
+        # 1. 更新 KPI
+        stats = snapshot['stats']
         self.kpi_day.value_label.configure(text=f"{stats['day']}")
         self.kpi_week.value_label.configure(text=f"{stats['week']}")
         self.kpi_month.value_label.configure(text=f"{stats['month']}")
+        self.kpi_interrupt.value_label.configure(text=f"{stats['interruption_rate']['week']:.1f}")
 
-        # 2. 更新图表 (新接口)
-        chart_data = history_service.get_chart_data()
-        self._render_trend_chart(chart_data['trend'])
-        self._render_recent_history(chart_data['recent'])
+        # 2. 更新图表
+        self._render_trend_chart(snapshot['trend'])
+        self._render_recent_history(snapshot['recent'])
 
     def _render_trend_chart(self, trend_data):
         # 清空旧图表
@@ -279,6 +441,7 @@ class StatsFrame(ctk.CTkFrame):
         if not trend_data:
             return
 
+        t, primary = self.theme, {"progress_color": "COLOR_PRIMARY"}
         for day in trend_data:
             row = ctk.CTkFrame(self.bar_container, fg_color="transparent")
             row.pack(fill="x", pady=6)
@@ -288,16 +451,14 @@ class StatsFrame(ctk.CTkFrame):
                          font=("SF Pro Text", 12), text_color="#636e72").pack(side="left")
 
             # 进度条
-            bar = ctk.CTkProgressBar(row, height=8, corner_radius=4, fg_color="#F0F2F5",
-                                     progress_color=config_manager.get("COLOR_PRIMARY"))
+            bar = t.make(ctk.CTkProgressBar, row, primary, height=8, corner_radius=4, fg_color="#F0F2F5")
             bar.pack(side="left", fill="x", expand=True, padx=10)
             bar.set(day['percent'])
 
             # 数值标签 (45分)
             val_text = f"{day['minutes']}分" if day['minutes'] > 0 else "-"
-            ctk.CTkLabel(row, text=val_text, width=50, anchor="e",
-                         font=("SF Pro Text", 12, "bold"), text_color=config_manager.get("COLOR_PRIMARY")).pack(
-                side="right")
+            t.make(ctk.CTkLabel, row, {"text_color": "COLOR_PRIMARY"}, text=val_text, width=50, anchor="e",
+                   font=("SF Pro Text", 12, "bold")).pack(side="right")
 
     def _render_recent_history(self, recent_data):
         for widget in self.list_container.winfo_children():
@@ -317,24 +478,28 @@ class StatsFrame(ctk.CTkFrame):
         ctk.CTkLabel(header, text="时长", width=60, anchor="e", font=("Arial", 12, "bold"), text_color="#b2bec3").pack(
             side="right")
 
+        t = self.theme
+        calendar = self.services.calendar  # 与统计分桶同一时区
         for rec in recent_data:
             row = ctk.CTkFrame(self.list_container, fg_color="transparent")
             row.pack(fill="x", pady=4)
 
             # 时间格式化
-            dt = datetime.fromtimestamp(rec.get("timestamp", 0))
+            dt = calendar.local_time(rec.get("timestamp", 0))
             time_str = dt.strftime("%m-%d %H:%M")
 
-            ctk.CTkLabel(row, text=time_str, width=120, anchor="w", font=("SF Pro Text", 13),
-                         text_color=config_manager.get("COLOR_TEXT_MAIN")).pack(side="left")
+            t.make(ctk.CTkLabel, row, {"text_color": "COLOR_TEXT_MAIN"}, text=time_str, width=120, anchor="w",
+                   font=("SF Pro Text", 13)).pack(side="left")
 
             tag = rec.get("tag", "默认")
             ctk.CTkLabel(row, text=tag, width=80, anchor="center", font=("SF Pro Text", 12),
                          fg_color="#F0F2F5", corner_radius=6, text_color="#636e72").pack(side="left", padx=5)
 
+            # 提前结束的会话显示 实际/计划 分钟
             dur = rec.get("duration", 0)
-            ctk.CTkLabel(row, text=f"{dur} min", width=60, anchor="e", font=("SF Pro Text", 13, "bold"),
-                         text_color=config_manager.get("COLOR_PRIMARY")).pack(side="right")
+            dur_text = f"{dur}/{rec['planned']} min" if rec.get("completed") is False else f"{dur} min"
+            t.make(ctk.CTkLabel, row, {"text_color": "COLOR_PRIMARY"}, text=dur_text, width=60, anchor="e",
+                   font=("SF Pro Text", 13, "bold")).pack(side="right")
 
             # 分隔线
             ctk.CTkFrame(self.list_container, height=1, fg_color="#F0F2F5").pack(fill="x", pady=(2, 0))
\ No newline at end of file
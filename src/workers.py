@@ -0,0 +1,199 @@
+# src/workers.py
+"""
+后台 I/O 执行器：让 Tk 主线程永远不等待文件读写与 JSON 解析。
+- 写操作 (增删改任务、记录专注) 进入单线程写队列，按提交顺序串行执行；
+- 读操作 (任务列表、统计快照) 进入读线程池，并等待提交前最后一个写操作完成，保证读到自己的写；
+- 结果通过投递函数 (Tk 下为 TkDispatcher.post) 回到 UI 线程执行回调。
+"""
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+try:
+    import tkinter
+except ImportError:  # 守护进程不需要 Tk，只有 TkDispatcher 用到
+    tkinter = None
+
+
+class TkDispatcher:
+    """
+    线程安全的 UI 投递：后台线程只往队列里放回调，由主线程取出执行。
+    (Tk 不是线程安全的，不能在工作线程里直接调用 widget 或 root.after)
+    Unix 下 post 往自管道写一个字节，Tk 事件循环经 createfilehandler 在主线程被唤醒，空闲时不轮询；
+    其他平台 (没有 createfilehandler) 退化为 after() 轮询，队列连续为空时间隔逐步放慢到 IDLE_MS。
+    """
+    POLL_MS = 15
+    IDLE_MS = 500
+
+    def __init__(self, root):
+        self.root = root
+        self._queue = queue.SimpleQueue()
+        self._pipe = self._open_pipe()
+        self.mode = "pipe" if self._pipe is not None else "poll"
+        self._delay = self.POLL_MS
+        if self._pipe is None: self.root.after(self.POLL_MS, self._poll)
+
+    def _open_pipe(self):
+        if not hasattr(self.root.tk, "createfilehandler"): return None
+        r, w = os.pipe()
+        os.set_blocking(r, False)
+        os.set_blocking(w, False)
+        try:
+            self.root.tk.createfilehandler(r, tkinter.READABLE, self._on_wake)
+        except (tkinter.TclError, OSError) as e:
+            print(f"UI dispatcher pipe error: {e}")
+            os.close(r); os.close(w)
+            return None
+        return r, w
+
+    def post(self, fn, *args):
+        self._queue.put((fn, args))
+        if self._pipe is None: return
+        try:
+            os.write(self._pipe[1], b"\0")
+        except BlockingIOError:
+            pass  # 管道已满：主线程已有未处理的唤醒
+
+    def _on_wake(self, fd, mask):
+        # 先读空管道再取队列：取完之后才投递的回调会再写一个字节，不会漏掉
+        try:
+            while os.read(fd, 4096): pass
+        except BlockingIOError:
+            pass
+        self._drain()
+
+    def _poll(self):
+        self._delay = self.POLL_MS if self._drain() else min(self._delay * 2, self.IDLE_MS)
+        self.root.after(self._delay, self._poll)
+
+    def _drain(self):
+        """执行队列中的全部回调，返回执行的个数"""
+        n = 0
+        try:
+            while True:
+                fn, args = self._queue.get_nowait()
+                n += 1
+                try:
+                    fn(*args)
+                except Exception as e:
+                    print(f"UI callback error: {e}")
+        except queue.Empty:
+            return n
+
+
+def _direct(fn, *args): fn(*args)
+
+
+class ServiceExecutor:
+    """单写者 + 读线程池；dispatch 决定回调在哪个线程执行 (默认直接在工作线程执行)"""
+
+    def __init__(self, dispatch=None, read_workers=2):
+        self.dispatch = dispatch or _direct
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="io-writer")
+        self._readers = ThreadPoolExecutor(max_workers=read_workers, thread_name_prefix="io-reader")
+        self._lock = threading.Lock()
+        self._last_write = None
+        self._latest = {}  # key → 最近一次提交的读操作，旧结果到达时直接丢弃
+
+    def write(self, fn, *args, callback=None, errback=None):
+        with self._lock:
+            future = self._writer.submit(fn, *args)
+            self._last_write = future
+        self._deliver(future, callback, errback)
+        return future
+
+    def read(self, fn, *args, callback=None, errback=None, key=None):
+        """key 相同的读操作只回调最新一次 (例如连续刷新同一页面)"""
+        with self._lock:
+            barrier = self._last_write
+            future = self._readers.submit(self._after_write, barrier, fn, args)
+            if key is not None: self._latest[key] = future
+        if key is not None:
+            inner = callback
+            def callback(result):
+                if self._latest.get(key) is future and inner: inner(result)
+        self._deliver(future, callback, errback)
+        return future
+
+    @staticmethod
+    def _after_write(barrier, fn, args):
+        if barrier is not None: wait([barrier])  # 写失败也继续读，只是读不到那次修改
+        return fn(*args)
+
+    def _deliver(self, future, callback, errback):
+        def done(f):
+            e = f.exception()
+            if e is not None:
+                if errback: self.dispatch(errback, e)
+                else: print(f"Worker error: {e}")
+            elif callback:
+                self.dispatch(callback, f.result())
+        future.add_done_callback(done)
+
+    def flush(self, timeout=None):
+        """等待已提交的写操作全部落盘"""
+        with self._lock:
+            barrier = self._last_write
+        if barrier is not None: wait([barrier], timeout=timeout)
+
+    def shutdown(self, wait=True):
+        self._readers.shutdown(wait=wait)
+        self._writer.shutdown(wait=wait)
+
+
+class AsyncServices:
+    """
+    TaskService / HistoryService 的异步门面：方法与同步服务一一对应，多一个 callback 参数。
+    服务在工作线程里首次使用时才组装 (core.get_services)，UI 线程连构造仓储的开销也不承担。
+    """
+
+    def __init__(self, executor: ServiceExecutor, services=None):
+        self.executor = executor
+        self._services = services
+
+    def _get(self, i):
+        if self._services is None:
+            from .core import get_services
+            self._services = get_services()
+        return self._services[i]
+
+    def _tasks(self): return self._get(0)
+
+    def _history(self): return self._get(1)
+
+    @property
+    def calendar(self):
+        """历史服务的分桶日历；界面在快照回调里用它按统计时区格式化时间 (此时服务已在工作线程组装好)"""
+        return self._history().calendar
+
+    # ---------- 任务 ----------
+    def get_tasks(self, callback=None):
+        return self.executor.read(lambda: self._tasks().get_tasks(), callback=callback, key="tasks")
+
+    def add_task(self, title, due_date="", callback=None):
+        return self.executor.write(lambda: self._tasks().add_task(title, due_date), callback=callback)
+
+    def toggle_task(self, task_id, callback=None):
+        return self.executor.write(lambda: self._tasks().toggle_task(task_id), callback=callback)
+
+    def delete_task(self, task_id, callback=None):
+        return self.executor.write(lambda: self._tasks().delete_task(task_id), callback=callback)
+
+    # ---------- 历史 ----------
+    def record_focus(self, minutes, tag, callback=None, timestamp=None, session=None):
+        return self.executor.write(lambda: self._history().record_focus(minutes, tag, timestamp, session),
+                                   callback=callback)
+
+    def set_timezone(self, tz_name, callback=None):
+        """TIMEZONE 变更：在写线程上切换日历，排在它之后的读取都按新时区分桶"""
+        from .time_buckets import BucketCalendar
+        return self.executor.write(lambda: self._history().set_calendar(BucketCalendar(tz_name)), callback=callback)
+
+    def recover_session(self, checkpoint, callback=None):
+        """启动时处理上次中断的会话 (读检查点、必要时补记历史)：在写线程执行，排在之后的检查点写入之前"""
+        return self.executor.write(lambda: checkpoint.recover(self._history()), callback=callback)
+
+    def get_snapshot(self, callback=None, recent_n=10):
+        return self.executor.read(lambda: self._history().get_snapshot(recent_n=recent_n),
+                                  callback=callback, key="snapshot")